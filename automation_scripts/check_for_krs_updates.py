@@ -1,15 +1,34 @@
-
 import requests
 import datetime
-import time
-import ast
 import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Literal, Optional
+from zoneinfo import ZoneInfo
+from redis import Redis
+from rq import Queue
 
 from config import (
     LOG_TO_POSTGRE_SQL,
-    SOURCE_LOG_SYNC_PSQL_URL
+    SOURCE_LOG_SYNC_PSQL_URL,
+    REDIS_URL,
+    AUTOMATION_ENQUEUE_MODE,
+    AUTOMATION_ENQUEUE_BATCH_SIZE,
+    AUTOMATION_BIULETYN_WINDOW_HOURS,
+    AUTOMATION_BIULETYN_MAX_WORKERS,
+    AUTOMATION_REFRESH_FRESHNESS_HOURS,
+    SOURCE_SYNC_PSQL_URL
 )
 from logging_utils import setup_logger
+from business_data_api.db import create_sync_sessionmaker
+from automation_scripts.refresh_planner import build_refresh_plan
+from automation_scripts.leader_lease import LeaderLease, LeaseLostError
+from business_data_api.metrics import observe_upstream_response
+from business_data_api.workers.queues import (
+    QUEUE_NAMES,
+    QUEUE_TASK_PATHS,
+    get_queue_lane_names,
+    enqueue_coalesced_jobs)
 
 log = setup_logger(
     logger_name="krsapi_scheduler_log_job",
@@ -18,58 +37,307 @@ log = setup_logger(
 )
 log.propagate = False
 
-def check_for_updates(api_url:str, days_to_check:int=1):
+URL_KRS_API = "https://api-krs.ms.gov.pl/api/Krs/Biuletyn/{dzien}?godzinaOd={godzinaOd}&godzinaDo={godzinaDo}"
+# Biuletyn days and hours are in polish time
+BIULETYN_TIMEZONE = ZoneInfo("Europe/Warsaw")
+# Start of the last Biuletyn hour that was already fetched and enqueued
+BIULETYN_WATERMARK_KEY = "business_data_api:automation:biuletyn_watermark"
+BIULETYN_WATERMARK_FORMAT = "%Y-%m-%dT%H"
+# Fencing token of the lease holder that has moved the watermark last
+BIULETYN_WATERMARK_FENCING_TOKEN_KEY = "business_data_api:automation:biuletyn_watermark_fencing_token"
+# Watermark is moved only by the holder of the newest lease
+_SAVE_FENCED_WATERMARK = """
+local last_token = tonumber(redis.call('GET', KEYS[2]) or '0')
+if tonumber(ARGV[2]) < last_token then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1])
+redis.call('SET', KEYS[2], ARGV[2])
+return 1
+"""
+
+
+def load_biuletyn_watermark(connection:Redis) -> Optional[datetime.datetime]:
     """
-    Function that checks KRS API endpoint for updates in company registries and
-    sends refresh query to the business data api, so that it updates local repositories
-    with new data.
+    Returns start of the last processed Biuletyn hour, or None
+    if automation has not processed any hour yet
+    """
+    watermark = connection.get(BIULETYN_WATERMARK_KEY)
+    if watermark is None:
+        return None
+    return datetime.datetime.strptime(watermark.decode(), BIULETYN_WATERMARK_FORMAT)
 
-    days_to_check - default = 1. This argument tells function how many days back from
-    the current day to check for updates.
+def save_biuletyn_watermark(
+        connection:Redis,
+        watermark:datetime.datetime,
+        fencing_token:Optional[int]=None):
     """
-    URL_KRS_API = "https://api-krs.ms.gov.pl/api/Krs/Biuletyn/{dzien}?godzinaOd={godzinaOd}&godzinaDo={godzinaDo}"
-    URL_ADD_KRS_BUSINESS_INFORMATION_TO_QUEUE =f"http://{api_url}/krs-api/update-business-information/{{krs}}"
-    URL_ADD_KRS_DOCUMENTS_TO_QUEUE = f"http://{api_url}/krs-df/update-document-list/{{krs}}"
-    
-    log.info("Initialising job")
+    Stores start of the last processed Biuletyn hour.
+    With fencing token, watermark is stored only if no holder
+    of a newer lease has stored it already
+    """
+    watermark = watermark.strftime(BIULETYN_WATERMARK_FORMAT)
+    if fencing_token is None:
+        connection.set(BIULETYN_WATERMARK_KEY, watermark)
+        return
+    saved = connection.eval(
+        _SAVE_FENCED_WATERMARK,
+        2,
+        BIULETYN_WATERMARK_KEY,
+        BIULETYN_WATERMARK_FENCING_TOKEN_KEY,
+        watermark,
+        fencing_token)
+    if not saved:
+        raise LeaseLostError(
+            f"Watermark was already moved by holder of a newer lease "
+            f"(fencing token {fencing_token} is stale)")
+
+def plan_biuletyn_windows(
+        watermark:Optional[datetime.datetime],
+        now:datetime.datetime,
+        days_to_check:int=1,
+        window_hours:int=AUTOMATION_BIULETYN_WINDOW_HOURS) -> list[tuple[datetime.date, int, int]]:
+    """
+    Returns (day, hour from, hour to) windows of Biuletyn hours that were not
+    processed yet - from the hour after watermark up to the last full hour.
+    Without watermark, last days_to_check days (including today) are planned.
+    Window never spans more than one day or more than window_hours hours
+    """
+    last_full_hour = now.replace(minute=0, second=0, microsecond=0, tzinfo=None) - datetime.timedelta(hours=1)
+    if watermark is None:
+        first_hour = datetime.datetime.combine(
+            now.date() - datetime.timedelta(days=days_to_check-1),
+            datetime.time())
+    else:
+        first_hour = watermark + datetime.timedelta(hours=1)
+    windows = []
+    hour = first_hour
+    while hour <= last_full_hour:
+        hour_to = min(hour.hour + window_hours - 1, 23)
+        if hour.date() == last_full_hour.date():
+            hour_to = min(hour_to, last_full_hour.hour)
+        windows.append((hour.date(), hour.hour, hour_to))
+        hour = datetime.datetime.combine(hour.date(), datetime.time(hour_to)) + datetime.timedelta(hours=1)
+    return windows
+
+def fetch_biuletyn_window(window:tuple[datetime.date, int, int]) -> list[str]:
+    """
+    Returns KRS numbers of entities changed within the Biuletyn window
+    """
+    day, hour_from, hour_to = window
+    response = requests.get(URL_KRS_API.format(
+        dzien=day.strftime("%Y-%m-%d"),
+        godzinaOd=hour_from,
+        godzinaDo=hour_to
+    ), timeout=60, hooks={"response": observe_upstream_response})
+    response.raise_for_status()
+    return [str(krs).zfill(10) for krs in response.json()]
+
+def gather_krs_numbers(
+        windows:list[tuple[datetime.date, int, int]],
+        max_workers:int=AUTOMATION_BIULETYN_MAX_WORKERS) -> set[str]:
+    """
+    Fetches Biuletyn windows concurrently, at most max_workers at once,
+    and returns unique KRS numbers of changed entities.
+    Fails if any of the windows could not be fetched
+    """
+    log.info(f"Gathering KRS numbers from {len(windows)} Biuletyn windows")
     unique_krs_numbers = set()
-    non_unique_krs_numbers = []
-    date_to=datetime.date.today()
-    log.info(f"Checking for {days_to_check} last days")
-    log.info("Gathering KRS numbers")
-    for i, day_num in enumerate(range(days_to_check-1, -1, -1)):
-        date = date_to - datetime.timedelta(days=day_num)
-        log.info(f"Scraping day {date.strftime("%Y-%m-%d")} {i+1}/{days_to_check}")
-        message = f"[{i+1}/{days_to_check}] Fetching krs changes for day {date}"
-        krs_numbers = requests.get(URL_KRS_API.format(
-            dzien=f"{date.year}-{date.month:02d}-{date.day:02d}",
-            godzinaOd=0,
-            godzinaDo=23
-        )).text
-        krs_numbers = ast.literal_eval(krs_numbers)
-        krs_numbers = [krs.zfill(10) for krs in krs_numbers]
-        unique_krs_numbers.update(krs_numbers)
-    len_krs_numbers = len(unique_krs_numbers)
-    log.info(f"Sending {str(len_krs_numbers)} krs records to backend for scraping")
-    for i, krs_num in enumerate(unique_krs_numbers):
-        time.sleep(0.05)
-        message = f"[{i+1}/{len_krs_numbers}] Sending request for scraping krs number: {krs_num}"
-        print(f"\r{message:<80}", end="", flush=True)
-        requests.get(URL_ADD_KRS_BUSINESS_INFORMATION_TO_QUEUE.format(krs=krs_num)) 
-        requests.get(URL_ADD_KRS_DOCUMENTS_TO_QUEUE.format(krs=krs_num)) 
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for window, krs_numbers in zip(windows, executor.map(fetch_biuletyn_window, windows)):
+            day, hour_from, hour_to = window
+            log.debug(f"Fetched {len(krs_numbers)} changes for day {day} hours {hour_from}-{hour_to}")
+            unique_krs_numbers.update(krs_numbers)
+    return unique_krs_numbers
+
+def enqueue_through_api(
+        api_url:str,
+        refresh_plan:dict[str, list[str]],
+        batch_size:int,
+        lease:Optional[LeaderLease]=None) -> int:
+    """
+    Sends KRS numbers of every job type to the API batch enqueue endpoint.
+    Returns number of jobs enqueued (not counting reused ones)
+    """
+    url_enqueue_jobs = f"http://{api_url}/jobs/enqueue"
+    jobs_enqueued = 0
+    for queue_name, krs_numbers in refresh_plan.items():
+        for i in range(0, len(krs_numbers), batch_size):
+            if lease is not None:
+                lease.ensure_held()
+            batch = krs_numbers[i:i+batch_size]
+            message = f"[{queue_name} {i+len(batch)}/{len(krs_numbers)}] Sending batch of {len(batch)} krs numbers for scraping"
+            print(f"\r{message:<80}", end="", flush=True)
+            # Automation refreshes are sent to bulk lane, so they do not delay
+            # refreshes requested interactively through the API
+            response = requests.post(url_enqueue_jobs, json={
+                "krs_numbers": batch,
+                "queue_names": [queue_name],
+                "priority": "bulk"
+            })
+            response.raise_for_status()
+            jobs_enqueued += response.json()["jobs_enqueued"]
     print("")
-    log.info("KRS numbers were sent successfully")
+    return jobs_enqueued
+
+def enqueue_through_redis(
+        redis_url:str,
+        refresh_plan:dict[str, list[str]],
+        batch_size:int,
+        lease:Optional[LeaderLease]=None) -> int:
+    """
+    Enqueues jobs directly into redis queues, each batch of every job type
+    in single redis transaction. Jobs that are already queued, running or
+    have recently finished for the same KRS number are not enqueued again.
+    Returns number of jobs enqueued (not counting reused ones)
+    """
+    connection = Redis.from_url(redis_url)
+    queues = {
+        lane_name: Queue(lane_name, connection=connection)
+        for queue_name in QUEUE_NAMES
+        for lane_name in get_queue_lane_names(queue_name)
+    }
+    jobs_enqueued = 0
+    for queue_name, krs_numbers in refresh_plan.items():
+        for i in range(0, len(krs_numbers), batch_size):
+            if lease is not None:
+                lease.ensure_held()
+            batch = krs_numbers[i:i+batch_size]
+            message = f"[{queue_name} {i+len(batch)}/{len(krs_numbers)}] Enqueuing batch of {len(batch)} krs numbers for scraping"
+            print(f"\r{message:<80}", end="", flush=True)
+            results = enqueue_coalesced_jobs(
+                queues=queues,
+                queue_name=queue_name,
+                # Automation refreshes are sent to bulk lane, so they do not delay
+                # refreshes requested interactively through the API
+                priority="bulk",
+                krs_numbers=batch,
+                func=QUEUE_TASK_PATHS[queue_name])
+            jobs_enqueued += sum(1 for _, _, was_enqueued in results if was_enqueued)
+    print("")
+    return jobs_enqueued
+
+def check_for_updates(
+        api_url:str,
+        days_to_check:int=1,
+        batch_size:int=AUTOMATION_ENQUEUE_BATCH_SIZE,
+        enqueue_mode:Literal["redis", "api"]=AUTOMATION_ENQUEUE_MODE,
+        freshness_hours:int=AUTOMATION_REFRESH_FRESHNESS_HOURS,
+        lease:Optional[LeaderLease]=None):
+    """
+    Function that checks KRS API endpoint for updates in company registries and
+    enqueues refresh jobs, so that local repositories are updated with new data.
+    Only Biuletyn hours that were not processed by previous runs are fetched -
+    the last processed hour is stored in redis as watermark, which is moved
+    only after all changes were enqueued.
+
+    days_to_check - default = 1. How many days back from the current day to check
+    for updates, when there is no watermark yet (i.e. on the first run).
+
+    batch_size - default = AUTOMATION_ENQUEUE_BATCH_SIZE. How many KRS numbers are
+    enqueued in single redis transaction / API request.
+
+    enqueue_mode - default = AUTOMATION_ENQUEUE_MODE. With "redis" jobs are enqueued
+    directly into redis queues, with "api" they are sent to the business data api
+    batch enqueue endpoint.
+
+    freshness_hours - default = AUTOMATION_REFRESH_FRESHNESS_HOURS. Companies
+    refreshed less than freshness_hours ago are not refreshed again
+    (separately for KRS API extract and financial documents).
+
+    lease - default = None. Leader lease held by the caller. Run stops if the lease
+    is lost and watermark is stored only with its fencing token.
+    """
+    log.info("Initialising job")
+    connection = Redis.from_url(REDIS_URL)
+    watermark = load_biuletyn_watermark(connection)
+    windows = plan_biuletyn_windows(
+        watermark,
+        datetime.datetime.now(tz=BIULETYN_TIMEZONE),
+        days_to_check)
+    log.info(f"Biuletyn watermark: {watermark}, windows to fetch: {len(windows)}")
+    if not windows:
+        log.info("There are no new Biuletyn hours to check")
+        return 0
+    krs_numbers = sorted(gather_krs_numbers(windows))
+    if lease is not None:
+        lease.ensure_held()
+    # Companies refreshed recently (i.e. by user through the API) are skipped
+    refresh_plan = build_refresh_plan(
+        create_sync_sessionmaker(SOURCE_SYNC_PSQL_URL),
+        krs_numbers,
+        freshness_hours)
+    planned_jobs = sum(len(planned_krs_numbers) for planned_krs_numbers in refresh_plan.values())
+    log.info(f"Enqueuing {planned_jobs} refresh jobs for scraping (mode: {enqueue_mode})")
+    start = time.perf_counter()
+    if enqueue_mode == "redis":
+        jobs_enqueued = enqueue_through_redis(REDIS_URL, refresh_plan, batch_size, lease)
+    elif enqueue_mode == "api":
+        jobs_enqueued = enqueue_through_api(api_url, refresh_plan, batch_size, lease)
+    else:
+        raise ValueError(f"Unknown enqueue mode: {enqueue_mode}")
+    last_day, _, last_hour = windows[-1]
+    save_biuletyn_watermark(
+        connection,
+        datetime.datetime.combine(last_day, datetime.time(last_hour)),
+        lease.fencing_token if lease is not None else None)
+    log.info(
+        f"KRS numbers were enqueued successfully.\n"
+        f"Jobs enqueued: {jobs_enqueued}\n"
+        f"Jobs already queued or recently finished: {planned_jobs - jobs_enqueued}\n"
+        f"Enqueue time: {time.perf_counter() - start:.2f}s\n"
+        f"New Biuletyn watermark: {last_day} {last_hour}:00")
+    return jobs_enqueued
     
 
+def check_for_updates_as_leader(
+        api_url:str,
+        days_to_check:int=1,
+        **kwargs):
+    """
+    Runs check_for_updates only if this process is elected leader,
+    so that automation replicas never do the same work twice.
+    Replicas that have not acquired the lease skip the run
+    """
+    connection = Redis.from_url(REDIS_URL)
+    with LeaderLease(connection, "check_for_krs_updates") as lease:
+        if not lease.is_held:
+            log.info("Update check is being run by another automation replica - skipping")
+            return 0
+        return check_for_updates(api_url, days_to_check, lease=lease, **kwargs)
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Script checking for updates in KRS API and adding update jobs to business API")
     parser.add_argument("--api-url", 
-                        required=True, 
-                        help="Base API URL without endpoints")
+                        required=False, 
+                        help="Base API URL without endpoints (required with --enqueue-mode api)")
     parser.add_argument("--days", 
                         type=int,
                         default=1,
                         required=False, 
-                        help="How many days to check back from today (default: 1 - today only)")
+                        help="How many days to check back from today, when there is no watermark yet (default: 1 - today only)")
+    parser.add_argument("--batch-size",
+                        type=int,
+                        default=AUTOMATION_ENQUEUE_BATCH_SIZE,
+                        required=False,
+                        help=f"How many KRS numbers are enqueued at once (default: {AUTOMATION_ENQUEUE_BATCH_SIZE})")
+    parser.add_argument("--enqueue-mode",
+                        choices=["redis", "api"],
+                        default=AUTOMATION_ENQUEUE_MODE,
+                        required=False,
+                        help=f"Enqueue jobs directly into redis or through the API (default: {AUTOMATION_ENQUEUE_MODE})")
+    parser.add_argument("--freshness-hours",
+                        type=int,
+                        default=AUTOMATION_REFRESH_FRESHNESS_HOURS,
+                        required=False,
+                        help=f"Skip companies refreshed less than this many hours ago (default: {AUTOMATION_REFRESH_FRESHNESS_HOURS})")
     args = parser.parse_args()
-    check_for_updates(api_url=args.api_url, days_to_check=args.days)
\ No newline at end of file
+    if args.enqueue_mode == "api" and not args.api_url:
+        parser.error("--api-url is required with --enqueue-mode api")
+    check_for_updates_as_leader(
+        api_url=args.api_url,
+        days_to_check=args.days,
+        batch_size=args.batch_size,
+        enqueue_mode=args.enqueue_mode,
+        freshness_hours=args.freshness_hours)
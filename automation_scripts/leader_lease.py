@@ -0,0 +1,159 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Optional
+from redis import Redis
+
+from config import LOG_TO_POSTGRE_SQL, SOURCE_LOG_SYNC_PSQL_URL, AUTOMATION_LEASE_SECONDS
+from logging_utils import setup_logger
+
+log = setup_logger(
+    logger_name="krsapi_scheduler_log_leader_lease",
+    log_to_db=LOG_TO_POSTGRE_SQL,
+    log_to_db_url=SOURCE_LOG_SYNC_PSQL_URL
+)
+log.propagate = False
+
+# Lease is taken only if nobody holds it. Every successful acquisition
+# gets new, higher fencing token
+_ACQUIRE = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    local token = redis.call('INCR', KEYS[2])
+    redis.call('SET', KEYS[1], ARGV[1] .. ':' .. token, 'PX', ARGV[2])
+    return token
+end
+return false
+"""
+# Lease can be renewed and released only by its holder
+_RENEW = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class LeaseLostError(Exception):
+    """
+    Raised when process is no longer the lease holder
+    (lease could not be renewed before it expired)
+    """
+
+
+class LeaderLease:
+    """
+    Redis lease lock used for leader election between automation replicas.
+    Only the process holding the lease does the work, the rest skip the run.
+    While held, lease is renewed in background thread every third of its ttl.
+    Fencing token increases with every acquisition - writes guarded by the token
+    reject work of a holder that has lost the lease in the meantime.
+    """
+    def __init__(self, connection:Redis, name:str, lease_seconds:int=AUTOMATION_LEASE_SECONDS):
+        self.connection = connection
+        self.lease_key = f"business_data_api:leader_lease:{name}"
+        self.fencing_key = f"business_data_api:leader_lease_fencing_token:{name}"
+        self.lease_ms = lease_seconds * 1000
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4()}"
+        self.fencing_token:Optional[int] = None
+        # Monotonic time of the last acquisition or renewal request that succeeded,
+        # lease surely expires lease_ms after it
+        self._renewed_at:Optional[float] = None
+        self._lost = threading.Event()
+        self._stop_renewal = threading.Event()
+        self._renewal_thread:Optional[threading.Thread] = None
+
+    @property
+    def _lease_value(self) -> str:
+        return f"{self.owner}:{self.fencing_token}"
+
+    @property
+    def is_held(self) -> bool:
+        return (
+            self.fencing_token is not None
+            and not self._lost.is_set()
+            and not self._is_expired())
+
+    def _is_expired(self) -> bool:
+        return self._renewed_at is None or time.monotonic() - self._renewed_at >= self.lease_ms / 1000
+
+    def acquire(self) -> bool:
+        """
+        Tries to take the lease, does not wait if it is held by another process
+        """
+        requested_at = time.monotonic()
+        token = self.connection.eval(_ACQUIRE, 2, self.lease_key, self.fencing_key, self.owner, self.lease_ms)
+        if token is None:
+            return False
+        self.fencing_token = int(token)
+        self._renewed_at = requested_at
+        self._lost.clear()
+        self._stop_renewal.clear()
+        self._renewal_thread = threading.Thread(target=self._renew_loop, daemon=True)
+        self._renewal_thread.start()
+        log.info(f"Lease {self.lease_key} acquired with fencing token {self.fencing_token}")
+        return True
+
+    def renew(self) -> bool:
+        """
+        Extends the lease, returns False if it is no longer held by this process
+        """
+        requested_at = time.monotonic()
+        renewed = bool(self.connection.eval(_RENEW, 1, self.lease_key, self._lease_value, self.lease_ms))
+        if renewed:
+            self._renewed_at = requested_at
+        return renewed
+
+    def _renew_loop(self):
+        while not self._stop_renewal.wait(self.lease_ms / 1000 / 3):
+            try:
+                renewed = self.renew()
+            except Exception as e:
+                log.warning(f"Could not renew lease {self.lease_key}: {e}")
+                # Lease has expired in redis if it was not renewed for its whole ttl
+                if self._is_expired():
+                    log.error(f"Lease {self.lease_key} with fencing token {self.fencing_token} expired without renewal")
+                    self._lost.set()
+                    return
+                continue
+            if not renewed:
+                log.error(f"Lease {self.lease_key} with fencing token {self.fencing_token} was lost")
+                self._lost.set()
+                return
+
+    def ensure_held(self):
+        """
+        Raises LeaseLostError if lease is no longer held by this process.
+        Should be called before every step with side effects
+        """
+        if not self.is_held:
+            raise LeaseLostError(f"Lease {self.lease_key} is not held (fencing token {self.fencing_token})")
+
+    def release(self):
+        """
+        Stops renewal and gives the lease up, so another replica can take it
+        """
+        if self.fencing_token is None:
+            return
+        self._stop_renewal.set()
+        if self._renewal_thread is not None:
+            self._renewal_thread.join()
+        try:
+            self.connection.eval(_RELEASE, 1, self.lease_key, self._lease_value)
+        finally:
+            log.info(f"Lease {self.lease_key} with fencing token {self.fencing_token} released")
+            self.fencing_token = None
+
+    def __enter__(self) -> "LeaderLease":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
@@ -0,0 +1,143 @@
+import datetime
+from typing import Optional
+from sqlalchemy import select, literal, union_all, func, bindparam, case
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy import String
+
+from config import LOG_TO_POSTGRE_SQL, SOURCE_LOG_SYNC_PSQL_URL
+from logging_utils import setup_logger
+from business_data_api.db.models import (
+    RawKSRAPIFullExtract,
+    KRSDFDocuments,
+    JobHistory,
+    RefreshPlanHistory)
+from business_data_api.workers.queues import QUEUE_NAMES, get_lane_queue_names
+
+log = setup_logger(
+    logger_name="krsapi_scheduler_log_refresh_planner",
+    log_to_db=LOG_TO_POSTGRE_SQL,
+    log_to_db_url=SOURCE_LOG_SYNC_PSQL_URL
+)
+log.propagate = False
+
+
+def _as_utc(value:Optional[datetime.datetime]) -> Optional[datetime.datetime]:
+    """
+    Naive timestamps are stored in UTC
+    """
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=datetime.timezone.utc)
+
+def fetch_last_refresh_times(sessionmaker, krs_numbers:list[str]) -> dict[tuple[str, str], datetime.datetime]:
+    """
+    Returns time of the last successful refresh of every company for every
+    job type, as {(queue name, krs): refreshed at}. Companies that were never
+    refreshed are left out. Refresh time is the latest of:
+    - KRSAPI: current extract stored in raw_krs_api_full_extract
+    - KRSDF: document stored in krs_df_documents
+    - both: job that has finished successfully, from job_history
+    All of them are read with single query
+    """
+    if not krs_numbers:
+        return {}
+    krs_array = bindparam("krs_numbers", value=list(krs_numbers), type_=ARRAY(String))
+    # job_history stores names of priority lanes, which are mapped back to job types
+    job_queue_name = case(get_lane_queue_names(), value=JobHistory.queue_name, else_=JobHistory.queue_name)
+    stmt = union_all(
+        select(
+            literal("KRSAPI").label("queue_name"),
+            RawKSRAPIFullExtract.krs_number.label("krs_number"),
+            func.max(RawKSRAPIFullExtract.record_created_at).label("refreshed_at"))
+        .where(
+            RawKSRAPIFullExtract.krs_number==func.any(krs_array),
+            RawKSRAPIFullExtract.is_current==True)
+        .group_by(RawKSRAPIFullExtract.krs_number),
+        select(
+            literal("KRSDF").label("queue_name"),
+            KRSDFDocuments.krs_number.label("krs_number"),
+            func.max(KRSDFDocuments.record_created_at).label("refreshed_at"))
+        .where(KRSDFDocuments.krs_number==func.any(krs_array))
+        .group_by(KRSDFDocuments.krs_number),
+        select(
+            job_queue_name.label("queue_name"),
+            JobHistory.krs_number.label("krs_number"),
+            func.max(JobHistory.ended_at).label("refreshed_at"))
+        .where(
+            JobHistory.krs_number==func.any(krs_array),
+            JobHistory.job_status=="finished")
+        .group_by(job_queue_name, JobHistory.krs_number),
+    )
+    with sessionmaker() as session:
+        rows = session.execute(stmt).all()
+    last_refresh_times = {}
+    for row in rows:
+        refreshed_at = _as_utc(row.refreshed_at)
+        key = (row.queue_name, row.krs_number)
+        if refreshed_at is not None and (key not in last_refresh_times or refreshed_at > last_refresh_times[key]):
+            last_refresh_times[key] = refreshed_at
+    return last_refresh_times
+
+def plan_refreshes(
+        krs_numbers:list[str],
+        last_refresh_times:dict[tuple[str, str], datetime.datetime],
+        now:datetime.datetime,
+        freshness_hours:int) -> tuple[dict[str, list[str]], dict[str, int]]:
+    """
+    Leaves out companies that were refreshed less than freshness_hours ago,
+    separately for every job type.
+    Returns tuple of ({queue name: krs numbers to refresh}, {queue name: skipped count})
+    """
+    refreshed_after = now - datetime.timedelta(hours=freshness_hours)
+    planned = {queue_name: [] for queue_name in QUEUE_NAMES}
+    skipped = {queue_name: 0 for queue_name in QUEUE_NAMES}
+    for queue_name in QUEUE_NAMES:
+        for krs in krs_numbers:
+            refreshed_at = last_refresh_times.get((queue_name, krs))
+            if refreshed_at is not None and refreshed_at > refreshed_after:
+                skipped[queue_name] += 1
+            else:
+                planned[queue_name].append(krs)
+    return planned, skipped
+
+def save_refresh_plan(
+        sessionmaker,
+        krs_checked:int,
+        planned:dict[str, list[str]],
+        skipped:dict[str, int],
+        freshness_hours:int):
+    """
+    Stores size of the refresh plan, so that savings can be tracked over time
+    """
+    with sessionmaker() as session:
+        session.add(RefreshPlanHistory(
+            krs_checked=krs_checked,
+            freshness_hours=freshness_hours,
+            krsapi_planned=len(planned["KRSAPI"]),
+            krsapi_skipped=skipped["KRSAPI"],
+            krsdf_planned=len(planned["KRSDF"]),
+            krsdf_skipped=skipped["KRSDF"]))
+        session.commit()
+
+def build_refresh_plan(
+        sessionmaker,
+        krs_numbers:list[str],
+        freshness_hours:int) -> dict[str, list[str]]:
+    """
+    Plans refreshes of changed companies and records plan size.
+    Returns {queue name: krs numbers to refresh}
+    """
+    last_refresh_times = fetch_last_refresh_times(sessionmaker, krs_numbers)
+    planned, skipped = plan_refreshes(
+        krs_numbers,
+        last_refresh_times,
+        datetime.datetime.now(datetime.timezone.utc),
+        freshness_hours)
+    log.info(
+        f"Refresh plan for {len(krs_numbers)} changed companies "
+        f"(freshness window {freshness_hours}h).\n"
+        + "\n".join(
+            f"{queue_name}: {len(planned[queue_name])} planned, {skipped[queue_name]} skipped"
+            for queue_name in QUEUE_NAMES))
+    save_refresh_plan(sessionmaker, len(krs_numbers), planned, skipped, freshness_hours)
+    return planned
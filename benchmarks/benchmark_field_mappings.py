@@ -0,0 +1,105 @@
+"""
+Benchmark of declarative field mappings of KRS API extract.
+Compares mappings compiled into accessors (used by ETL, spark stream
+and parquet export) with reading every field path by path.
+
+Usage:
+    poetry run python benchmarks/benchmark_field_mappings.py \
+        --extract-file extract.json --extracts 20000
+"""
+import argparse
+import copy
+import json
+import time
+
+from benchmark_krs_api_etl import synthetic_extract
+from business_data_api.etl.field_mappings import (
+    COERCIONS,
+    current_entries,
+    get_path,
+    is_empty)
+from business_data_api.etl.krs_api_mappings import (
+    COMPANY_TABLE_MAPPINGS,
+    EXPORT_MAPPINGS,
+    map_company_tables,
+    map_export_datasets)
+
+
+def _interpret_source(source, item, root):
+    if isinstance(source, tuple):
+        return get_path(item, source)
+    if "root" in source:
+        return get_path(root, source["root"])
+    texts = [COERCIONS["text"](_interpret_source(part, item, root)) for part in source["concat"]]
+    return source["separator"].join(text for text in texts if text) or None
+
+def interpret_mappings(mappings:dict, extract:dict, identity:dict) -> dict[str, list[dict]]:
+    """
+    Applies mappings without compiling them - paths are read
+    key by key on every call (baseline of the benchmark)
+    """
+    rows = {}
+    for table, mapping in mappings.items():
+        items = [(extract, None)]
+        if "explode" in mapping:
+            items = []
+            for spec in mapping["explode"]:
+                for path in spec["paths"]:
+                    parent = get_path(extract, path[:-1])
+                    found = current_entries(parent.get(path[-1])) if isinstance(parent, dict) else []
+                    if found:
+                        break
+                items.extend((item, spec["constants"]) for item in found)
+        rows[table] = []
+        for position, (item, constants) in enumerate(items):
+            row = dict(identity)
+            if constants is not None:
+                row["position"] = position
+                row.update(constants)
+            for name, spec in mapping["fields"].items():
+                value = None
+                for source in spec["sources"]:
+                    value = _interpret_source(source, item, extract)
+                    if not is_empty(value):
+                        break
+                row[name] = COERCIONS[spec["type"]](value)
+            rows[table].append(row)
+    return rows
+
+def _measure(name:str, map_extract, extracts:list[tuple[int, str, dict]]):
+    rows_mapped = 0
+    start = time.perf_counter()
+    for extract_id, krs, extract in extracts:
+        rows = map_extract(extract, {"krs_number": krs, "extract_id": extract_id})
+        rows_mapped += sum(len(table_rows) for table_rows in rows.values())
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<28} {elapsed:7.2f} s  {len(extracts) / elapsed:10.1f} extracts/s"
+        f"  {rows_mapped / elapsed:10.1f} records/s")
+
+def run_benchmark(extract:dict, total_extracts:int):
+    # Extracts are deep copied so they do not share cached objects,
+    # as extracts decoded from database rows would not
+    extracts = [(i, f"{i:010}", copy.deepcopy(extract)) for i in range(total_extracts)]
+    print(f"Extracts: {total_extracts}")
+    _measure("company tables (compiled)", map_company_tables, extracts)
+    _measure("company tables (paths)", lambda e, i: interpret_mappings(COMPANY_TABLE_MAPPINGS, e, i), extracts)
+    _measure("export datasets (compiled)", map_export_datasets, extracts)
+    _measure("export datasets (paths)", lambda e, i: interpret_mappings(EXPORT_MAPPINGS, e, i), extracts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark of KRS API extract field mappings")
+    parser.add_argument("--extract-file",
+                        help="JSON file with KRS API extract to use (default: synthetic extract)")
+    parser.add_argument("--extracts",
+                        type=int,
+                        default=10000,
+                        help="Number of extracts to map (default: 10000)")
+    args = parser.parse_args()
+    if args.extract_file:
+        with open(args.extract_file, encoding="utf-8") as file:
+            extract = json.load(file)
+    else:
+        extract = synthetic_extract()
+    run_benchmark(extract, args.extracts)
@@ -0,0 +1,87 @@
+"""
+Benchmark of parsing XML financial statements into financial facts.
+Measures only parsing (no database), in single process and with pool
+of processes as used by financial-facts backfill.
+
+Usage:
+    poetry run python benchmarks/benchmark_financial_statements.py \
+        --statement-file statement.xml --documents 2000 --processes 8
+"""
+import argparse
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from business_data_api.etl.financial_statements import parse_document
+
+
+def synthetic_statement(notes_kb:int=200) -> bytes:
+    """
+    Returns statement shaped like e-sprawozdania JednostkaInna schema,
+    with nested balance sheet line items and notes of notes_kb kilobytes
+    (notes make up most of the size of real statements)
+    """
+    def line_items(prefix:str, depth:int) -> str:
+        if depth == 0:
+            return ""
+        return "".join(
+            f"<{prefix}_{i}><KwotaA>{i * 1000}.00</KwotaA><KwotaB>{i * 900}.00</KwotaB>"
+            f"{line_items(f'{prefix}_{i}', depth - 1)}</{prefix}_{i}>"
+            for i in range(1, 5))
+    profit_and_loss = "".join(
+        f"<{chr(65 + i)}><KwotaA>{i * 100}.00</KwotaA><KwotaB>{i * 90}.00</KwotaB></{chr(65 + i)}>"
+        for i in range(12))
+    notes = "".join(
+        f"<Pozycja><Opis>{'OPIS POZYCJI ' * 5}</Opis><KwotaA>1.00</KwotaA></Pozycja>"
+        for _ in range(notes_kb * 1024 // 110))
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<JednostkaInna xmlns="http://www.mf.gov.pl/schematy/SF/DefinicjeTypySprawozdaniaFinansowe/2018/07/09/JednostkaInnaWZlotych">'
+        f"<Bilans><Aktywa><KwotaA>1.00</KwotaA><KwotaB>1.00</KwotaB>{line_items('Aktywa', 3)}</Aktywa>"
+        f"<Pasywa><KwotaA>1.00</KwotaA><KwotaB>1.00</KwotaB>{line_items('Pasywa', 3)}</Pasywa></Bilans>"
+        f"<RZiS><RZiSPor>{profit_and_loss}</RZiSPor></RZiS>"
+        f"<DodatkoweInformacjeIObjasnienia>{notes}</DodatkoweInformacjeIObjasnienia>"
+        "</JednostkaInna>"
+    ).encode("utf-8")
+
+def _report(name:str, results:list[dict], elapsed:float):
+    documents_bytes = sum(result["content_bytes"] for result in results)
+    facts = sum(len(result["facts"]) for result in results)
+    print(
+        f"{name:<22} {elapsed:7.2f} s  {len(results) / elapsed:9.1f} documents/s"
+        f"  {documents_bytes / 2**20 / elapsed:8.2f} MB/s  {facts / elapsed:10.1f} facts/s")
+
+def run_benchmark(statement:bytes, total_documents:int, processes:int):
+    documents = [(f"{i:064}", f"{i:010}", "xml", statement) for i in range(total_documents)]
+    print(f"Documents: {total_documents} x {len(statement) / 1024:.1f} KB")
+    start = time.perf_counter()
+    results = [parse_document(document) for document in documents]
+    _report("single process", results, time.perf_counter() - start)
+    # Peak memory of single process parsing (kilobytes on linux)
+    print(f"Peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB")
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        start = time.perf_counter()
+        results = list(executor.map(parse_document, documents, chunksize=max(1, total_documents // (processes * 4))))
+        _report(f"{processes} processes", results, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark of XML financial statement parsing")
+    parser.add_argument("--statement-file",
+                        help="XML financial statement to use (default: synthetic statement)")
+    parser.add_argument("--documents",
+                        type=int,
+                        default=1000,
+                        help="Number of documents to parse (default: 1000)")
+    parser.add_argument("--processes",
+                        type=int,
+                        default=os.cpu_count(),
+                        help="Number of processes of the pool (default: number of CPUs)")
+    args = parser.parse_args()
+    if args.statement_file:
+        with open(args.statement_file, "rb") as file:
+            statement = file.read()
+    else:
+        statement = synthetic_statement()
+    run_benchmark(statement, args.documents, args.processes)
@@ -0,0 +1,102 @@
+"""
+Benchmark of flattening KRS API extracts into company table rows.
+Measures only the transformation (no database), so it shows the upper
+bound of incremental ETL throughput. End to end throughput is reported
+by `run_etl.py --once`.
+
+Usage:
+    poetry run python benchmarks/benchmark_krs_api_etl.py \
+        --extract-file extract.json --extracts 20000 --batch-size 1000
+"""
+import argparse
+import copy
+import json
+import time
+
+from business_data_api.etl.krs_api_extracts import flatten_extracts
+
+
+def synthetic_extract(members:int=5, activities:int=10) -> dict:
+    """
+    Returns extract shaped like full ("pelny") KRS API extract,
+    with history of some of the values
+    """
+    def entry(key, value, removed=False):
+        return {key: value, "nrWpisuWprow": "1", **({"nrWpisuWykr": "2"} if removed else {})}
+    return {
+        "odpis": {
+            "naglowekP": {"rejestr": "RejP", "stanZDnia": "01.01.2025"},
+            "dane": {
+                "dzial1": {
+                    "danePodmiotu": {
+                        "nazwa": [entry("nazwa", "STARA NAZWA", removed=True), entry("nazwa", "SPÓŁKA SP. Z O.O.")],
+                        "formaPrawna": [entry("formaPrawna", "SPÓŁKA Z OGRANICZONĄ ODPOWIEDZIALNOŚCIĄ")],
+                        "identyfikatory": [entry("identyfikatory", {"nip": "1234567890", "regon": "123456789"})],
+                    },
+                    "siedzibaIAdres": {
+                        "siedziba": [entry("siedziba", {"kraj": "POLSKA", "wojewodztwo": "MAZOWIECKIE", "powiat": "WARSZAWA", "gmina": "WARSZAWA"})],
+                        "adres": [entry("adres", {"ulica": "UL. TESTOWA", "nrDomu": "1", "miejscowosc": "WARSZAWA", "kodPocztowy": "00-001", "kraj": "POLSKA"})],
+                    },
+                },
+                "dzial2": {
+                    "reprezentacja": {
+                        "nazwaOrganu": [entry("nazwaOrganu", "ZARZĄD")],
+                        "sklad": [
+                            {
+                                "nazwisko": [entry("nazwiskoICzlon", f"NAZWISKO {i}")],
+                                "imiona": [entry("imiona", {"imie": "JAN", "imieDrugie": "ADAM"})],
+                                "funkcjaWOrganie": [entry("funkcjaWOrganie", "CZŁONEK ZARZĄDU")],
+                                "nrWpisuWprow": "1",
+                            }
+                            for i in range(members)],
+                    },
+                },
+                "dzial3": {
+                    "przedmiotDzialalnosci": {
+                        "przedmiotPrzewazajacejDzialalnosci": [
+                            {"opis": "DZIAŁALNOŚĆ", "kodDzial": "62", "kodKlasa": "01", "kodPodklasa": "Z", "nrWpisuWprow": "1"}],
+                        "przedmiotPozostalejDzialalnosci": [
+                            {"opis": f"DZIAŁALNOŚĆ {i}", "kodDzial": "62", "kodKlasa": f"{i:02}", "kodPodklasa": "Z", "nrWpisuWprow": "1"}
+                            for i in range(activities)],
+                    },
+                },
+                "dzial4": {}, "dzial5": {}, "dzial6": {},
+            },
+        }
+    }
+
+def run_benchmark(extract:dict, total_extracts:int, batch_size:int):
+    # Extracts are deep copied so they do not share cached objects,
+    # as extracts decoded from database rows would not
+    extracts = [(i, f"{i:010}", copy.deepcopy(extract)) for i in range(total_extracts)]
+    rows_flattened = 0
+    start = time.perf_counter()
+    for i in range(0, len(extracts), batch_size):
+        rows = flatten_extracts(extracts[i:i+batch_size])
+        rows_flattened += sum(len(table_rows) for table_rows in rows.values())
+    elapsed = time.perf_counter() - start
+    print(f"Extracts:      {total_extracts} (batches of {batch_size})")
+    print(f"Rows:          {rows_flattened} ({rows_flattened / total_extracts:.1f} per extract)")
+    print(f"Elapsed:       {elapsed:.2f} s")
+    print(f"Throughput:    {total_extracts / elapsed:.1f} extracts/s, {rows_flattened / elapsed:.1f} rows/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark of KRS API extract flattening")
+    parser.add_argument("--extract-file",
+                        help="JSON file with KRS API extract to use (default: synthetic extract)")
+    parser.add_argument("--extracts",
+                        type=int,
+                        default=10000,
+                        help="Number of extracts to flatten (default: 10000)")
+    parser.add_argument("--batch-size",
+                        type=int,
+                        default=1000,
+                        help="Extracts per batch (default: 1000)")
+    args = parser.parse_args()
+    if args.extract_file:
+        with open(args.extract_file, encoding="utf-8") as file:
+            extract = json.load(file)
+    else:
+        extract = synthetic_extract()
+    run_benchmark(extract, args.extracts, args.batch_size)
@@ -0,0 +1,103 @@
+"""
+Micro-batch throughput benchmark of the Spark KRS API stream.
+Writes synthetic Debezium events into files, runs the stream in local mode
+with the file source stand-in until all events are processed and reports
+duration and throughput of every micro-batch.
+Run it with different number of local cores and micro-batch sizes, i.e.
+local[1], local[2], local[4], to see how throughput scales per core before
+setting SPARK_EXECUTOR_CORES / SPARK_EXECUTOR_MEMORY of the cluster.
+
+Usage:
+    poetry run python benchmarks/benchmark_spark_micro_batch.py \
+        --master "local[4]" --extracts 20000 --files 40 --max-files-per-trigger 10
+"""
+import argparse
+import os
+import tempfile
+
+from benchmark_krs_api_etl import synthetic_extract
+from spark_etl.spark_stream_krs_api import build_debezium_event, run_krs_api_stream
+
+
+def write_event_files(directory:str, total_extracts:int, files:int):
+    """
+    Splits events of total_extracts synthetic extracts into files,
+    one event per line
+    """
+    extract = synthetic_extract()
+    per_file = -(-total_extracts // files)
+    for file_number in range(files):
+        first_id = file_number * per_file
+        with open(os.path.join(directory, f"events-{file_number:05}.json"), "w", encoding="utf-8") as file:
+            for extract_id in range(first_id, min(first_id + per_file, total_extracts)):
+                file.write(build_debezium_event(extract_id + 1, f"{extract_id:010}", extract) + "\n")
+
+def run_benchmark(
+        master:str,
+        total_extracts:int,
+        files:int,
+        max_files_per_trigger:int,
+        partitions:int,
+        sink:str):
+    with tempfile.TemporaryDirectory() as work_dir:
+        input_dir = os.path.join(work_dir, "input")
+        os.makedirs(input_dir)
+        write_event_files(input_dir, total_extracts, files)
+        query = run_krs_api_stream(
+            master=master,
+            source="file",
+            sink=sink,
+            max_offsets_per_trigger=max_files_per_trigger,
+            partitions=partitions,
+            checkpoint_path=os.path.join(work_dir, "checkpoint"),
+            file_source_path=input_dir,
+            available_now=True,
+            await_termination=False)
+        query.awaitTermination()
+        progress = [p for p in query.recentProgress if p["numInputRows"] > 0]
+    print(f"Master:        {master} ({partitions} partitions, sink {sink})")
+    print(f"Micro-batch:   up to {max_files_per_trigger} files of {-(-total_extracts // files)} events")
+    total_seconds = 0.0
+    total_events = 0
+    for p in progress:
+        seconds = p["durationMs"]["triggerExecution"] / 1000
+        total_seconds += seconds
+        total_events += p["numInputRows"]
+        print(f"  batch {p['batchId']:>4}: {p['numInputRows']:>7} events in {seconds:6.2f}s ({p['numInputRows'] / seconds:8.1f} events/s)")
+    if total_seconds:
+        print(f"Throughput:    {total_events / total_seconds:.1f} events/s over {len(progress)} micro-batches")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-batch throughput benchmark of KRS API spark stream")
+    parser.add_argument("--master",
+                        default="local[*]",
+                        help="Spark master (default: local[*])")
+    parser.add_argument("--extracts",
+                        type=int,
+                        default=20000,
+                        help="Number of extract events (default: 20000)")
+    parser.add_argument("--files",
+                        type=int,
+                        default=40,
+                        help="Number of files events are split into (default: 40)")
+    parser.add_argument("--max-files-per-trigger",
+                        type=int,
+                        default=10,
+                        help="Files read by single micro-batch (default: 10)")
+    parser.add_argument("--partitions",
+                        type=int,
+                        default=8,
+                        help="Partitions of micro-batch (default: 8)")
+    parser.add_argument("--sink",
+                        choices=["noop", "jdbc"],
+                        default="noop",
+                        help="noop - only transform, jdbc - also write into sink database (default: noop)")
+    args = parser.parse_args()
+    run_benchmark(
+        master=args.master,
+        total_extracts=args.extracts,
+        files=args.files,
+        max_files_per_trigger=args.max_files_per_trigger,
+        partitions=args.partitions,
+        sink=args.sink)
@@ -0,0 +1,91 @@
+"""
+Load test of job status polling.
+Sends requests to job status endpoint from many concurrent clients
+and reports latency percentiles and throughput.
+
+Usage:
+    poetry run python benchmarks/load_test_job_status.py \
+        --api-url localhost:8078 --job-id <job id> --concurrency 200 --requests 20000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+
+
+def percentile(sorted_values:list[float], pct:float) -> float:
+    """
+    Returns percentile of already sorted values (nearest rank method)
+    """
+    if not sorted_values:
+        return float("nan")
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+async def poll(
+        client:httpx.AsyncClient,
+        urls:list[str],
+        requests_per_client:int,
+        latencies:list[float],
+        errors:list[int]):
+    for i in range(requests_per_client):
+        url = urls[i % len(urls)]
+        start = time.perf_counter()
+        response = await client.get(url)
+        latencies.append(time.perf_counter() - start)
+        if response.status_code >= 500:
+            errors.append(response.status_code)
+
+async def run_load_test(
+        api_url:str,
+        job_ids:list[str],
+        endpoint:str,
+        concurrency:int,
+        total_requests:int):
+    urls = [f"http://{api_url}{endpoint}/{job_id}" for job_id in job_ids]
+    latencies:list[float] = []
+    errors:list[int] = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            poll(client, urls, total_requests // concurrency, latencies, errors)
+            for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    print(f"Requests:      {len(latencies)} ({len(errors)} server errors)")
+    print(f"Concurrency:   {concurrency}")
+    print(f"Throughput:    {len(latencies) / elapsed:.1f} req/s")
+    print(f"Latency mean:  {statistics.mean(latencies) * 1000:.1f} ms")
+    for pct in (50, 95, 99):
+        print(f"Latency p{pct}:   {percentile(latencies, pct) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test of job status polling endpoints")
+    parser.add_argument("--api-url",
+                        required=True,
+                        help="Base API URL without endpoints, i.e. localhost:8078")
+    parser.add_argument("--job-id",
+                        action="append",
+                        required=True,
+                        help="Job id to poll, can be provided multiple times")
+    parser.add_argument("--endpoint",
+                        default="/krs-api/update-business-information-job-status",
+                        help="Job status endpoint (default: KRS API job status)")
+    parser.add_argument("--concurrency",
+                        type=int,
+                        default=100,
+                        help="Number of concurrent clients (default: 100)")
+    parser.add_argument("--requests",
+                        type=int,
+                        default=10000,
+                        help="Total number of requests (default: 10000)")
+    args = parser.parse_args()
+    asyncio.run(run_load_test(
+        api_url=args.api_url,
+        job_ids=args.job_id,
+        endpoint=args.endpoint,
+        concurrency=args.concurrency,
+        total_requests=args.requests))
@@ -1,7 +1,10 @@
+from anyio import CapacityLimiter
 from fastapi import FastAPI
 from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
 from redis.exceptions import ConnectionError
 from rq import Queue
+from prometheus_client import CollectorRegistry
 from dotenv import load_dotenv
 from sqlalchemy import text
 
@@ -10,14 +13,20 @@ from config import (
     LOG_TO_POSTGRE_SQL, 
     SOURCE_LOG_SYNC_PSQL_URL,
     SOURCE_ASYNC_PSQL_URL,
-    SOURCE_SYNC_PSQL_URL)
+    SOURCE_SYNC_PSQL_URL,
+    API_REDIS_THREADPOOL_SIZE)
 # from business_data_api.utils.logger import setup_logger
 from logging_utils import setup_logger
 from business_data_api.api.routes.root.root import router as root_router
 from business_data_api.api.routes.krs_api_services.krs_api import router as krs_api_router
 from business_data_api.api.routes.krs_dokumenty_finansowe_services.krs_dokumenty_finansowe import router as krs_df_router
+from business_data_api.api.routes.jobs_services.jobs import router as jobs_router
+from business_data_api.api.routes.metrics.metrics import router as metrics_router
+from business_data_api.api.request_metrics import record_request_metrics
 from business_data_api.api.routes.exception_handlers.handlers import global_exception_handler
 from business_data_api.db import create_async_sessionmaker, create_tables
+from business_data_api.workers.queues import QUEUE_NAMES, get_queue_lane_names
+from business_data_api.metrics import QueueDepthCollector
 
 def create_app(testing:bool = False) -> FastAPI:
     """ 
@@ -55,11 +64,19 @@ def create_app(testing:bool = False) -> FastAPI:
             f"Connection attempt to Redis has failed. "
             f"Redis URL {redis_url}")
         raise e
+    # Route handlers are async - plain redis commands go through async client,
+    # rq calls (which require sync client) run in bounded thread pool
+    app.state.async_redis = AsyncRedis.from_url(redis_url)
+    app.state.redis_limiter = CapacityLimiter(API_REDIS_THREADPOOL_SIZE)
     api_log.debug("Setting up Redis queues")
     app.state.queues = {
-        "KRSDF": Queue("KRSDF", connection=app.state.redis),
-        "KRSAPI": Queue("KRSAPI", connection=app.state.redis)
+        lane_name: Queue(lane_name, connection=app.state.redis)
+        for queue_name in QUEUE_NAMES
+        for lane_name in get_queue_lane_names(queue_name)
     }
+    # Metrics of this app instance, rendered together with process wide metrics
+    app.state.metrics_registry = CollectorRegistry()
+    app.state.metrics_registry.register(QueueDepthCollector(app.state.redis, app.state.queues))
     api_log.debug("Creating missing tables")
     create_tables(psql_sync_url)
     api_log.debug("Setting up PostgreSQL async session")
@@ -67,10 +84,13 @@ def create_app(testing:bool = False) -> FastAPI:
 
     api_log.debug(f"Registering exception handlers")
     app.add_exception_handler(Exception, global_exception_handler)
+    app.middleware("http")(record_request_metrics)
     api_log.debug("Registering API blueprints")
     app.include_router(root_router, prefix="/data")
     app.include_router(krs_api_router, prefix="/krs-api")
     app.include_router(krs_df_router, prefix="/krs-df")
+    app.include_router(jobs_router, prefix="/jobs")
+    app.include_router(metrics_router)
 
     api_log.info(f"Fast API was successfully intialised")
     return app
@@ -0,0 +1,116 @@
+import json
+import time
+from typing import AsyncIterator, Optional
+from fastapi import Request
+
+from config import API_JOB_EVENTS_KEEPALIVE_SECONDS
+from business_data_api.api.jobs import fetch_job_statuses, fetch_archived_job_statuses
+from business_data_api.api.models import CompactJobStatus
+from business_data_api.api.redis_calls import run_redis_call
+from business_data_api.workers.events import JOB_EVENTS_CHANNEL, FINAL_JOB_STATUSES
+from business_data_api.workers.queues import QUEUE_NAMES, get_coalesce_key
+
+
+def format_sse_event(event:dict, event_type:str="job_status") -> str:
+    """
+    Formats event as server-sent event message
+    """
+    return f"event: {event_type}\ndata: {json.dumps(event)}\n\n"
+
+def is_tracked_event(event:dict, job_ids:set[str], krs_numbers:set[str]) -> bool:
+    """
+    Checks if event concerns one of the jobs or KRS numbers client is subscribed to
+    """
+    return event.get("job_id") in job_ids or event.get("krs") in krs_numbers
+
+def is_final_status(job_status:Optional[str]) -> bool:
+    """
+    Checks if job will not change its status anymore
+    """
+    return job_status in {status.value for status in FINAL_JOB_STATUSES}
+
+def format_archived_job_events(
+        missing_job_ids:list[str],
+        archived_job_statuses:list[CompactJobStatus]) -> list[str]:
+    """
+    Returns events of jobs that are no longer stored in redis - final status
+    of archived jobs and job_not_found event of jobs that were not archived either
+    """
+    archived_job_ids = {job_status.job_id for job_status in archived_job_statuses}
+    return [
+        format_sse_event(job_status.model_dump(mode="json"))
+        for job_status in archived_job_statuses
+    ] + [
+        format_sse_event({"job_id": job_id}, event_type="job_not_found")
+        for job_id in missing_job_ids
+        if job_id not in archived_job_ids
+    ]
+
+async def _get_current_job_ids(request:Request, krs_numbers:set[str]) -> list[str]:
+    """
+    Returns ids of the last jobs enqueued for provided KRS numbers
+    """
+    if not krs_numbers:
+        return []
+    coalesce_keys = [
+        get_coalesce_key(queue_name, krs)
+        for krs in krs_numbers
+        for queue_name in QUEUE_NAMES
+    ]
+    job_ids = await request.app.state.async_redis.mget(coalesce_keys)
+    return [job_id.decode() for job_id in job_ids if job_id]
+
+async def stream_job_events(
+        request:Request,
+        job_ids:set[str],
+        krs_numbers:set[str]) -> AsyncIterator[str]:
+    """
+    Streams status transitions of tracked jobs as server-sent events.
+    Current status of every tracked job is sent first, jobs that are
+    no longer stored in redis are looked up in job history archive.
+    If only job ids are tracked, stream ends once all of them reach final status,
+    otherwise it lasts until client disconnects.
+    """
+    pending_job_ids = set(job_ids)
+    pubsub = request.app.state.async_redis.pubsub()
+    # Subscribing before reading current statuses, so that
+    # transition happening in between is not lost
+    await pubsub.subscribe(JOB_EVENTS_CHANNEL)
+    try:
+        snapshot_job_ids = list(dict.fromkeys(
+            list(job_ids) + await _get_current_job_ids(request, krs_numbers)))
+        job_statuses, missing_job_ids = await run_redis_call(
+            request,
+            fetch_job_statuses,
+            request.app.state.redis,
+            snapshot_job_ids)
+        for job_status in job_statuses:
+            yield format_sse_event(job_status.model_dump(mode="json"))
+            if is_final_status(job_status.job_status):
+                pending_job_ids.discard(job_status.job_id)
+        # Jobs that are no longer stored in redis have already ended
+        archived_job_statuses = await fetch_archived_job_statuses(
+            request.app.state.psql_async_sessionmaker,
+            missing_job_ids)
+        for message in format_archived_job_events(missing_job_ids, archived_job_statuses):
+            yield message
+        pending_job_ids.difference_update(missing_job_ids)
+        last_message_at = time.monotonic()
+        while (pending_job_ids or krs_numbers) and not await request.is_disconnected():
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            if message is None:
+                # Comment line keeps connection open through proxies
+                if time.monotonic() - last_message_at >= API_JOB_EVENTS_KEEPALIVE_SECONDS:
+                    last_message_at = time.monotonic()
+                    yield ": keepalive\n\n"
+                continue
+            event = json.loads(message["data"])
+            if not is_tracked_event(event, job_ids, krs_numbers):
+                continue
+            last_message_at = time.monotonic()
+            yield format_sse_event(event)
+            if is_final_status(event.get("job_status")):
+                pending_job_ids.discard(event["job_id"])
+    finally:
+        await pubsub.unsubscribe(JOB_EVENTS_CHANNEL)
+        await pubsub.aclose()
@@ -0,0 +1,151 @@
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+from redis import Redis
+from sqlalchemy import select
+from rq.job import Job
+from rq.exceptions import NoSuchJobError
+
+from business_data_api.api.models import JobStatus, CompactJobStatus
+from business_data_api.db.models import JobHistory
+from business_data_api.workers.retries import (
+    THROTTLE_RETRIES_META_KEY,
+    THROTTLE_REASON_META_KEY,
+    THROTTLE_NEXT_RETRY_AT_META_KEY)
+
+
+def job_status_from_rq_job(job:Job) -> JobStatus:
+    """
+    Builds job status response from job stored in redis
+    """
+    return JobStatus(
+        job_id=job.id,
+        job_status=job.get_status(),
+        job_enqueued_at=job.enqueued_at,
+        job_started_at=job.started_at,
+        job_ended_at=job.ended_at,
+        job_result=job.result,
+        job_exc_info=job.exc_info,
+        job_throttle_retries=job.meta.get(THROTTLE_RETRIES_META_KEY, 0),
+        job_throttle_reason=job.meta.get(THROTTLE_REASON_META_KEY),
+        job_next_retry_at=job.meta.get(THROTTLE_NEXT_RETRY_AT_META_KEY),)
+
+def fetch_job_status(connection:Redis, job_id:str) -> Optional[JobStatus]:
+    """
+    Fetches job from redis and builds its status response.
+    Returns None if job is not stored in redis.
+    It is blocking function - API should run it in redis thread pool
+    """
+    try:
+        job = Job.fetch(job_id, connection=connection)
+    except NoSuchJobError:
+        return None
+    return job_status_from_rq_job(job)
+
+def job_status_from_job_history(job:JobHistory) -> JobStatus:
+    """
+    Builds job status response from job archived in job history table
+    """
+    return JobStatus(
+        job_id=job.job_id,
+        job_status=job.job_status,
+        job_enqueued_at=job.enqueued_at,
+        job_started_at=job.started_at,
+        job_ended_at=job.ended_at,
+        job_result=job.rows_written,
+        job_exc_info=(
+            f"{job.error_type}: {job.error_message}"
+            if job.error_type else None),
+        job_throttle_retries=job.throttle_retries or 0,)
+
+async def fetch_archived_job_status(psql_async_sessionmaker, job_id:str) -> Optional[JobStatus]:
+    """
+    Returns status of job that is no longer stored in redis,
+    or None if job was not archived either
+    """
+    async with psql_async_sessionmaker() as session:
+        job = await session.get(JobHistory, job_id)
+    if job is None:
+        return None
+    return job_status_from_job_history(job)
+
+def _as_utc(value:Optional[datetime]) -> Optional[datetime]:
+    """
+    Naive datetimes are treated as UTC, so that they can be
+    compared with timezone aware ones
+    """
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=timezone.utc)
+
+def get_job_changed_at(*timestamps:Optional[datetime]) -> Optional[datetime]:
+    """
+    Returns the latest of job lifecycle timestamps - the moment
+    of the last job status change
+    """
+    timestamps = [_as_utc(timestamp) for timestamp in timestamps if timestamp is not None]
+    return max(timestamps) if timestamps else None
+
+def compact_job_status_from_rq_job(job:Job) -> CompactJobStatus:
+    """
+    Builds compact job status record from job stored in redis.
+    Unlike job_status_from_rq_job it does not read job result,
+    which would take another redis round trip for each job
+    """
+    return CompactJobStatus(
+        job_id=job.id,
+        job_status=job.get_status(refresh=False),
+        job_changed_at=get_job_changed_at(job.enqueued_at, job.started_at, job.ended_at),
+        job_ended_at=_as_utc(job.ended_at),
+        job_throttle_retries=job.meta.get(THROTTLE_RETRIES_META_KEY, 0),)
+
+def compact_job_status_from_job_history(job:JobHistory) -> CompactJobStatus:
+    """
+    Builds compact job status record from job archived in job history table
+    """
+    return CompactJobStatus(
+        job_id=job.job_id,
+        job_status=job.job_status,
+        job_changed_at=get_job_changed_at(job.enqueued_at, job.started_at, job.ended_at),
+        job_ended_at=_as_utc(job.ended_at),
+        job_throttle_retries=job.throttle_retries or 0,)
+
+def fetch_job_statuses(connection:Redis, job_ids:list[str]) -> Tuple[list[CompactJobStatus], list[str]]:
+    """
+    Fetches all jobs from redis in single pipeline.
+    Returns tuple of (job statuses, ids of jobs not stored in redis).
+    It is blocking function - API should run it in redis thread pool
+    """
+    if not job_ids:
+        return [], []
+    jobs = Job.fetch_many(job_ids, connection=connection)
+    job_statuses = [compact_job_status_from_rq_job(job) for job in jobs if job is not None]
+    missing_job_ids = [job_id for job_id, job in zip(job_ids, jobs) if job is None]
+    return job_statuses, missing_job_ids
+
+async def fetch_archived_job_statuses(psql_async_sessionmaker, job_ids:list[str]) -> list[CompactJobStatus]:
+    """
+    Returns statuses of archived jobs with provided ids in single query.
+    Jobs that were not archived are left out
+    """
+    if not job_ids:
+        return []
+    async with psql_async_sessionmaker() as session:
+        result = await session.execute(
+            select(JobHistory).where(JobHistory.job_id.in_(job_ids)))
+        jobs = result.scalars().all()
+    return [compact_job_status_from_job_history(job) for job in jobs]
+
+def filter_changed_since(
+        job_statuses:list[CompactJobStatus],
+        changed_since:Optional[datetime]) -> list[CompactJobStatus]:
+    """
+    Leaves only jobs whose status has changed after provided moment
+    """
+    if changed_since is None:
+        return job_statuses
+    changed_since = _as_utc(changed_since)
+    return [
+        job_status for job_status in job_statuses
+        if job_status.job_changed_at is not None
+        and job_status.job_changed_at > changed_since
+    ]
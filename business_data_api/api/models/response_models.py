@@ -1,14 +1,33 @@
 from enum import Enum
-from typing import List, Optional, Any
-from datetime import datetime
-from pydantic import BaseModel, EmailStr, HttpUrl
+from typing import Annotated, List, Literal, Optional, Any
+from datetime import date, datetime
+from pydantic import BaseModel, EmailStr, HttpUrl, StringConstraints, field_validator
+
+KRSNumber = Annotated[str, StringConstraints(pattern=r"^\d{10}$")]
 
 
 class JobEnqueued(BaseModel):
     job_id: str
     job_status_url: str
     message: str
+    job_reused: bool = False
     
+class BatchEnqueueRequest(BaseModel):
+    krs_numbers: List[KRSNumber]
+    queue_names: List[Literal["KRSAPI", "KRSDF"]]
+    priority: Literal["high", "bulk"] = "high"
+
+class BatchJobEnqueued(BaseModel):
+    krs: str
+    queue_name: str
+    job_id: str
+    job_reused: bool = False
+
+class BatchJobsEnqueued(BaseModel):
+    jobs: List[BatchJobEnqueued]
+    jobs_enqueued: int
+    jobs_reused: int
+
 class JobStatus(BaseModel):
     job_id:str
     job_status:str
@@ -17,15 +36,56 @@ class JobStatus(BaseModel):
     job_ended_at:Optional[datetime]
     job_result:Optional[Any]
     job_exc_info:Optional[str]
+    job_throttle_retries:int = 0
+    job_throttle_reason:Optional[str] = None
+    job_next_retry_at:Optional[datetime] = None
+
+class BatchJobStatusRequest(BaseModel):
+    job_ids: List[str]
+    changed_since: Optional[datetime] = None
+
+class CompactJobStatus(BaseModel):
+    job_id: str
+    job_status: str
+    job_changed_at: Optional[datetime] = None
+    job_ended_at: Optional[datetime] = None
+    job_throttle_retries: int = 0
+
+class BatchJobStatuses(BaseModel):
+    jobs: List[CompactJobStatus]
+    missing_job_ids: List[str]
 
 class DocumentInfo(BaseModel):
-    document_name:str
-    document_date_from:str
-    document_date_to:str
-    document_hash_id:str
+    # Fields are optional, because client can select
+    # which of them are returned
+    document_name:Optional[str] = None
+    document_date_from:Optional[str] = None
+    document_date_to:Optional[str] = None
+    document_hash_id:Optional[str] = None
 
 class AvailableKRSDFDocuments(BaseModel):
     document_list:List[DocumentInfo]
+    next_cursor:Optional[str] = None
+
+class PeriodDocumentInfo(BaseModel):
+    krs_number:str
+    document_type:Optional[str] = None
+    document_name:Optional[str] = None
+    document_status:Optional[str] = None
+    document_period_start:Optional[date] = None
+    document_period_end:Optional[date] = None
+    document_hash_id:str
+
+class PeriodDocuments(BaseModel):
+    document_list:List[PeriodDocumentInfo]
+    next_cursor:Optional[str] = None
+
+class DocumentSearchResult(PeriodDocumentInfo):
+    document_scraped_at:Optional[datetime] = None
+
+class DocumentSearchResults(BaseModel):
+    document_list:List[DocumentSearchResult]
+    next_cursor:Optional[str] = None
 
 class RequestHashIDs(BaseModel):
     hash_ids: List[str]
@@ -35,8 +95,9 @@ class CompanyInfoResponse(BaseModel):
     full_name: str
     legal_form: str
     krs_number: str
-    nip_number: str
-    regon_number: str
+    # Not every entity registered in KRS has NIP and REGON numbers
+    nip_number: Optional[str] = None
+    regon_number: Optional[str] = None
     country: Optional[str] = None
     voivodeship: Optional[str] = None
     municipality: Optional[str] = None
@@ -48,6 +109,25 @@ class CompanyInfoResponse(BaseModel):
     email: Optional[EmailStr] = None
     webpage: Optional[HttpUrl] = None
 
+    @field_validator("email", mode="before")
+    @classmethod
+    def normalize_email(cls, value):
+        if isinstance(value, str):
+            return value.strip() or None
+        return value
+
+    @field_validator("webpage", mode="before")
+    @classmethod
+    def normalize_webpage(cls, value):
+        if isinstance(value, str):
+            value = value.strip()
+            if not value:
+                return None
+            # KRS registry stores web pages without scheme, i.e. www.example.pl
+            if "://" not in value:
+                return f"http://{value}"
+        return value
+
     class Config:
         from_attributes = True
 
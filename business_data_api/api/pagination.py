@@ -0,0 +1,44 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional
+
+
+def encode_cursor(values:list[Any]) -> str:
+    """
+    Encodes sort key of the last returned row into opaque cursor.
+    Datetimes are stored as ISO strings
+    """
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor:str, size:int) -> list[Any]:
+    """
+    Decodes cursor created by encode_cursor.
+    Raises ValueError if cursor is malformed
+    """
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Malformed cursor: {cursor}") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError(f"Malformed cursor: {cursor}")
+    return values
+
+def parse_fields(fields:Optional[str], allowed_fields:list[str]) -> list[str]:
+    """
+    Parses comma separated list of requested response fields.
+    Returns all allowed fields if none were requested.
+    Raises ValueError if unknown field was requested
+    """
+    if not fields:
+        return list(allowed_fields)
+    requested_fields = list(dict.fromkeys(
+        field.strip() for field in fields.split(",") if field.strip()))
+    unknown_fields = [field for field in requested_fields if field not in allowed_fields]
+    if unknown_fields:
+        raise ValueError(
+            f"Unknown fields: {', '.join(unknown_fields)}. "
+            f"Allowed fields: {', '.join(allowed_fields)}")
+    return requested_fields
@@ -0,0 +1,21 @@
+import functools
+from typing import Any, Callable, TypeVar
+from anyio import to_thread
+from fastapi import Request
+
+T = TypeVar("T")
+
+
+async def run_redis_call(
+        request:Request,
+        func:Callable[..., T],
+        *args:Any,
+        **kwargs:Any) -> T:
+    """
+    Runs blocking redis (or rq) call in a bounded thread pool, so that
+    slow redis round trip does not stall the event loop.
+    Size of the pool is limited by API_REDIS_THREADPOOL_SIZE.
+    """
+    return await to_thread.run_sync(
+        functools.partial(func, *args, **kwargs),
+        limiter=request.app.state.redis_limiter)
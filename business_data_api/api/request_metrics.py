@@ -0,0 +1,26 @@
+import time
+from fastapi import Request
+
+from business_data_api.metrics import HTTP_REQUEST_SECONDS
+
+
+async def record_request_metrics(request:Request, call_next):
+    """
+    HTTP middleware observing duration of every request, labelled with
+    route template (i.e. /krs-api/company-profile/{krs}) instead of the path,
+    so that number of time series does not grow with KRS numbers.
+    For streamed responses duration ends when response headers are sent
+    """
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.labels(
+            request.method,
+            getattr(route, "path", "unmatched"),
+            str(status)
+        ).observe(time.perf_counter() - start)
@@ -0,0 +1,94 @@
+import hashlib
+from typing import Optional, Tuple
+from fastapi import Request, Response
+from redis.asyncio import Redis as AsyncRedis
+
+from config import API_RESPONSE_CACHE_TTL_SECONDS
+from business_data_api.workers.cache_invalidation import (
+    get_response_cache_key,
+    get_response_cache_version_key)
+
+# Response is cached only if resource was not invalidated
+# since it was read from DB
+_SET_IF_VERSION_UNCHANGED = """
+local version = redis.call('GET', KEYS[2]) or '0'
+if version ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[2], ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+"""
+
+
+async def get_cached_response(
+        async_redis:AsyncRedis,
+        resource:str,
+        krs:str,
+        variant:str="") -> Tuple[Optional[bytes], str]:
+    """
+    Returns tuple of (cached response body or None, resource version).
+    Version has to be passed to set_cached_response on cache miss
+    """
+    async with async_redis.pipeline(transaction=False) as pipe:
+        pipe.hget(get_response_cache_key(resource, krs), variant)
+        pipe.get(get_response_cache_version_key(resource, krs))
+        body, version = await pipe.execute()
+    return body, (version.decode() if version else "0")
+
+async def set_cached_response(
+        async_redis:AsyncRedis,
+        resource:str,
+        krs:str,
+        version:str,
+        body:bytes,
+        variant:str="") -> bool:
+    """
+    Stores response body, unless resource was invalidated after
+    version was read. Returns True if response was stored
+    """
+    stored = await async_redis.eval(
+        _SET_IF_VERSION_UNCHANGED,
+        2,
+        get_response_cache_key(resource, krs),
+        get_response_cache_version_key(resource, krs),
+        version,
+        variant,
+        body,
+        API_RESPONSE_CACHE_TTL_SECONDS)
+    return bool(stored)
+
+def make_etag(body:bytes) -> str:
+    """
+    Returns strong ETag of the response body
+    """
+    return f'"{hashlib.sha1(body).hexdigest()}"'
+
+def is_etag_matching(if_none_match:Optional[str], etag:str) -> bool:
+    """
+    Checks If-None-Match request header against ETag of the response
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    client_etags = [
+        client_etag.strip().removeprefix("W/")
+        for client_etag in if_none_match.split(",")
+    ]
+    return etag in client_etags
+
+def conditional_json_response(request:Request, body:bytes) -> Response:
+    """
+    Returns 304 Not Modified if client already has this version
+    of the response, otherwise returns JSON body with ETag
+    """
+    etag = make_etag(body)
+    headers = {
+        "ETag": etag,
+        # Client can store response, but has to revalidate it every time
+        "Cache-Control": "no-cache",
+    }
+    if is_etag_matching(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,176 @@
+from typing import List
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.requests import Request
+from fastapi.responses import StreamingResponse
+from rq import Queue
+
+from config import LOG_TO_POSTGRE_SQL, SOURCE_LOG_SYNC_PSQL_URL, API_BATCH_MAX_SIZE
+from logging_utils import setup_logger
+from business_data_api.workers.tasks.scraping_krs_api.scrape_extract import task_scrape_krs_api_extract
+from business_data_api.workers.tasks.scraping_krs_df.scrape_documents import task_scrape_documents
+from business_data_api.workers.queues import QueueName, QueuePriority, enqueue_coalesced_jobs
+from business_data_api.api.redis_calls import run_redis_call
+from business_data_api.api.job_events import stream_job_events
+from business_data_api.api.jobs import (
+    fetch_job_statuses,
+    fetch_archived_job_statuses,
+    filter_changed_since)
+from business_data_api.api.models import (
+    KRSNumber,
+    BatchEnqueueRequest,
+    BatchJobEnqueued,
+    BatchJobsEnqueued,
+    BatchJobStatusRequest,
+    BatchJobStatuses)
+
+log_to_psql = LOG_TO_POSTGRE_SQL
+psql_log_url = SOURCE_LOG_SYNC_PSQL_URL
+log = setup_logger(
+    logger_name="route_jobs",
+    log_to_db=log_to_psql,
+    log_to_db_url=psql_log_url)
+
+router = APIRouter()
+
+# Task executed by jobs of each job type
+QUEUE_TASKS = {
+    "KRSAPI": task_scrape_krs_api_extract,
+    "KRSDF": task_scrape_documents,
+}
+
+def _enqueue_batch(
+        queues:dict[str, Queue],
+        queue_names:list[QueueName],
+        priority:QueuePriority,
+        krs_numbers:list[str]) -> list[BatchJobEnqueued]:
+    """
+    Enqueues jobs for all KRS numbers into every requested job type.
+    Each job type is enqueued in single redis transaction.
+    """
+    enqueued = []
+    for queue_name in dict.fromkeys(queue_names):
+        results = enqueue_coalesced_jobs(
+            queues=queues,
+            queue_name=queue_name,
+            priority=priority,
+            krs_numbers=krs_numbers,
+            func=QUEUE_TASKS[queue_name])
+        enqueued.extend(
+            BatchJobEnqueued(
+                krs=krs,
+                queue_name=queue_name,
+                job_id=job.id,
+                job_reused=not was_enqueued)
+            for krs, job, was_enqueued in results)
+    return enqueued
+
+@router.post(
+    "/enqueue",
+    summary=(
+        "Use this endpoint to enqueue update jobs for many KRS numbers at once. "
+        "Jobs are enqueued for every job type listed in queue_names (KRSAPI, KRSDF)."
+    ),
+    response_model=BatchJobsEnqueued)
+async def enqueue_jobs(
+    request:Request,
+    body:BatchEnqueueRequest):
+    krs_numbers = list(dict.fromkeys(body.krs_numbers))
+    log.info(
+        f"Enqueuing batch of {len(krs_numbers)} KRS numbers "
+        f"into {body.queue_names} with priority {body.priority}")
+    if not krs_numbers or not body.queue_names:
+        raise HTTPException(
+            status_code=422,
+            detail="At least one KRS number and one queue name are required")
+    if len(krs_numbers) > API_BATCH_MAX_SIZE:
+        log.warning(f"Batch of {len(krs_numbers)} KRS numbers exceeds limit of {API_BATCH_MAX_SIZE}")
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch can contain at most {API_BATCH_MAX_SIZE} KRS numbers")
+    jobs = await run_redis_call(
+        request,
+        _enqueue_batch,
+        queues=request.app.state.queues,
+        queue_names=body.queue_names,
+        priority=body.priority,
+        krs_numbers=krs_numbers)
+    jobs_reused = sum(1 for job in jobs if job.job_reused)
+    log.info(
+        f"Batch enqueued.\n"
+        f"Jobs enqueued: {len(jobs) - jobs_reused}\n"
+        f"Jobs reused: {jobs_reused}")
+    return BatchJobsEnqueued(
+        jobs=jobs,
+        jobs_enqueued=len(jobs) - jobs_reused,
+        jobs_reused=jobs_reused)
+
+@router.post(
+    "/status",
+    summary=(
+        "Use this endpoint to check statuses of many jobs at once. "
+        "If changed_since is provided, only jobs whose status has changed "
+        "after that moment are returned."
+    ),
+    response_model=BatchJobStatuses)
+async def jobs_status(
+    request:Request,
+    body:BatchJobStatusRequest):
+    job_ids = list(dict.fromkeys(body.job_ids))
+    log.info(f"Fetching statuses of {len(job_ids)} jobs, changed since: {body.changed_since}")
+    if len(job_ids) > API_BATCH_MAX_SIZE:
+        log.warning(f"Batch of {len(job_ids)} job ids exceeds limit of {API_BATCH_MAX_SIZE}")
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch can contain at most {API_BATCH_MAX_SIZE} job ids")
+    job_statuses, not_in_redis_job_ids = await run_redis_call(
+        request,
+        fetch_job_statuses,
+        request.app.state.redis,
+        job_ids)
+    log.debug(f"{len(not_in_redis_job_ids)} jobs are not stored in redis - falling back to job history archive")
+    archived_job_statuses = await fetch_archived_job_statuses(
+        request.app.state.psql_async_sessionmaker,
+        not_in_redis_job_ids)
+    archived_job_ids = {job_status.job_id for job_status in archived_job_statuses}
+    missing_job_ids = [job_id for job_id in not_in_redis_job_ids if job_id not in archived_job_ids]
+    job_statuses = filter_changed_since(
+        job_statuses + archived_job_statuses,
+        body.changed_since)
+    log.debug(
+        f"Returning job statuses to client.\n"
+        f"Jobs returned: {len(job_statuses)}\n"
+        f"Jobs missing: {len(missing_job_ids)}")
+    return BatchJobStatuses(
+        jobs=job_statuses,
+        missing_job_ids=missing_job_ids)
+
+@router.get(
+    "/events",
+    summary=(
+        "Use this endpoint to receive job status transitions as server-sent events "
+        "instead of polling job status endpoints. Provide job ids and/or KRS numbers "
+        "to track. Stream of job ids ends when all jobs are finished or failed, "
+        "stream of KRS numbers lasts until client disconnects."
+    ),
+    response_class=StreamingResponse)
+async def jobs_events(
+    request:Request,
+    job_id:List[str] = Query(default=[]),
+    krs:List[KRSNumber] = Query(default=[])):
+    log.info(f"Streaming job events for {len(job_id)} jobs and {len(krs)} KRS numbers")
+    if not job_id and not krs:
+        raise HTTPException(
+            status_code=422,
+            detail="At least one job id or KRS number is required")
+    if len(job_id) + len(krs) > API_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {API_BATCH_MAX_SIZE} job ids and KRS numbers can be tracked")
+    return StreamingResponse(
+        stream_job_events(request, set(job_id), set(krs)),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Disables response buffering in nginx
+            "X-Accel-Buffering": "no",
+        })
@@ -1,14 +1,22 @@
-import uuid
 from fastapi import APIRouter, HTTPException
 from fastapi.requests import Request
-from rq.job import Job
+from redis.exceptions import RedisError
 from sqlalchemy import select
 
 from config import LOG_TO_POSTGRE_SQL, SOURCE_LOG_SYNC_PSQL_URL
 # from business_data_api.utils.logger import setup_logger
 from logging_utils import setup_logger
-# from business_data_api.db.models import CompanyInfo
+from business_data_api.db.models import RawKSRAPIFullExtract
+from business_data_api.db.company_profile import company_profile_columns
 from business_data_api.workers.tasks.scraping_krs_api.scrape_extract import task_scrape_krs_api_extract
+from business_data_api.workers.queues import QueuePriority, enqueue_coalesced_job
+from business_data_api.api.jobs import fetch_job_status, fetch_archived_job_status
+from business_data_api.api.redis_calls import run_redis_call
+from business_data_api.workers.cache_invalidation import COMPANY_PROFILE_CACHE
+from business_data_api.api.response_cache import (
+    get_cached_response,
+    set_cached_response,
+    conditional_json_response)
 from business_data_api.api.models import (
     JobEnqueued,
     JobStatus,
@@ -39,19 +47,28 @@ async def health():
         response_model=JobEnqueued)
 async def update_business_information(
     request: Request,
-    krs: str):
-    log.info(f"Updating business information for KRS {krs}")
+    krs: str,
+    priority: QueuePriority = "high"):
+    log.info(f"Updating business information for KRS {krs} with priority {priority}")
     log.debug("Enqueuing job resposible for updating KRS API information")
-    job_id = str(uuid.uuid4())
-    queue = request.app.state.queues["KRSAPI"]
-    job = queue.enqueue(
-        task_scrape_krs_api_extract,
-        job_id,
-        krs,
-        job_id=job_id)
+    job, was_enqueued = await run_redis_call(
+        request,
+        enqueue_coalesced_job,
+        queues=request.app.state.queues,
+        queue_name="KRSAPI",
+        priority=priority,
+        krs=krs,
+        func=task_scrape_krs_api_extract)
+    if not was_enqueued:
+        log.info(f"Job for KRS {krs} is already in progress or has recently finished - reusing job {job.id}")
+        return JobEnqueued(
+            job_id=job.id,
+            job_status_url="",
+            message="Job for this KRS number is already in progress or has recently finished",
+            job_reused=True)
     log.debug(f"Returning information about job enqueued to client")
     return JobEnqueued(
-        job_id=job_id,
+        job_id=job.id,
         job_status_url="",
         message="Job was successfully enqueued")
         
@@ -68,51 +85,84 @@ async def update_business_information_job_status(
     request:Request,
     job_id:str):
     log.info(f"Fetching information about job status for job id: {job_id}")
-    redis_conn = request.app.state.redis
-    try: 
-        log.debug("Trying to fetch job info from redis queue")
-        job = Job.fetch(job_id, connection=redis_conn)
-    except Exception as e:
-        log.warning(f"Could not fetch information about job from redis queue")
+    log.debug("Trying to fetch job info from redis queue")
+    job_status = await run_redis_call(
+        request,
+        fetch_job_status,
+        request.app.state.redis,
+        job_id)
+    if job_status is None:
+        log.debug(
+            f"Could not fetch information about job from redis queue"
+            f" - falling back to job history archive")
+        job_status = await fetch_archived_job_status(
+            request.app.state.psql_async_sessionmaker,
+            job_id)
+    if job_status is None:
+        log.warning(f"Could not find information about job in redis queue nor in job archive")
         raise HTTPException(
             status_code=404,
             detail="Job not found")
-    else:
-        log.debug("Returning information about job status to client")
-        return JobStatus(
-            job_id=job.id,
-            job_status=job.get_status(),
-            job_enqueued_at=job.enqueued_at,
-            job_started_at=job.started_at,
-            job_ended_at=job.ended_at,
-            job_result=job.result,
-            job_exc_info=job.exc_info,)
+    log.debug("Returning information about job status to client")
+    return job_status
 
-# @router.get(
-#     "/download-business-information/{krs}",
-#     summary=(
-#         "Use this endpoint to download informations about business,"
-#         "that are available in the local repository"
-#     ),
-#     response_model=CompanyInfoResponse)
-# async def download_business_information(
-#     request:Request,
-#     krs:str):
-#     log.info(f"Fetching business informations from local repository. krs: {krs}")
-#     async with request.app.state.psql_async_sessionmaker() as session:
-#         stmt = (
-#             select(CompanyInfo)
-#             .where(
-#                 CompanyInfo.krs_number==krs,
-#                 CompanyInfo.is_current==True
-#             )
-#         )
-#         result = await session.execute(stmt)
-#         company = result.scalars().first()
-#     if company is None:
-#         log.error(f"Could not find information about krs {krs} in local DB")
-#         raise HTTPException(
-#             status_code=404,
-#             detail="Company not found")
-#     log.debug(f"Returning information about business to client")
-#     return company
+@router.get(
+    "/company-profile/{krs}",
+    summary=(
+        "Use this endpoint to get profile of the company (name, legal form, "
+        "identifiers and address), based on its current extract available "
+        "in the local repository."
+    ),
+    response_model=CompanyInfoResponse)
+async def company_profile(
+    request:Request,
+    krs:str):
+    log.info(f"Fetching company profile from local repository. krs: {krs}")
+    async_redis = request.app.state.async_redis
+    # Cache is only an optimization - without redis profile is read from DB
+    try:
+        body, cache_version = await get_cached_response(
+            async_redis,
+            COMPANY_PROFILE_CACHE,
+            krs)
+    except RedisError as e:
+        log.warning(f"Could not read cached company profile: {e}")
+        body, cache_version = (None, None)
+    if body is not None:
+        log.debug(f"Returning cached company profile")
+        return conditional_json_response(request, body)
+    # Fields are extracted from JSONB by DB, so the whole extract
+    # is never sent to the API
+    stmt = (
+        select(
+            RawKSRAPIFullExtract.record_created_at,
+            RawKSRAPIFullExtract.krs_number,
+            *company_profile_columns(RawKSRAPIFullExtract.raw_data))
+        .where(
+            RawKSRAPIFullExtract.krs_number==krs,
+            RawKSRAPIFullExtract.is_current==True)
+        .order_by(RawKSRAPIFullExtract.record_created_at.desc())
+        .limit(1)
+    )
+    async with request.app.state.psql_async_sessionmaker() as session:
+        result = await session.execute(stmt)
+        company = result.first()
+    if company is None:
+        log.error(f"Could not find information about krs {krs} in local DB")
+        raise HTTPException(
+            status_code=404,
+            detail="Company not found")
+    body = CompanyInfoResponse.model_validate(
+        company._asdict()).model_dump_json().encode()
+    if cache_version is not None:
+        try:
+            await set_cached_response(
+                async_redis,
+                COMPANY_PROFILE_CACHE,
+                krs,
+                cache_version,
+                body)
+        except RedisError as e:
+            log.warning(f"Could not cache company profile: {e}")
+    log.debug(f"Returning company profile to client")
+    return conditional_json_response(request, body)
@@ -1,23 +1,35 @@
-import uuid
-import io
-import zipfile
-
-from fastapi import APIRouter, HTTPException, Request
+from datetime import date, datetime, timezone
+from typing import Optional
+from urllib.parse import urlencode
+from fastapi import APIRouter, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
-from rq.job import Job
-from rq.exceptions import NoSuchJobError, InvalidJobOperation
-from sqlalchemy import select
+from redis.exceptions import RedisError
+from sqlalchemy import select, tuple_
 
 from config import LOG_TO_POSTGRE_SQL, SOURCE_LOG_SYNC_PSQL_URL
 # from business_data_api.utils.logger import setup_logger
 from logging_utils import setup_logger
 from business_data_api.db.models import KRSDFDocuments
 from business_data_api.workers.tasks.scraping_krs_df.scrape_documents import task_scrape_documents
+from business_data_api.workers.queues import QueuePriority, enqueue_coalesced_job
+from business_data_api.workers.cache_invalidation import AVAILABLE_DOCUMENTS_CACHE
+from business_data_api.api.zip_stream import stream_zip
+from business_data_api.api.jobs import fetch_job_status, fetch_archived_job_status
+from business_data_api.api.redis_calls import run_redis_call
+from business_data_api.api.pagination import encode_cursor, decode_cursor, parse_fields
+from business_data_api.api.response_cache import (
+    get_cached_response,
+    set_cached_response,
+    conditional_json_response)
 from business_data_api.api.models import(
     JobEnqueued,
     JobStatus,
     AvailableKRSDFDocuments,
     DocumentInfo,
+    PeriodDocumentInfo,
+    PeriodDocuments,
+    DocumentSearchResult,
+    DocumentSearchResults,
     RequestHashIDs,
 )
 
@@ -30,6 +42,41 @@ log = setup_logger(
 
 router = APIRouter()
 
+# How many documents are fetched from DB at once when streaming zip archive
+DOWNLOAD_DOCUMENTS_FETCH_SIZE = 5
+# Fields of document listing and columns they are read from
+DOCUMENT_INFO_COLUMNS = {
+    "document_name": KRSDFDocuments.document_type,
+    "document_date_from": KRSDFDocuments.document_date_from,
+    "document_date_to": KRSDFDocuments.document_date_to,
+    "document_hash_id": KRSDFDocuments.hash_id,
+}
+DOCUMENTS_PAGE_SIZE = 100
+DOCUMENTS_PAGE_MAX_SIZE = 1000
+# Trigram index can not narrow down searches for shorter fragments
+SEARCH_FRAGMENT_MIN_LENGTH = 3
+
+
+def _contains_pattern(fragment:str) -> str:
+    """
+    Returns LIKE pattern matching text that contains fragment.
+    LIKE wildcards in the fragment are matched literally
+    """
+    escaped_fragment = (
+        fragment
+        .replace("\\", "\\\\")
+        .replace("%", "\\%")
+        .replace("_", "\\_"))
+    return f"%{escaped_fragment}%"
+
+def _as_naive_utc(value:datetime) -> datetime:
+    """
+    record_created_at is stored without timezone, in UTC
+    """
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
 
 @router.get(
     "/health", 
@@ -49,18 +96,27 @@ async def health():
         response_model=JobEnqueued)
 async def update_document_list(
     request:Request,
-    krs:str):
-    log.info(f"Updating financial documents for KRS {krs}")
+    krs:str,
+    priority:QueuePriority="high"):
+    log.info(f"Updating financial documents for KRS {krs} with priority {priority}")
     log.debug("Enqueuing job resposible for downloading documents")
-    job_id = str(uuid.uuid4())
-    queue = request.app.state.queues["KRSDF"]
-    job = queue.enqueue(
-        task_scrape_documents,
-        job_id,
-        krs,
-        job_id=job_id)
+    job, was_enqueued = await run_redis_call(
+        request,
+        enqueue_coalesced_job,
+        queues=request.app.state.queues,
+        queue_name="KRSDF",
+        priority=priority,
+        krs=krs,
+        func=task_scrape_documents)
+    if not was_enqueued:
+        log.info(f"Job for KRS {krs} is already in progress or has recently finished - reusing job {job.id}")
+        return JobEnqueued(
+            job_id=job.id,
+            job_status_url="",
+            message="Job for this KRS number is already in progress or has recently finished",
+            job_reused=True)
     return JobEnqueued(
-        job_id=job_id,
+        job_id=job.id,
         job_status_url="",
         message="Job was successfully enqueued"
     )
@@ -77,59 +133,309 @@ async def update_document_list_job_status(
     request:Request,
     job_id:str):
     log.info(f"Fetching information about job status for job id: {job_id}")
-    redis_conn = request.app.state.redis
-    try: 
-        log.debug("Trying to fetch job info from redis queue")
-        job = Job.fetch(job_id, connection=redis_conn)
-    except Exception as e:
-        log.warning(f"Could not fetch information about job from redis queue")
+    log.debug("Trying to fetch job info from redis queue")
+    job_status = await run_redis_call(
+        request,
+        fetch_job_status,
+        request.app.state.redis,
+        job_id)
+    if job_status is None:
+        log.debug(
+            f"Could not fetch information about job from redis queue"
+            f" - falling back to job history archive")
+        job_status = await fetch_archived_job_status(
+            request.app.state.psql_async_sessionmaker,
+            job_id)
+    if job_status is None:
+        log.warning(f"Could not find information about job in redis queue nor in job archive")
         raise HTTPException(
             status_code=404,
             detail="Job not found")
-    else:
-        log.debug("Returning information about job status to client")
-        return JobStatus(
-            job_id=job.id,
-            job_status=job.get_status(),
-            job_enqueued_at=job.enqueued_at,
-            job_started_at=job.started_at,
-            job_ended_at=job.ended_at,
-            job_result=job.result,
-            job_exc_info=job.exc_info,)
+    log.debug("Returning information about job status to client")
+    return job_status
 
 @router.get(
         "/available-documents/{krs}",
         summary=(
-                "Use this endpoint to check what documents are currently"
-                "available in the local repository."
+                "Use this endpoint to check what documents are currently "
+                "available in the local repository. Documents are returned "
+                "from the most recently scraped, in pages of `limit` documents - "
+                "pass `next_cursor` from the response as `cursor` to get the next page. "
+                "List can be filtered by document type and reporting period "
+                "(period has to start on or after date_from and end on or before date_to). "
+                "`fields` is comma separated list of fields to return."
         ),
-        response_model=AvailableKRSDFDocuments)
+        response_model=AvailableKRSDFDocuments,
+        response_model_exclude_unset=True)
 async def available_documents(
     request:Request,
-    krs:str):
+    krs:str,
+    document_type:Optional[str] = None,
+    date_from:Optional[date] = None,
+    date_to:Optional[date] = None,
+    fields:Optional[str] = None,
+    limit:int = Query(DOCUMENTS_PAGE_SIZE, ge=1, le=DOCUMENTS_PAGE_MAX_SIZE),
+    cursor:Optional[str] = None):
     log.info(f"Fetching list of locally available documents for krs {krs}")
+    try:
+        selected_fields = parse_fields(fields, list(DOCUMENT_INFO_COLUMNS))
+        cursor_values = decode_cursor(cursor, 2) if cursor else None
+        if cursor_values:
+            cursor_values = [datetime.fromisoformat(cursor_values[0]), cursor_values[1]]
+    except (ValueError, TypeError) as e:
+        log.warning(f"Invalid listing parameters: {e}")
+        raise HTTPException(status_code=422, detail=str(e))
+    # Every combination of parameters is cached separately,
+    # all of them are invalidated together by the worker
+    cache_variant = urlencode(sorted(
+        (name, str(value)) for name, value in {
+            "document_type": document_type,
+            "date_from": date_from,
+            "date_to": date_to,
+            "fields": ",".join(selected_fields),
+            "limit": limit,
+            "cursor": cursor,
+        }.items() if value is not None))
+    async_redis = request.app.state.async_redis
+    # Cache is only an optimization - without redis documents are read from DB
+    try:
+        body, cache_version = await get_cached_response(
+            async_redis,
+            AVAILABLE_DOCUMENTS_CACHE,
+            krs,
+            cache_variant)
+    except RedisError as e:
+        log.warning(f"Could not read cached list of documents: {e}")
+        body, cache_version = (None, None)
+    if body is not None:
+        log.debug(f"Returning cached list of documents")
+        return conditional_json_response(request, body)
+    stmt = (
+        select(
+            *[DOCUMENT_INFO_COLUMNS[field].label(field) for field in selected_fields],
+            KRSDFDocuments.record_created_at.label("cursor_created_at"),
+            KRSDFDocuments.hash_id.label("cursor_hash_id"))
+        .where(KRSDFDocuments.krs_number==krs)
+        .order_by(
+            KRSDFDocuments.record_created_at.desc(),
+            KRSDFDocuments.hash_id.desc())
+        # One additional row tells if there is a next page
+        .limit(limit + 1)
+    )
+    if document_type is not None:
+        stmt = stmt.where(KRSDFDocuments.document_type==document_type)
+    if date_from is not None:
+        stmt = stmt.where(KRSDFDocuments.document_period_start >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(KRSDFDocuments.document_period_end <= date_to)
+    if cursor_values:
+        stmt = stmt.where(
+            tuple_(KRSDFDocuments.record_created_at, KRSDFDocuments.hash_id)
+            < tuple_(*cursor_values))
     async with request.app.state.psql_async_sessionmaker() as session:
-        stmt = (
-            select(
-                KRSDFDocuments.document_type,
-                KRSDFDocuments.document_date_from,
-                KRSDFDocuments.document_date_to,
-                KRSDFDocuments.hash_id
-            )
-            .where(KRSDFDocuments.krs_number==krs)
-        )
         result = await session.execute(stmt)
         result = result.all()
-        log.debug(f"Found {len(result)} documents in local depository")
-        document_info = [
-            DocumentInfo(
-                document_name=r.document_type,
-                document_date_from=r.document_date_from,
-                document_date_to=r.document_date_to,
+    log.debug(f"Found {len(result)} documents in local depository")
+    next_cursor = None
+    if len(result) > limit:
+        result = result[:limit]
+        next_cursor = encode_cursor([result[-1].cursor_created_at, result[-1].cursor_hash_id])
+    document_info = [
+        DocumentInfo(**{field: getattr(r, field) for field in selected_fields})
+        for r in result]
+    body = AvailableKRSDFDocuments(
+        document_list=document_info,
+        next_cursor=next_cursor).model_dump_json(exclude_unset=True).encode()
+    if cache_version is not None:
+        try:
+            await set_cached_response(
+                async_redis,
+                AVAILABLE_DOCUMENTS_CACHE,
+                krs,
+                cache_version,
+                body,
+                cache_variant)
+        except RedisError as e:
+            log.warning(f"Could not cache list of documents: {e}")
+    return conditional_json_response(request, body)
+
+@router.get(
+        "/documents",
+        summary=(
+                "Use this endpoint to find documents of all companies by document type "
+                "and reporting period (period has to start on or after date_from "
+                "and end on or before date_to), i.e. all balance sheets for 2023. "
+                "Documents are returned from the latest period end, in pages of `limit` "
+                "documents - pass `next_cursor` from the response as `cursor` to get the next page."
+        ),
+        response_model=PeriodDocuments)
+async def documents_by_period(
+    request:Request,
+    document_type:Optional[str] = None,
+    date_from:Optional[date] = None,
+    date_to:Optional[date] = None,
+    limit:int = Query(DOCUMENTS_PAGE_SIZE, ge=1, le=DOCUMENTS_PAGE_MAX_SIZE),
+    cursor:Optional[str] = None):
+    log.info(
+        f"Fetching documents of type {document_type} "
+        f"for period from {date_from} to {date_to}")
+    try:
+        cursor_values = decode_cursor(cursor, 2) if cursor else None
+        if cursor_values:
+            cursor_values = [date.fromisoformat(cursor_values[0]), cursor_values[1]]
+    except (ValueError, TypeError) as e:
+        log.warning(f"Invalid cursor: {e}")
+        raise HTTPException(status_code=422, detail=str(e))
+    # Only metadata columns are selected, content is never read
+    stmt = (
+        select(
+            KRSDFDocuments.krs_number,
+            KRSDFDocuments.document_type,
+            KRSDFDocuments.document_name,
+            KRSDFDocuments.document_status,
+            KRSDFDocuments.document_period_start,
+            KRSDFDocuments.document_period_end,
+            KRSDFDocuments.hash_id)
+        .where(KRSDFDocuments.document_period_end.is_not(None))
+        .order_by(
+            KRSDFDocuments.document_period_end.desc(),
+            KRSDFDocuments.hash_id.desc())
+        # One additional row tells if there is a next page
+        .limit(limit + 1)
+    )
+    if document_type is not None:
+        stmt = stmt.where(KRSDFDocuments.document_type==document_type)
+    if date_from is not None:
+        stmt = stmt.where(KRSDFDocuments.document_period_start >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(KRSDFDocuments.document_period_end <= date_to)
+    if cursor_values:
+        stmt = stmt.where(
+            tuple_(KRSDFDocuments.document_period_end, KRSDFDocuments.hash_id)
+            < tuple_(*cursor_values))
+    async with request.app.state.psql_async_sessionmaker() as session:
+        result = await session.execute(stmt)
+        result = result.all()
+    log.debug(f"Found {len(result)} documents in local depository")
+    next_cursor = None
+    if len(result) > limit:
+        result = result[:limit]
+        next_cursor = encode_cursor([
+            result[-1].document_period_end.isoformat(),
+            result[-1].hash_id])
+    return PeriodDocuments(
+        document_list=[
+            PeriodDocumentInfo(
+                krs_number=r.krs_number,
+                document_type=r.document_type,
+                document_name=r.document_name,
+                document_status=r.document_status,
+                document_period_start=r.document_period_start,
+                document_period_end=r.document_period_end,
                 document_hash_id=r.hash_id)
-            for r in result]
-        return AvailableKRSDFDocuments(
-            document_list=document_info)
+            for r in result],
+        next_cursor=next_cursor)
+
+@router.get(
+        "/search-documents",
+        summary=(
+                "Use this endpoint to search documents of all companies. "
+                "`type_contains` and `name_contains` match fragments of document type "
+                "and name (case insensitive, at least 3 characters), `document_status` "
+                "has to match exactly, `date_from`/`date_to` limit reporting period and "
+                "`scraped_from`/`scraped_to` limit when document was added to local repository. "
+                "Documents are returned from the most recently scraped, in pages of `limit` "
+                "documents - pass `next_cursor` from the response as `cursor` to get the next page."
+        ),
+        response_model=DocumentSearchResults)
+async def search_documents(
+    request:Request,
+    type_contains:Optional[str] = None,
+    name_contains:Optional[str] = None,
+    document_status:Optional[str] = None,
+    date_from:Optional[date] = None,
+    date_to:Optional[date] = None,
+    scraped_from:Optional[datetime] = None,
+    scraped_to:Optional[datetime] = None,
+    limit:int = Query(DOCUMENTS_PAGE_SIZE, ge=1, le=DOCUMENTS_PAGE_MAX_SIZE),
+    cursor:Optional[str] = None):
+    log.info(
+        f"Searching documents.\n"
+        f"Type contains: {type_contains}\n"
+        f"Name contains: {name_contains}\n"
+        f"Status: {document_status}\n"
+        f"Period: {date_from} - {date_to}\n"
+        f"Scraped: {scraped_from} - {scraped_to}")
+    for fragment in (type_contains, name_contains):
+        if fragment is not None and len(fragment.strip()) < SEARCH_FRAGMENT_MIN_LENGTH:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Searched fragment has to have at least {SEARCH_FRAGMENT_MIN_LENGTH} characters")
+    try:
+        cursor_values = decode_cursor(cursor, 2) if cursor else None
+        if cursor_values:
+            cursor_values = [datetime.fromisoformat(cursor_values[0]), cursor_values[1]]
+    except (ValueError, TypeError) as e:
+        log.warning(f"Invalid cursor: {e}")
+        raise HTTPException(status_code=422, detail=str(e))
+    # Only metadata columns are selected, content is never read
+    stmt = (
+        select(
+            KRSDFDocuments.krs_number,
+            KRSDFDocuments.document_type,
+            KRSDFDocuments.document_name,
+            KRSDFDocuments.document_status,
+            KRSDFDocuments.document_period_start,
+            KRSDFDocuments.document_period_end,
+            KRSDFDocuments.record_created_at,
+            KRSDFDocuments.hash_id)
+        .order_by(
+            KRSDFDocuments.record_created_at.desc(),
+            KRSDFDocuments.hash_id.desc())
+        # One additional row tells if there is a next page
+        .limit(limit + 1)
+    )
+    if type_contains is not None:
+        stmt = stmt.where(KRSDFDocuments.document_type.ilike(
+            _contains_pattern(type_contains.strip()), escape="\\"))
+    if name_contains is not None:
+        stmt = stmt.where(KRSDFDocuments.document_name.ilike(
+            _contains_pattern(name_contains.strip()), escape="\\"))
+    if document_status is not None:
+        stmt = stmt.where(KRSDFDocuments.document_status==document_status)
+    if date_from is not None:
+        stmt = stmt.where(KRSDFDocuments.document_period_start >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(KRSDFDocuments.document_period_end <= date_to)
+    if scraped_from is not None:
+        stmt = stmt.where(KRSDFDocuments.record_created_at >= _as_naive_utc(scraped_from))
+    if scraped_to is not None:
+        stmt = stmt.where(KRSDFDocuments.record_created_at <= _as_naive_utc(scraped_to))
+    if cursor_values:
+        stmt = stmt.where(
+            tuple_(KRSDFDocuments.record_created_at, KRSDFDocuments.hash_id)
+            < tuple_(*cursor_values))
+    async with request.app.state.psql_async_sessionmaker() as session:
+        result = await session.execute(stmt)
+        result = result.all()
+    log.debug(f"Found {len(result)} documents in local depository")
+    next_cursor = None
+    if len(result) > limit:
+        result = result[:limit]
+        next_cursor = encode_cursor([result[-1].record_created_at, result[-1].hash_id])
+    return DocumentSearchResults(
+        document_list=[
+            DocumentSearchResult(
+                krs_number=r.krs_number,
+                document_type=r.document_type,
+                document_name=r.document_name,
+                document_status=r.document_status,
+                document_period_start=r.document_period_start,
+                document_period_end=r.document_period_end,
+                document_scraped_at=r.record_created_at,
+                document_hash_id=r.hash_id)
+            for r in result],
+        next_cursor=next_cursor)
 
 @router.post(
         "/download-available-documents",
@@ -142,19 +448,14 @@ async def available_documents(
 async def download_available_documents(
     request:Request,
     data:RequestHashIDs):
+    log.info(f"Preparing download of {len(data.hash_ids)} documents")
     async with request.app.state.psql_async_sessionmaker() as session:
         stmt = (
-            select(
-                    KRSDFDocuments.krs_number,
-                    KRSDFDocuments.document_content_save_name,
-                    KRSDFDocuments.document_content,
-                    KRSDFDocuments.hash_id
-            )
+            select(KRSDFDocuments.hash_id)
             .where(KRSDFDocuments.hash_id.in_(data.hash_ids))
         )
         result = await session.execute(stmt)
-        result = result.all()
-    fetched_hash_ids = [r.hash_id for r  in result]
+        fetched_hash_ids = set(result.scalars().all())
     missing_hash_ids = [hash_id for hash_id in data.hash_ids 
                         if hash_id not in fetched_hash_ids]
     if missing_hash_ids:
@@ -168,14 +469,27 @@ async def download_available_documents(
             status_code=500,
             detail=error_message
         )
-    zip_stream = io.BytesIO()
-    with zipfile.ZipFile(zip_stream, "w", zipfile.ZIP_DEFLATED) as zip_file:
-        for row in result:
-            zip_file.writestr(
-                f"{row.krs_number}_{row.document_content_save_name}",
-                row.document_content)
-    zip_stream.seek(0)
+
+    async def documents():
+        # Documents are read through server side cursor, few at a time,
+        # so that memory usage does not depend on number of requested documents
+        async with request.app.state.psql_async_sessionmaker() as session:
+            stmt = (
+                select(
+                        KRSDFDocuments.krs_number,
+                        KRSDFDocuments.document_content_save_name,
+                        KRSDFDocuments.document_content
+                )
+                .where(KRSDFDocuments.hash_id.in_(data.hash_ids))
+                .execution_options(yield_per=DOWNLOAD_DOCUMENTS_FETCH_SIZE)
+            )
+            result = await session.stream(stmt)
+            async for row in result:
+                yield (
+                    f"{row.krs_number}_{row.document_content_save_name}",
+                    row.document_content)
+
     return StreamingResponse(
-        zip_stream,
+        stream_zip(documents()),
         media_type="application/zip",
-        headers={"Content-Disposition": "attachment; filename=documents.zip"})
\ No newline at end of file
+        headers={"Content-Disposition": "attachment; filename=documents.zip"})
@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from fastapi.requests import Request
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from business_data_api.api.redis_calls import run_redis_call
+from business_data_api.metrics import render_metrics
+router = APIRouter()
+
+@router.get(
+    "/metrics",
+    summary="Prometheus metrics of the API",
+    include_in_schema=False)
+async def metrics(request:Request):
+    # Queue depth is read from redis while metrics are rendered
+    body = await run_redis_call(request, render_metrics, request.app.state.metrics_registry)
+    return Response(content=body, media_type=CONTENT_TYPE_LATEST)
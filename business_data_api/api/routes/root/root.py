@@ -1,13 +1,6 @@
+import time
 from fastapi import APIRouter
 from fastapi.requests import Request
-from rq.registry import(
-    StartedJobRegistry,
-    FinishedJobRegistry,
-    FailedJobRegistry,
-    DeferredJobRegistry,
-    ScheduledJobRegistry
-)
-from rq import Queue
 
 from business_data_api.api.models import RedisQueueMetadata, RedisQueuesInformation
 router = APIRouter()
@@ -18,15 +11,35 @@ router = APIRouter()
 async def redis_query_info(
     request:Request
     ):
-    metadata_dict = {
-        name: RedisQueueMetadata(
-            jobs_enqueued=queue.count,
-            jobs_started=queue.started_job_registry.count,
-            jobs_deferred=queue.deferred_job_registry.count,
-            jobs_scheduled=queue.scheduled_job_registry.count,
-            jobs_failed=queue.failed_job_registry.count,
-            jobs_finished=queue.finished_job_registry.count
+    # All counters are read in a single pipelined round trip through async client.
+    # Registries keep expiration time as entry score, so only entries that
+    # have not expired yet are counted (the same what rq cleanup would leave).
+    # Scheduled registry keeps time of the planned execution as the score.
+    now = time.time()
+    queues = request.app.state.queues
+    async with request.app.state.async_redis.pipeline(transaction=False) as pipe:
+        for queue in queues.values():
+            pipe.llen(queue.key)
+            pipe.zcount(queue.started_job_registry.key, now, "+inf")
+            pipe.zcount(queue.deferred_job_registry.key, now, "+inf")
+            pipe.zcard(queue.scheduled_job_registry.key)
+            pipe.zcount(queue.failed_job_registry.key, now, "+inf")
+            pipe.zcount(queue.finished_job_registry.key, now, "+inf")
+        counts = await pipe.execute()
+    metadata_dict = {}
+    for i, name in enumerate(queues.keys()):
+        (jobs_enqueued,
+         jobs_started,
+         jobs_deferred,
+         jobs_scheduled,
+         jobs_failed,
+         jobs_finished) = counts[i*6:(i+1)*6]
+        metadata_dict[name] = RedisQueueMetadata(
+            jobs_enqueued=jobs_enqueued,
+            jobs_started=jobs_started,
+            jobs_deferred=jobs_deferred,
+            jobs_scheduled=jobs_scheduled,
+            jobs_failed=jobs_failed,
+            jobs_finished=jobs_finished
         )
-        for name, queue in request.app.state.queues.items()
-    }
     return RedisQueuesInformation(metadata=metadata_dict)
@@ -0,0 +1,48 @@
+import asyncio
+import io
+import zipfile
+from typing import AsyncIterator, Tuple
+
+
+class _ChunkBuffer(io.RawIOBase):
+    """
+    Write only buffer that collects bytes written by zipfile until they are drained.
+    Buffer cannot be seeked, so zipfile writes each entry once, followed
+    by a data descriptor, instead of going back to patch its header.
+    """
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def stream_zip(
+        files:AsyncIterator[Tuple[str, bytes]],
+        compression:int=zipfile.ZIP_DEFLATED) -> AsyncIterator[bytes]:
+    """
+    Builds zip archive from (file name, file content) pairs and yields
+    compressed bytes as soon as each file is added, so only one file
+    has to be kept in memory at a time.
+    Compression is done in a worker thread, not to block event loop.
+    """
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, "w", compression) as zip_file:
+        async for file_name, file_content in files:
+            await asyncio.to_thread(zip_file.writestr, file_name, file_content)
+            chunk = buffer.drain()
+            if chunk:
+                yield chunk
+    # Closing the archive writes its central directory
+    chunk = buffer.drain()
+    if chunk:
+        yield chunk
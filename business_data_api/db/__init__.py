@@ -1,7 +1,9 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 
+from business_data_api.etl.field_mappings import SQL_FUNCTIONS
+
 
 Base = declarative_base()
 
@@ -25,6 +27,38 @@ def create_async_sessionmaker(psql_async_url):
                                 )
     return psql_async_session
 
+def _add_missing_columns(sync_engine):
+    """
+    Adds nullable columns that were added to models of already
+    existing tables, since create_all does not alter tables
+    """
+    inspector = inspect(sync_engine)
+    with sync_engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=sync_engine.dialect)
+                connection.exec_driver_sql(
+                    f'ALTER TABLE "{table.name}" ADD COLUMN IF NOT EXISTS "{column.name}" {column_type}')
+
+# PostgreSQL extensions required by indexes
+POSTGRESQL_EXTENSIONS = ("pg_trgm",)
+
 def create_tables(psql_sync_url):
     sync_engine = create_engine(psql_sync_url)
+    with sync_engine.begin() as connection:
+        for extension in POSTGRESQL_EXTENSIONS:
+            connection.exec_driver_sql(f"CREATE EXTENSION IF NOT EXISTS {extension}")
+        for function in SQL_FUNCTIONS:
+            connection.exec_driver_sql(function)
     Base.metadata.create_all(bind=sync_engine)
+    _add_missing_columns(sync_engine)
+    # create_all skips tables that already exist, so indexes
+    # added later to existing models are created separately
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=sync_engine, checkfirst=True)
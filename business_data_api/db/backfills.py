@@ -0,0 +1,71 @@
+from sqlalchemy import bindparam, select, update, or_
+
+from config import LOG_TO_POSTGRE_SQL, SOURCE_LOG_SYNC_PSQL_URL
+from logging_utils import setup_logger
+from business_data_api.db.models import KRSDFDocuments
+from business_data_api.scraping.krs_dokumenty_finansowe.model import parse_document_date
+
+log = setup_logger(
+    logger_name="db_backfills",
+    log_to_db=LOG_TO_POSTGRE_SQL,
+    log_to_db_url=SOURCE_LOG_SYNC_PSQL_URL)
+
+
+def parse_document_periods(rows:list[tuple]) -> list[dict]:
+    """
+    Parses reporting period of (hash id, date from, date to) rows with
+    the same parser as scraper uses for new documents. Text that is not
+    a valid date (i.e. 31.02.2023) gives None instead of failing the batch
+    """
+    return [
+        {
+            "b_hash_id": hash_id,
+            "b_period_start": parse_document_date(date_from),
+            "b_period_end": parse_document_date(date_to),
+        }
+        for hash_id, date_from, date_to in rows
+    ]
+
+def backfill_document_periods(sessionmaker, batch_size:int=1000) -> int:
+    """
+    Parses reporting period of documents scraped before typed period
+    columns were added. Rows are processed in batches ordered by primary key,
+    dates of each batch are parsed in Python (like for new documents)
+    and written with single executemany update and committed,
+    so backfill can be interrupted and run again.
+    Content column is never read.
+    Returns number of processed rows
+    """
+    last_hash_id = ""
+    rows_processed = 0
+    while True:
+        with sessionmaker() as session:
+            rows = session.execute(
+                select(
+                    KRSDFDocuments.hash_id,
+                    KRSDFDocuments.document_date_from,
+                    KRSDFDocuments.document_date_to)
+                .where(
+                    KRSDFDocuments.hash_id > last_hash_id,
+                    or_(
+                        KRSDFDocuments.document_period_start.is_(None),
+                        KRSDFDocuments.document_period_end.is_(None)))
+                .order_by(KRSDFDocuments.hash_id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            session.execute(
+                update(KRSDFDocuments.__table__)
+                .where(KRSDFDocuments.__table__.c.hash_id == bindparam("b_hash_id"))
+                .values(
+                    document_period_start=bindparam("b_period_start"),
+                    document_period_end=bindparam("b_period_end"),
+                    # Backfill does not change the document itself
+                    record_updated_at=KRSDFDocuments.__table__.c.record_updated_at),
+                parse_document_periods(rows))
+            session.commit()
+        rows_processed += len(rows)
+        last_hash_id = rows[-1][0]
+        log.info(f"Backfilled reporting period of {rows_processed} documents")
+    return rows_processed
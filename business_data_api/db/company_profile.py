@@ -0,0 +1,11 @@
+from business_data_api.etl.field_mappings import compile_sql_columns
+from business_data_api.etl.krs_api_mappings import COMPANY_PROFILE_MAPPING
+
+
+def company_profile_columns(raw_data_column) -> list:
+    """
+    Returns SQL expressions that extract company profile fields
+    (COMPANY_PROFILE_MAPPING) from JSONB extract column,
+    so that only projected fields are sent from DB instead of the whole extract
+    """
+    return compile_sql_columns(COMPANY_PROFILE_MAPPING, raw_data_column)
@@ -8,8 +8,11 @@ from sqlalchemy import (
     Integer,
     DateTime,
     Date,
-    Boolean)
-from sqlalchemy.sql import func
+    Boolean,
+    Float,
+    Numeric,
+    Index)
+from sqlalchemy.sql import func, text
 from sqlalchemy import Enum as PSQLEnum
 from sqlalchemy.dialects.postgresql import JSONB
 from enum import Enum
@@ -25,16 +28,90 @@ class KRSDFDocuments(Base):
     document_internal_id = Column(String)
     document_type = Column(String)
     document_name = Column(String)
+    # Reporting period exactly as scraped
     document_date_from = Column(String)
     document_date_to = Column(String)
+    # Reporting period parsed from scraped text, NULL if text is not a date
+    document_period_start = Column(Date)
+    document_period_end = Column(Date)
     document_status = Column(String)
     document_content_save_name = Column(String)
     document_content_file_extension = Column(String)
     document_content = Column(LargeBinary)
     record_created_at = Column(TIMESTAMP, server_default=func.now())
     record_updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+    __table_args__ = (
+        # Keyset pagination of company document listings,
+        # with and without document type filter
+        Index(
+            "ix_krs_df_documents_krs_created_hash",
+            "krs_number", "record_created_at", "hash_id"),
+        Index(
+            "ix_krs_df_documents_krs_type_created_hash",
+            "krs_number", "document_type", "record_created_at", "hash_id"),
+        # Reporting period queries, for single company and across companies
+        Index(
+            "ix_krs_df_documents_krs_period",
+            "krs_number", "document_period_start", "document_period_end"),
+        Index(
+            "ix_krs_df_documents_type_period_end_hash",
+            "document_type", "document_period_end", "hash_id"),
+        Index(
+            "ix_krs_df_documents_period_end_hash",
+            "document_period_end", "hash_id"),
+        # Document search - fragments of type and name are matched
+        # with trigram indexes (pg_trgm), other filters with B-tree indexes
+        Index(
+            "ix_krs_df_documents_created_hash",
+            "record_created_at", "hash_id"),
+        Index(
+            "ix_krs_df_documents_status_created_hash",
+            "document_status", "record_created_at", "hash_id"),
+        Index(
+            "ix_krs_df_documents_type_trgm",
+            "document_type",
+            postgresql_using="gin",
+            postgresql_ops={"document_type": "gin_trgm_ops"}),
+        Index(
+            "ix_krs_df_documents_name_trgm",
+            "document_name",
+            postgresql_using="gin",
+            postgresql_ops={"document_name": "gin_trgm_ops"}),
+    )
     
     
+## Models populated by maintenance process
+class JobHistory(Base):
+    __tablename__ = "job_history"
+    job_id = Column(String, primary_key=True)
+    queue_name = Column(String, index=True)
+    task_name = Column(String)
+    krs_number = Column(String(10), index=True)
+    job_status = Column(String)
+    enqueued_at = Column(DateTime(timezone=True))
+    started_at = Column(DateTime(timezone=True))
+    ended_at = Column(DateTime(timezone=True), index=True)
+    duration_seconds = Column(Float)
+    error_type = Column(String)
+    error_message = Column(Text)
+    rows_written = Column(Integer)
+    throttle_retries = Column(Integer, default=0)
+    record_created_at = Column(TIMESTAMP, server_default=func.now())
+
+
+## Models populated by automation
+class RefreshPlanHistory(Base):
+    __tablename__ = "refresh_plan_history"
+    id = Column(Integer, primary_key=True)
+    krs_checked = Column(Integer)
+    freshness_hours = Column(Integer)
+    krsapi_planned = Column(Integer)
+    krsapi_skipped = Column(Integer)
+    krsdf_planned = Column(Integer)
+    krsdf_skipped = Column(Integer)
+    record_created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
 ## MODELS POPULATED BY KRS API
 # TODO ADD FOREIGN KEYS
 class RawKSRAPIFullExtract(Base):
@@ -46,39 +123,120 @@ class RawKSRAPIFullExtract(Base):
     is_current = Column(Boolean, default=False)
     krs_number = Column(String(10), nullable=False)
     raw_data = Column(JSONB, nullable=False)
+    __table_args__ = (
+        # Lookups of the current extract of the company
+        Index(
+            "ix_raw_krs_api_full_extract_current_krs",
+            "krs_number",
+            postgresql_where=text("is_current")),
+    )
     
     
-# class CompanyInfo(Base):
-#     __tablename__ = "company_info"
-#     id = Column(Integer, primary_key=True, index=True)
-#     record_created_at = Column(
-#         DateTime(timezone=True),
-#         server_default=func.now())
-#     is_current = Column(Boolean, default=False)
-#     full_name = Column(String(250), nullable=False)
-#     legal_form = Column(String(100), nullable=False)
-#     krs_number = Column(String(14), nullable=False)
-#     nip_number = Column(String(10), nullable=False)
-#     regon_number = Column(String(14), nullable=False)
-#     country = Column(String(100), nullable=True)
-#     voivodeship = Column(String(100), nullable=True)
-#     municipality = Column(String(100), nullable=True)
-#     county = Column(String(100), nullable=True)
-#     city = Column(String(100), nullable=True)
-#     postal_number = Column(String(6), nullable=True)
-#     street = Column(String(100), nullable=True)
-#     house_number = Column(String(20), nullable=True)
-#     email = Column(String(320), nullable=True)
-#     webpage = Column(String(2083), nullable=True) 
-
-
-# class CompanyInfoDetails(Base):
-#     __tablename__ = "company_info_details"
-#     id = Column(Integer, primary_key=True, index=True)
-#     is_current = Column(Boolean, default=False)
-#     record_created_at = Column(
-#         DateTime(timezone=True),
-#         server_default=func.now())
-#     registered_at_krs_system_date = Column(Date)
+## Models populated by incremental ETL of raw KRS API extracts
+# Every table keeps only data of the current extract of the company
+class CompanyInfo(Base):
+    __tablename__ = "company_info"
+    krs_number = Column(String(10), primary_key=True)
+    extract_id = Column(Integer, nullable=False)
+    # Attribute name "registry" is reserved by declarative base
+    registry_type = Column("registry", String)
+    extract_state_date = Column(String)
+    # Values are stored exactly as in the extract, without length limits,
+    # so single unusual value (i.e. foreign address) does not fail the batch
+    full_name = Column(Text)
+    legal_form = Column(Text)
+    nip_number = Column(Text)
+    regon_number = Column(Text)
+    country = Column(Text)
+    voivodeship = Column(Text)
+    municipality = Column(Text)
+    county = Column(Text)
+    city = Column(Text)
+    postal_number = Column(Text)
+    street = Column(Text)
+    house_number = Column(Text)
+    email = Column(Text)
+    webpage = Column(Text)
+    record_updated_at = Column(DateTime(timezone=True), server_default=func.now())
+    __table_args__ = (
+        Index("ix_company_info_nip_number", "nip_number"),
+        Index("ix_company_info_regon_number", "regon_number"),
+    )
+
+
+class CompanyRepresentative(Base):
+    __tablename__ = "company_representatives"
+    krs_number = Column(String(10), primary_key=True)
+    position = Column(Integer, primary_key=True)
+    extract_id = Column(Integer, nullable=False)
+    body_name = Column(Text)
+    last_name = Column(Text)
+    first_name = Column(Text)
+    second_name = Column(Text)
+    function = Column(Text)
+
+
+class CompanyActivity(Base):
+    __tablename__ = "company_activities"
+    krs_number = Column(String(10), primary_key=True)
+    position = Column(Integer, primary_key=True)
+    extract_id = Column(Integer, nullable=False)
+    is_main = Column(Boolean, nullable=False)
+    pkd_code = Column(String, index=True)
+    description = Column(Text)
+
 
+# Every current value from sections dzial1..dzial6 of the extract,
+# addressed by its dotted path (i.e. dzial1.danePodmiotu.nazwa)
+class CompanyExtractField(Base):
+    __tablename__ = "company_extract_fields"
+    krs_number = Column(String(10), primary_key=True)
+    path = Column(Text, primary_key=True)
+    extract_id = Column(Integer, nullable=False)
+    section = Column(String(6), nullable=False)
+    value = Column(Text)
 
+
+class ETLCheckpoint(Base):
+    __tablename__ = "etl_checkpoint"
+    name = Column(String, primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0)
+    rows_processed = Column(Integer, nullable=False, default=0)
+    record_updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+## Models populated by parsing of KRS DF financial statements
+# Line items of balance sheet (Bilans) and profit and loss account
+# (RZiSPor / RZiSKalk) of XML financial statements, for the current
+# and the previous financial year
+class FinancialFact(Base):
+    __tablename__ = "financial_facts"
+    hash_id = Column(String, primary_key=True)
+    statement = Column(String, primary_key=True)
+    item_code = Column(String, primary_key=True)
+    period = Column(String, primary_key=True)
+    krs_number = Column(String(10), nullable=False)
+    # Name of the key figure (i.e. total_assets), NULL for other line items
+    figure = Column(String)
+    value = Column(Numeric(20, 2))
+    __table_args__ = (
+        # Key figures of the company across its statements
+        Index(
+            "ix_financial_facts_krs_figure",
+            "krs_number", "figure",
+            postgresql_where=text("figure IS NOT NULL")),
+    )
+
+
+# Every parsed document, including documents without facts (i.e. PDF),
+# so that backfill does not parse them again
+class FinancialStatementParse(Base):
+    __tablename__ = "financial_statement_parses"
+    hash_id = Column(String, primary_key=True)
+    krs_number = Column(String(10), nullable=False)
+    parse_status = Column(String, nullable=False)
+    facts_count = Column(Integer, nullable=False, default=0)
+    content_bytes = Column(Integer)
+    parse_seconds = Column(Float)
+    error_message = Column(Text)
+    record_created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,359 @@
+from typing import Any, Callable, Optional
+from sqlalchemy import Text, func, literal
+from sqlalchemy.dialects.postgresql import JSONB
+
+# Declarative mappings of KRS API extract into rows of target tables.
+# Mapping is a dict with:
+#   "fields" - {column name: field(...)}, every field is read from the first
+#              of its sources that is present and coerced to its type
+#   "explode" - optional list of explode(...) - row is created for every
+#              current item of the list found under the path (sources are then
+#              relative to the item, from_root(...) reads the whole extract)
+# Mappings are compiled once into accessor functions (compile_mappings),
+# or into SQL expressions reading JSONB column (compile_sql_columns).
+
+# Keys of full extract ("pelny") that tell which registry entry
+# has introduced and which one has removed the value
+ENTRY_ADDED_KEY = "nrWpisuWprow"
+ENTRY_REMOVED_KEY = "nrWpisuWykr"
+
+
+## Reading values of full extract
+def is_history(value:Any) -> bool:
+    """
+    Full extract keeps history of changed values as list of entries,
+    each marked with number of registry entry that has introduced it
+    """
+    return (
+        isinstance(value, list)
+        and len(value) > 0
+        and all(isinstance(entry, dict) and ENTRY_ADDED_KEY in entry for entry in value))
+
+def current_entries(value:Any) -> list:
+    """
+    Returns list items that were not removed by later registry entry.
+    Value that is not a list is returned as single item list
+    """
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        return [value]
+    return [
+        entry for entry in value
+        if not (isinstance(entry, dict) and entry.get(ENTRY_REMOVED_KEY))
+    ]
+
+def current_value(value:Any, key:Optional[str]=None) -> Any:
+    """
+    Returns current value of the extract field. History of the field
+    is reduced to its last entry that was not removed, entry that wraps
+    the value under the same key as the field is unwrapped.
+    Lists of items (i.e. members of the board) should be read
+    with current_entries instead
+    """
+    if is_history(value):
+        entries = current_entries(value)
+        value = entries[-1] if entries else None
+    if key is not None and isinstance(value, dict) and ENTRY_ADDED_KEY in value and key in value:
+        value = value[key]
+    return value
+
+def get_path(data:Any, path:tuple[str, ...]) -> Any:
+    """
+    Returns current value stored under path of dict keys,
+    or None if any part of the path is missing
+    """
+    for key in path:
+        if not isinstance(data, dict):
+            return None
+        data = current_value(data.get(key), key)
+    return data
+
+def is_empty(value:Any) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+def get_first_path(data:Any, paths:list[tuple[str, ...]]) -> Any:
+    """
+    Returns value of the first path that is present
+    """
+    for path in paths:
+        value = get_path(data, path)
+        if not is_empty(value):
+            return value
+    return None
+
+
+## Type coercions
+def to_text(value:Any) -> Optional[str]:
+    if value is None or isinstance(value, (dict, list)):
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+def parse_amount(value:Any) -> Optional[float]:
+    """
+    Parses amount written in polish format (i.e. "5 000,00"),
+    returns None if value is not a number
+    """
+    if value is None or isinstance(value, (dict, list)):
+        return None
+    try:
+        return float(str(value).replace("\xa0", "").replace(" ", "").replace(",", "."))
+    except ValueError:
+        return None
+
+def parse_count(value:Any) -> Optional[int]:
+    amount = parse_amount(value)
+    return int(amount) if amount is not None and amount.is_integer() else None
+
+def parse_flag(value:Any) -> Optional[bool]:
+    if isinstance(value, bool) or value is None:
+        return value
+    return str(value).strip().upper() in ("TRUE", "T", "TAK")
+
+COERCIONS:dict[str, Callable[[Any], Any]] = {
+    "text": to_text,
+    "amount": parse_amount,
+    "int": parse_count,
+    "bool": parse_flag,
+}
+
+
+## Mapping spec
+def field(*sources, type:str="text") -> dict:
+    """
+    Column read from the first present source. Source is a path of keys,
+    from_root(...) or concat(...)
+    """
+    if type not in COERCIONS:
+        raise ValueError(f"Unknown field type: {type}")
+    return {"sources": list(sources), "type": type}
+
+def from_root(*path:str) -> dict:
+    """
+    Path read from the whole extract, instead of the exploded item
+    """
+    return {"root": tuple(path)}
+
+def concat(*sources, separator:str=" ") -> dict:
+    """
+    Text of all present sources joined with separator
+    """
+    return {"concat": list(sources), "separator": separator}
+
+def explode(*paths:tuple[str, ...], **constants) -> dict:
+    """
+    Rows are created for items of the first present path,
+    constants are added to every row
+    """
+    return {"paths": list(paths), "constants": constants}
+
+
+## Compiling mappings into accessors
+def compile_path(path:tuple[str, ...]) -> Callable[[Any], Any]:
+    """
+    Returns function reading current value under path, equivalent
+    of get_path with history of the value reduced inline
+    """
+    keys = tuple(path)
+    def get(data):
+        for key in keys:
+            if data.__class__ is not dict:
+                return None
+            data = data.get(key)
+            if data.__class__ is list:
+                if not data:
+                    continue
+                for entry in data:
+                    if entry.__class__ is not dict or ENTRY_ADDED_KEY not in entry:
+                        break
+                else:
+                    # History - the last entry that was not removed
+                    current = None
+                    for entry in reversed(data):
+                        if not entry.get(ENTRY_REMOVED_KEY):
+                            current = entry
+                            break
+                    data = current[key] if current is not None and key in current else current
+            elif data.__class__ is dict and ENTRY_ADDED_KEY in data and key in data:
+                data = data[key]
+        return data
+    return get
+
+def compile_items_path(path:tuple[str, ...]) -> Callable[[Any], list]:
+    """
+    Returns function reading current items of the list under path.
+    Last key is not reduced like history, since items of the list
+    are marked with registry entry numbers as well
+    """
+    get_parent = compile_path(path[:-1])
+    last_key = path[-1]
+    def get_items(data):
+        parent = get_parent(data)
+        if parent.__class__ is not dict:
+            return []
+        return current_entries(parent.get(last_key))
+    return get_items
+
+def _compile_source(source) -> Callable[[Any, Any], Any]:
+    """
+    Returns function of (item, root) reading single source
+    """
+    if isinstance(source, tuple):
+        get = compile_path(source)
+        return lambda item, root: get(item)
+    if "root" in source:
+        get = compile_path(source["root"])
+        return lambda item, root: get(root)
+    if "concat" in source:
+        parts = [_compile_source(part) for part in source["concat"]]
+        separator = source["separator"]
+        def get_concat(item, root):
+            texts = [to_text(part(item, root)) for part in parts]
+            return separator.join(text for text in texts if text) or None
+        return get_concat
+    raise ValueError(f"Unknown field source: {source}")
+
+def compile_field(spec:dict) -> Callable[[Any, Any], Any]:
+    """
+    Returns function of (item, root) returning coerced value of the field
+    """
+    coerce = COERCIONS[spec["type"]]
+    if len(spec["sources"]) == 1 and isinstance(spec["sources"][0], tuple):
+        get_path_value = compile_path(spec["sources"][0])
+        return lambda item, root: coerce(get_path_value(item))
+    getters = [_compile_source(source) for source in spec["sources"]]
+    if len(getters) == 1:
+        [get] = getters
+        return lambda item, root: coerce(get(item, root))
+    def get_first(item, root):
+        for get in getters:
+            value = get(item, root)
+            if not is_empty(value):
+                return coerce(value)
+        return None
+    return get_first
+
+def compile_mapping(mapping:dict) -> Callable[[dict, dict], list[dict]]:
+    """
+    Compiles mapping into function of (extract, identity) returning rows
+    of the target table. Identity (i.e. KRS number and extract id) is added
+    to every row, rows of exploded mapping get their position
+    """
+    fields = tuple((name, compile_field(spec)) for name, spec in mapping["fields"].items())
+    if "explode" not in mapping:
+        def map_extract(extract, identity):
+            row = dict(identity)
+            for name, get in fields:
+                row[name] = get(extract, extract)
+            return [row]
+        return map_extract
+    sources = [
+        ([compile_items_path(path) for path in spec["paths"]], spec["constants"])
+        for spec in mapping["explode"]
+    ]
+    def map_items(extract, identity):
+        rows = []
+        for items_getters, constants in sources:
+            for get_items in items_getters:
+                items = get_items(extract)
+                if items:
+                    break
+            for item in items:
+                row = dict(identity)
+                row["position"] = len(rows)
+                row.update(constants)
+                for name, get in fields:
+                    row[name] = get(item, extract)
+                rows.append(row)
+        return rows
+    return map_items
+
+def compile_mappings(mappings:dict[str, dict]) -> Callable[[dict, dict], dict[str, list[dict]]]:
+    """
+    Compiles mappings of many tables into single function
+    of (extract, identity) returning rows of every table
+    """
+    compiled = tuple((table, compile_mapping(mapping)) for table, mapping in mappings.items())
+    def map_extract(extract, identity):
+        return {table: map_table(extract, identity) for table, map_table in compiled}
+    return map_extract
+
+
+## Compiling mappings into SQL
+# Functions used by SQL columns, created in DB together with tables.
+# krs_current_value is a single key step of compile_path: reads the key
+# and reduces history of the value to its last entry that was not removed.
+# krs_text_value converts JSONB value like to_text
+SQL_FUNCTIONS = (
+    f"""
+    CREATE OR REPLACE FUNCTION krs_current_value(data jsonb, key text) RETURNS jsonb
+    LANGUAGE plpgsql IMMUTABLE AS $$
+    DECLARE
+        value jsonb;
+    BEGIN
+        IF jsonb_typeof(data) IS DISTINCT FROM 'object' THEN
+            RETURN NULL;
+        END IF;
+        value := NULLIF(data -> key, 'null'::jsonb);
+        IF jsonb_typeof(value) = 'array' THEN
+            IF jsonb_array_length(value) > 0 AND NOT jsonb_path_exists(
+                    value, '$[*] ? (@.type() != "object" || !exists(@.{ENTRY_ADDED_KEY}))') THEN
+                SELECT entry INTO value
+                FROM jsonb_array_elements(value) WITH ORDINALITY AS entries(entry, position)
+                WHERE COALESCE(entry -> '{ENTRY_REMOVED_KEY}', 'null'::jsonb)
+                    IN ('null', 'false', '0', '""', '[]', '{{}}')
+                ORDER BY position DESC
+                LIMIT 1;
+                IF value ? key THEN
+                    value := value -> key;
+                END IF;
+            END IF;
+        ELSIF jsonb_typeof(value) = 'object' AND value ? '{ENTRY_ADDED_KEY}' AND value ? key THEN
+            value := value -> key;
+        END IF;
+        RETURN value;
+    END
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION krs_text_value(value jsonb) RETURNS text
+    LANGUAGE sql IMMUTABLE AS $$
+        SELECT CASE WHEN jsonb_typeof(value) IN ('object', 'array') THEN NULL ELSE value #>> '{}' END
+    $$
+    """,
+)
+
+def compile_sql_path(path:tuple[str, ...], raw_data_column):
+    """
+    Returns JSONB expression reading current value under path,
+    equivalent of compile_path
+    """
+    value = raw_data_column
+    for key in path:
+        value = func.krs_current_value(value, key, type_=JSONB)
+    return value
+
+def compile_sql_columns(mapping:dict, raw_data_column) -> list:
+    """
+    Returns SQL expressions that read fields of not exploded text mapping
+    from JSONB extract column (SQL_FUNCTIONS), so that only projected
+    fields are sent from DB instead of the whole extract.
+    Fields with other types or sources than paths are not supported
+    """
+    if "explode" in mapping:
+        raise ValueError("Exploded mappings can not be compiled into SQL columns")
+    columns = []
+    for name, spec in mapping["fields"].items():
+        if spec["type"] != "text" or not all(isinstance(source, tuple) for source in spec["sources"]):
+            raise ValueError(f"Field {name} can not be compiled into SQL column")
+        values = []
+        for source in spec["sources"]:
+            value = compile_sql_path(source, raw_data_column)
+            # Empty values are skipped like in get_first_path
+            for empty_value in ("", [], {}):
+                value = func.nullif(value, literal(empty_value, JSONB), type_=JSONB)
+            values.append(value)
+        columns.append(func.krs_text_value(func.coalesce(*values), type_=Text).label(name))
+    return columns
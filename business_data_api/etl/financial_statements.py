@@ -0,0 +1,287 @@
+import io
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import IO, Iterator, Optional
+from lxml import etree
+from sqlalchemy import delete, exists, select
+from sqlalchemy.dialects.postgresql import insert
+
+from config import (
+    LOG_TO_POSTGRE_SQL,
+    SOURCE_LOG_SYNC_PSQL_URL,
+    FINANCIAL_FACTS_BATCH_SIZE,
+    FINANCIAL_FACTS_PROCESSES)
+from logging_utils import setup_logger
+from business_data_api.metrics import observe_db_write
+from business_data_api.db.models import (
+    KRSDFDocuments,
+    FinancialFact,
+    FinancialStatementParse)
+
+log = setup_logger(
+    logger_name="etl_financial_statements",
+    log_to_db=LOG_TO_POSTGRE_SQL,
+    log_to_db_url=SOURCE_LOG_SYNC_PSQL_URL)
+
+# Financial statements of e-sprawozdania schemas (i.e. JednostkaInna, JednostkaMala).
+# Every line item of the statement is an element named by its position
+# in the statement (i.e. Aktywa_A_I) with amount of the current (KwotaA)
+# and the previous (KwotaB) financial year, nested in the parent line item
+STATEMENT_SECTIONS = ("Bilans", "RZiSPor", "RZiSKalk")
+AMOUNT_PERIODS = {"KwotaA": "current", "KwotaB": "previous"}
+# Line items that are the key figures of the company
+KEY_FIGURES = {
+    ("Bilans", "Aktywa"): "total_assets",
+    ("Bilans", "Aktywa_A"): "fixed_assets",
+    ("Bilans", "Aktywa_B"): "current_assets",
+    ("Bilans", "Pasywa_A"): "equity",
+    ("Bilans", "Pasywa_B"): "liabilities_and_provisions",
+    ("RZiSPor", "A"): "revenue",
+    ("RZiSPor", "F"): "operating_profit",
+    ("RZiSPor", "L"): "net_profit",
+    ("RZiSKalk", "A"): "revenue",
+    ("RZiSKalk", "I"): "operating_profit",
+    ("RZiSKalk", "O"): "net_profit",
+}
+XML_FILE_EXTENSIONS = ("xml", "xades")
+# Amounts are stored in Numeric column, values that do not fit
+# would fail the whole batch, so they are skipped
+AMOUNT_SCALE = FinancialFact.value.type.scale
+AMOUNT_LIMIT = Decimal(10) ** (FinancialFact.value.type.precision - AMOUNT_SCALE)
+
+
+## Parsing of single document
+def _local_name(tag) -> str:
+    return tag.rpartition("}")[2] if isinstance(tag, str) else ""
+
+def parse_statement_amount(text:Optional[str]) -> Optional[Decimal]:
+    """
+    Parses amount of the line item (i.e. "1234.56") rounded to AMOUNT_SCALE,
+    returns None if text is not a number or it does not fit stored amounts
+    """
+    if text is None:
+        return None
+    try:
+        value = Decimal(text.strip().replace(",", "."))
+    except InvalidOperation:
+        return None
+    if not value.is_finite() or abs(value) >= AMOUNT_LIMIT:
+        return None
+    # Rounded like by PostgreSQL
+    value = value.quantize(Decimal(1).scaleb(-AMOUNT_SCALE), rounding=ROUND_HALF_UP)
+    return value if abs(value) < AMOUNT_LIMIT else None
+
+def iter_statement_facts(source:IO[bytes]) -> Iterator[tuple[str, str, str, Decimal]]:
+    """
+    Yields (statement, item code, period, value) of every line item
+    of the statements found in XML document.
+    Document is read with iterparse and every element is cleared
+    (together with its already processed siblings) as soon as it ends,
+    so memory use does not depend on size of the document.
+    Only end events are handled and local names are resolved once per tag,
+    statement of the amount is found among its ancestors
+    """
+    periods = {}
+    names = {}
+    for _, element in etree.iterparse(
+            source,
+            events=("end",),
+            resolve_entities=False,
+            no_network=True,
+            huge_tree=True):
+        tag = element.tag
+        period = periods.get(tag)
+        if period is None:
+            period = periods[tag] = AMOUNT_PERIODS.get(_local_name(tag), "")
+        if period:
+            item = element.getparent()
+            for ancestor in item.iterancestors():
+                statement = names.get(ancestor.tag)
+                if statement is None:
+                    statement = names[ancestor.tag] = _local_name(ancestor.tag)
+                if statement in STATEMENT_SECTIONS:
+                    value = parse_statement_amount(element.text)
+                    if value is not None:
+                        yield statement, _local_name(item.tag), period, value
+                    break
+        element.clear(keep_tail=True)
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+
+def _iter_xml_sources(content:bytes, file_extension:Optional[str]) -> Iterator[IO[bytes]]:
+    """
+    Yields XML files of the document - the document itself,
+    or XML files of the zip archive
+    """
+    file_extension = (file_extension or "").lower()
+    if file_extension in XML_FILE_EXTENSIONS:
+        yield io.BytesIO(content)
+    elif file_extension == "zip":
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            for member in archive.namelist():
+                if member.rpartition(".")[2].lower() in XML_FILE_EXTENSIONS:
+                    with archive.open(member) as source:
+                        yield source
+
+def parse_document(document:tuple[str, str, Optional[str], Optional[bytes]]) -> dict:
+    """
+    Parses (hash id, krs, file extension, content) of KRS DF document.
+    Returns parse result with facts of the document and parse_status:
+    parsed - facts were found, no_facts - XML without statements,
+    not_xml - document is not XML (i.e. PDF), invalid - document can not be read.
+    Runs in backfill subprocesses, so it does not use database or logger.
+    Errors are recorded per document, so single broken document
+    does not stop the backfill
+    """
+    hash_id, krs, file_extension, content = document
+    content = content or b""
+    start = time.perf_counter()
+    facts = {}
+    parse_status = "not_xml"
+    error_message = None
+    try:
+        for source in _iter_xml_sources(content, file_extension):
+            parse_status = "no_facts"
+            for statement, item_code, period, value in iter_statement_facts(source):
+                # Line item repeated in the document (i.e. in notes) keeps its first value
+                facts.setdefault((statement, item_code, period), value)
+    except Exception as e:
+        # i.e. XMLSyntaxError, BadZipFile, LargeZipFile, OSError of corrupted archive member
+        parse_status = "invalid"
+        error_message = f"{type(e).__name__}: {e}"
+        facts = {}
+    if facts:
+        parse_status = "parsed"
+    return {
+        "hash_id": hash_id,
+        "krs_number": krs,
+        "parse_status": parse_status,
+        "facts": [
+            {
+                "hash_id": hash_id,
+                "statement": statement,
+                "item_code": item_code,
+                "period": period,
+                "krs_number": krs,
+                "figure": KEY_FIGURES.get((statement, item_code)),
+                "value": value,
+            }
+            for (statement, item_code, period), value in facts.items()
+        ],
+        "content_bytes": len(content),
+        "parse_seconds": time.perf_counter() - start,
+        "error_message": error_message,
+    }
+
+
+## Loading parse results
+def store_parse_results(session, results:list[dict]):
+    """
+    Replaces facts of parsed documents and records their parse status,
+    so documents parsed again (i.e. by worker and backfill) are not duplicated
+    """
+    if not results:
+        return
+    hash_ids = [result["hash_id"] for result in results]
+    session.execute(delete(FinancialFact).where(FinancialFact.hash_id.in_(hash_ids)))
+    facts = [fact for result in results for fact in result["facts"]]
+    if facts:
+        session.execute(insert(FinancialFact), facts)
+    statement = insert(FinancialStatementParse)
+    session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[FinancialStatementParse.hash_id],
+            set_={
+                column: statement.excluded[column]
+                for column in ("parse_status", "facts_count", "content_bytes", "parse_seconds", "error_message")
+            }),
+        [
+            {
+                "hash_id": result["hash_id"],
+                "krs_number": result["krs_number"],
+                "parse_status": result["parse_status"],
+                "facts_count": len(result["facts"]),
+                "content_bytes": result["content_bytes"],
+                "parse_seconds": result["parse_seconds"],
+                "error_message": result["error_message"],
+            }
+            for result in results
+        ])
+
+def parse_and_store_document(sessionmaker, document:tuple[str, str, Optional[str], Optional[bytes]]) -> dict:
+    """
+    Parses single document and stores its facts,
+    used by worker for newly scraped documents
+    """
+    result = parse_document(document)
+    with sessionmaker() as session, observe_db_write(FinancialFact.__tablename__):
+        store_parse_results(session, [result])
+        session.commit()
+    return result
+
+
+## Backfill of stored documents
+def _select_unparsed_documents(sessionmaker, after_hash_id:str, batch_size:int) -> list[tuple]:
+    with sessionmaker() as session:
+        return [
+            tuple(row) for row in session.execute(
+                select(
+                    KRSDFDocuments.hash_id,
+                    KRSDFDocuments.krs_number,
+                    KRSDFDocuments.document_content_file_extension,
+                    KRSDFDocuments.document_content)
+                .where(
+                    KRSDFDocuments.hash_id > after_hash_id,
+                    ~exists().where(FinancialStatementParse.hash_id == KRSDFDocuments.hash_id))
+                .order_by(KRSDFDocuments.hash_id)
+                .limit(batch_size))
+        ]
+
+def backfill_financial_facts(
+        sessionmaker,
+        batch_size:int=FINANCIAL_FACTS_BATCH_SIZE,
+        processes:int=FINANCIAL_FACTS_PROCESSES) -> int:
+    """
+    Parses stored documents that were not parsed yet, in batches ordered
+    by primary key. Documents of the batch are parsed by pool of processes
+    while the next batch is read from DB, results of every batch
+    are stored in single transaction, so backfill can be interrupted
+    and run again. With processes=0 one process per CPU is used.
+    Throughput is logged in documents/sec and MB/sec.
+    Returns number of processed documents
+    """
+    processes = processes or os.cpu_count() or 1
+    # Documents are sent to subprocesses in chunks, so that large
+    # documents of one chunk do not leave other processes idle
+    chunksize = max(1, batch_size // (processes * 4))
+    documents_processed = 0
+    bytes_processed = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        documents = _select_unparsed_documents(sessionmaker, "", batch_size)
+        while documents:
+            batch_start = time.perf_counter()
+            results = executor.map(parse_document, documents, chunksize=chunksize)
+            next_documents = _select_unparsed_documents(sessionmaker, documents[-1][0], batch_size)
+            results = list(results)
+            with sessionmaker() as session:
+                store_parse_results(session, results)
+                session.commit()
+            batch_seconds = time.perf_counter() - batch_start
+            batch_bytes = sum(result["content_bytes"] for result in results)
+            documents_processed += len(results)
+            bytes_processed += batch_bytes
+            log.info(
+                f"\nParsed batch of {len(results)} documents in {batch_seconds:.2f}s"
+                f"\n({len(results) / batch_seconds:.1f} documents/sec, {batch_bytes / 2**20 / batch_seconds:.2f} MB/sec,"
+                f" {documents_processed} in this run)")
+            documents = next_documents
+    elapsed = time.perf_counter() - start
+    log.info(
+        f"\nFinancial facts backfill finished - {documents_processed} documents"
+        f" ({bytes_processed / 2**20:.1f} MB) in {elapsed:.2f}s"
+        f"\n({documents_processed / elapsed:.1f} documents/sec, {bytes_processed / 2**20 / elapsed:.2f} MB/sec)")
+    return documents_processed
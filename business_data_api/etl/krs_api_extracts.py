@@ -0,0 +1,232 @@
+import time
+from datetime import timedelta
+from typing import Any, Iterator, Optional
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from config import LOG_TO_POSTGRE_SQL, SOURCE_LOG_SYNC_PSQL_URL
+from logging_utils import setup_logger
+from business_data_api.etl.field_mappings import (
+    ENTRY_ADDED_KEY,
+    ENTRY_REMOVED_KEY,
+    is_history,
+    current_entries,
+    current_value,
+    get_path,
+    to_text)
+from business_data_api.etl.krs_api_mappings import map_company_tables
+from business_data_api.db.models import (
+    RawKSRAPIFullExtract,
+    CompanyInfo,
+    CompanyRepresentative,
+    CompanyActivity,
+    CompanyExtractField,
+    ETLCheckpoint)
+
+log = setup_logger(
+    logger_name="etl_krs_api_extracts",
+    log_to_db=LOG_TO_POSTGRE_SQL,
+    log_to_db_url=SOURCE_LOG_SYNC_PSQL_URL)
+
+ETL_CHECKPOINT_NAME = "krs_api_extracts"
+EXTRACT_SECTIONS = ("dzial1", "dzial2", "dzial3", "dzial4", "dzial5", "dzial6")
+# Tables with one row per value of the extract list. They are replaced
+# as a whole for every company in the batch
+CHILD_TABLES = {
+    "company_representatives": CompanyRepresentative,
+    "company_activities": CompanyActivity,
+    "company_extract_fields": CompanyExtractField,
+}
+
+
+## Flattening of single extract
+def iter_leaf_values(data:Any, path:str="", key:Optional[str]=None) -> Iterator[tuple[str, str]]:
+    """
+    Yields (dotted path, value) of every current scalar value.
+    Items of lists get their index as part of the path
+    and registry entry numbers are skipped
+    """
+    if isinstance(data, list) and is_history(data) and len(current_entries(data)) <= 1:
+        data = current_value(data, key)
+    elif isinstance(data, dict):
+        data = current_value(data, key)
+    if isinstance(data, dict):
+        for child_key, value in data.items():
+            if child_key in (ENTRY_ADDED_KEY, ENTRY_REMOVED_KEY):
+                continue
+            yield from iter_leaf_values(value, f"{path}.{child_key}" if path else child_key, child_key)
+    elif isinstance(data, list):
+        for i, item in enumerate(current_entries(data)):
+            yield from iter_leaf_values(item, f"{path}[{i}]")
+    elif data is not None:
+        yield path, to_text(data)
+
+def flatten_extract(extract_id:int, krs:str, raw_data:dict) -> dict[str, list[dict]]:
+    """
+    Flattens KRS API extract into rows of normalized company tables
+    (COMPANY_TABLE_MAPPINGS and every leaf value of dzial1..dzial6).
+    Returns mapping of table name to list of rows
+    """
+    rows = map_company_tables(raw_data, {"krs_number": krs, "extract_id": extract_id})
+    sections = get_path(raw_data, ("odpis", "dane"))
+    sections = sections if isinstance(sections, dict) else {}
+    rows["company_extract_fields"] = [
+        {
+            "krs_number": krs,
+            "path": path,
+            "extract_id": extract_id,
+            "section": section,
+            "value": value,
+        }
+        for section in EXTRACT_SECTIONS
+        for path, value in iter_leaf_values(sections.get(section), section)
+    ]
+    return rows
+
+def flatten_extracts(extracts:list[tuple[int, str, dict]]) -> dict[str, list[dict]]:
+    """
+    Flattens batch of (extract id, krs, raw data) ordered by id.
+    When batch holds more than one extract of the company,
+    only the newest one is flattened
+    """
+    newest = {krs: (extract_id, raw_data) for extract_id, krs, raw_data in extracts}
+    rows = {table: [] for table in ("company_info", *CHILD_TABLES)}
+    for krs, (extract_id, raw_data) in newest.items():
+        for table, table_rows in flatten_extract(extract_id, krs, raw_data).items():
+            rows[table].extend(table_rows)
+    return rows
+
+
+## Loading batches
+def _upsert_company_info(session, rows:list[dict]) -> list[str]:
+    """
+    Single INSERT ... ON CONFLICT for the whole batch. Row is never
+    overwritten with data of an older extract, so replaying
+    a batch after restart does not change the result.
+    Returns KRS numbers of companies whose rows were written
+    """
+    if not rows:
+        return []
+    # Rows are keyed by column names, so table is used instead of the model
+    table = CompanyInfo.__table__
+    statement = insert(table)
+    return session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[table.c.krs_number],
+            set_={
+                column.name: statement.excluded[column.name]
+                for column in table.columns
+                if column.name not in ("krs_number", "record_updated_at")
+            } | {"record_updated_at": func.now()},
+            where=table.c.extract_id <= statement.excluded.extract_id)
+        .returning(table.c.krs_number),
+        rows).scalars().all()
+
+def _replace_child_rows(session, krs_numbers:list[str], rows:dict[str, list[dict]]):
+    """
+    Rows of list-like tables are replaced as a whole,
+    since values could have been removed from the newer extract.
+    Only companies in krs_numbers are replaced, so rows of an older
+    extract never overwrite rows of the newer one
+    """
+    if not krs_numbers:
+        return
+    replaced = set(krs_numbers)
+    for table, model in CHILD_TABLES.items():
+        session.execute(delete(model).where(model.krs_number.in_(krs_numbers)))
+        table_rows = [row for row in rows[table] if row["krs_number"] in replaced]
+        if table_rows:
+            session.execute(insert(model), table_rows)
+
+def _lock_checkpoint(session, name:str) -> ETLCheckpoint:
+    """
+    Returns checkpoint locked until the end of transaction,
+    so two ETL processes never load the same batch
+    """
+    session.execute(
+        insert(ETLCheckpoint)
+        .values(name=name, last_id=0, rows_processed=0)
+        .on_conflict_do_nothing(index_elements=[ETLCheckpoint.name]))
+    return session.execute(
+        select(ETLCheckpoint)
+        .where(ETLCheckpoint.name == name)
+        .with_for_update()
+    ).scalar_one()
+
+def process_extracts_batch(
+        sessionmaker,
+        batch_size:int,
+        safety_lag_seconds:int,
+        checkpoint_name:str=ETL_CHECKPOINT_NAME) -> int:
+    """
+    Loads next batch of raw extracts with id greater than checkpoint.
+    Flattened rows and moved checkpoint are committed in one transaction,
+    so after restart processing resumes exactly after the last loaded batch.
+    Extracts created less than safety_lag_seconds ago are left for the next
+    batch, so that extract committed later than extract with higher id
+    is not skipped.
+    Returns number of loaded extracts
+    """
+    with sessionmaker() as session:
+        checkpoint = _lock_checkpoint(session, checkpoint_name)
+        extracts = session.execute(
+            select(
+                RawKSRAPIFullExtract.id,
+                RawKSRAPIFullExtract.krs_number,
+                RawKSRAPIFullExtract.raw_data)
+            .where(
+                RawKSRAPIFullExtract.id > checkpoint.last_id,
+                RawKSRAPIFullExtract.record_created_at
+                < func.now() - timedelta(seconds=safety_lag_seconds))
+            .order_by(RawKSRAPIFullExtract.id)
+            .limit(batch_size)
+        ).all()
+        if not extracts:
+            session.rollback()
+            return 0
+        rows = flatten_extracts(extracts)
+        krs_numbers = _upsert_company_info(session, rows["company_info"])
+        _replace_child_rows(session, krs_numbers, rows)
+        checkpoint.last_id = extracts[-1].id
+        checkpoint.rows_processed += len(extracts)
+        session.commit()
+    return len(extracts)
+
+def run_incremental_etl(
+        sessionmaker,
+        batch_size:int,
+        safety_lag_seconds:int,
+        poll_seconds:float,
+        once:bool=False,
+        should_stop=lambda: False) -> dict:
+    """
+    Loads batches of new raw extracts until there are none left.
+    With once=False waits poll_seconds and checks again, until should_stop().
+    Throughput of every batch and of the whole run is logged in extracts/sec.
+    Returns run statistics
+    """
+    extracts_loaded = 0
+    run_start = time.perf_counter()
+    while not should_stop():
+        batch_start = time.perf_counter()
+        loaded = process_extracts_batch(sessionmaker, batch_size, safety_lag_seconds)
+        if loaded == 0:
+            if once:
+                break
+            time.sleep(poll_seconds)
+            continue
+        batch_seconds = time.perf_counter() - batch_start
+        extracts_loaded += loaded
+        log.info(
+            f"\nLoaded batch of {loaded} extracts in {batch_seconds:.2f}s"
+            f"\n({loaded / batch_seconds:.1f} extracts/sec, {extracts_loaded} in this run)")
+    elapsed = time.perf_counter() - run_start
+    stats = {
+        "extracts_loaded": extracts_loaded,
+        "elapsed_seconds": elapsed,
+        "extracts_per_second": extracts_loaded / elapsed if elapsed else 0.0,
+    }
+    log.info(
+        f"\nIncremental ETL run finished - {extracts_loaded} extracts in {elapsed:.2f}s"
+        f"\n({stats['extracts_per_second']:.1f} extracts/sec)")
+    return stats
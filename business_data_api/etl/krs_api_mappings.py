@@ -0,0 +1,148 @@
+from business_data_api.etl.field_mappings import (
+    compile_mappings,
+    concat,
+    explode,
+    field,
+    from_root)
+
+# Mappings of KRS API extract shared by incremental ETL (company tables),
+# spark stream, parquet export and API company profile projection.
+# Polish entities and foreign entities use different sections,
+# so most of the fields have fallback path of foreign entity
+HEADER_P = ("odpis", "naglowekP")
+HEADER_A = ("odpis", "naglowekA")
+DZIAL1 = ("odpis", "dane", "dzial1")
+DZIAL2 = ("odpis", "dane", "dzial2")
+DZIAL3 = ("odpis", "dane", "dzial3")
+ENTITY = (*DZIAL1, "danePodmiotu")
+FOREIGN_ENTITY = (*DZIAL1, "danePodmiotuZagranicznego")
+SEAT = (*DZIAL1, "siedzibaIAdres")
+FOREIGN_SEAT = (*DZIAL1, "siedzibaIAdresPodmiotuZagranicznego")
+
+# Paths of the seat and address, relative to SEAT / FOREIGN_SEAT
+_SEAT_FIELDS = {
+    "country": ("adres", "kraj"),
+    "voivodeship": ("siedziba", "wojewodztwo"),
+    "municipality": ("siedziba", "gmina"),
+    "county": ("siedziba", "powiat"),
+    "city": ("adres", "miejscowosc"),
+    "postal_number": ("adres", "kodPocztowy"),
+    "street": ("adres", "ulica"),
+    "house_number": ("adres", "nrDomu"),
+    "email": ("adresPocztyElektronicznej",),
+    "webpage": ("adresStronyInternetowej",),
+}
+
+COMPANY_PROFILE_MAPPING = {
+    "fields": {
+        "full_name": field((*ENTITY, "nazwa"), (*FOREIGN_ENTITY, "nazwa")),
+        "legal_form": field(
+            (*ENTITY, "formaPrawna"),
+            (*FOREIGN_ENTITY, "nazwaFormaPrawnaPrzedsiebiorcyZagranicznego")),
+        "nip_number": field(
+            (*ENTITY, "identyfikatory", "nip"),
+            (*FOREIGN_ENTITY, "identyfikatory", "nip")),
+        "regon_number": field(
+            (*ENTITY, "identyfikatory", "regon"),
+            (*FOREIGN_ENTITY, "identyfikatory", "regon")),
+        **{
+            name: field((*SEAT, *path), (*FOREIGN_SEAT, *path))
+            for name, path in _SEAT_FIELDS.items()
+        },
+    },
+}
+
+_HEADER_FIELDS = {
+    "registry": field((*HEADER_P, "rejestr"), (*HEADER_A, "rejestr")),
+    "extract_state_date": field((*HEADER_P, "stanZDnia"), (*HEADER_A, "stanZDnia")),
+}
+
+# Person fields of board members and shareholders, relative to the list item
+_LAST_NAME = ("nazwisko", "nazwiskoICzlon")
+_FIRST_NAME = ("imiona", "imie")
+_SECOND_NAME = ("imiona", "imieDrugie")
+_BOARD_MEMBERS_FIELDS = {
+    "body_name": field(from_root(*DZIAL2, "reprezentacja", "nazwaOrganu")),
+    "last_name": field(_LAST_NAME),
+    "first_name": field(_FIRST_NAME),
+    "second_name": field(_SECOND_NAME),
+    "function": field(("funkcjaWOrganie",)),
+}
+
+## Company tables (incremental ETL and spark stream)
+COMPANY_TABLE_MAPPINGS = {
+    "company_info": {
+        "fields": {**_HEADER_FIELDS, **COMPANY_PROFILE_MAPPING["fields"]},
+    },
+    "company_representatives": {
+        "explode": [explode((*DZIAL2, "reprezentacja", "sklad"))],
+        "fields": _BOARD_MEMBERS_FIELDS,
+    },
+    "company_activities": {
+        "explode": [
+            explode((*DZIAL3, "przedmiotDzialalnosci", "przedmiotPrzewazajacejDzialalnosci"), is_main=True),
+            explode((*DZIAL3, "przedmiotDzialalnosci", "przedmiotPozostalejDzialalnosci"), is_main=False),
+        ],
+        "fields": {
+            "pkd_code": field(concat(("kodDzial",), ("kodKlasa",), ("kodPodklasa",), separator=".")),
+            "description": field(("opis",)),
+        },
+    },
+}
+
+## Datasets of parquet export
+EXPORT_MAPPINGS = {
+    "company": {
+        "fields": {
+            **_HEADER_FIELDS,
+            **{
+                name: COMPANY_PROFILE_MAPPING["fields"][name]
+                for name in ("full_name", "legal_form", "nip_number", "regon_number", "email", "webpage")
+            },
+        },
+    },
+    "addresses": {
+        "explode": [explode(SEAT, FOREIGN_SEAT)],
+        "fields": {
+            "country": field(("adres", "kraj")),
+            "voivodeship": field(("siedziba", "wojewodztwo")),
+            "county": field(("siedziba", "powiat")),
+            "municipality": field(("siedziba", "gmina")),
+            "city": field(("adres", "miejscowosc")),
+            "street": field(("adres", "ulica")),
+            "house_number": field(("adres", "nrDomu")),
+            "flat_number": field(("adres", "nrLokalu")),
+            "postal_number": field(("adres", "kodPocztowy")),
+            "post_office": field(("adres", "poczta")),
+        },
+    },
+    "board_members": {
+        "explode": [explode((*DZIAL2, "reprezentacja", "sklad"))],
+        "fields": _BOARD_MEMBERS_FIELDS,
+    },
+    "shareholders": {
+        "explode": [explode((*DZIAL1, "wspolnicySpzoo"))],
+        "fields": {
+            "name": field(("nazwa",), concat(_FIRST_NAME, _LAST_NAME)),
+            "last_name": field(_LAST_NAME),
+            "first_name": field(_FIRST_NAME),
+            "regon_number": field(("identyfikator", "regon")),
+            "shares_description": field(("posiadaneUdzialy",)),
+            "holds_all_shares": field(("czyPosiadaCaloscUdzialow",), type="bool"),
+        },
+    },
+    "capital": {
+        "explode": [explode((*DZIAL1, "kapital"))],
+        "fields": {
+            "share_capital": field(("wysokoscKapitaluZakladowego", "wartosc"), type="amount"),
+            "share_capital_currency": field(("wysokoscKapitaluZakladowego", "waluta")),
+            "paid_in_capital": field(("czescKapitaluWplaconegoPokrytego", "wartosc"), type="amount"),
+            "paid_in_capital_currency": field(("czescKapitaluWplaconegoPokrytego", "waluta")),
+            "shares_count": field(("lacznaLiczbaAkcjiUdzialow",), type="int"),
+            "share_value": field(("wartoscJednejAkcji", "wartosc"), type="amount"),
+        },
+    },
+}
+
+map_company_tables = compile_mappings(COMPANY_TABLE_MAPPINGS)
+map_export_datasets = compile_mappings(EXPORT_MAPPINGS)
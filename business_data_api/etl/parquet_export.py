@@ -0,0 +1,255 @@
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Literal, Optional
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import func, select
+
+from config import LOG_TO_POSTGRE_SQL, SOURCE_LOG_SYNC_PSQL_URL
+from logging_utils import setup_logger
+from business_data_api.db.models import RawKSRAPIFullExtract
+from business_data_api.etl.krs_api_mappings import EXPORT_MAPPINGS, map_export_datasets
+
+log = setup_logger(
+    logger_name="etl_parquet_export",
+    log_to_db=LOG_TO_POSTGRE_SQL,
+    log_to_db_url=SOURCE_LOG_SYNC_PSQL_URL)
+
+ExportKind = Literal["snapshot", "delta"]
+
+# State of the export directory - id of the last exported extract
+# and list of partitions that were completely written
+EXPORT_STATE_FILE = "_export_state.json"
+PARTITION_TIME_FORMAT = "%Y%m%dT%H%M%S"
+
+# Every dataset starts with columns identifying the extract, so that
+# snapshot and deltas can be merged by taking the newest extract of the company
+_EXTRACT_FIELDS = [
+    pa.field("krs_number", pa.string(), nullable=False),
+    pa.field("extract_id", pa.int64(), nullable=False),
+    pa.field("extract_created_at", pa.timestamp("us", tz="UTC")),
+]
+EXPORT_SCHEMAS:dict[str, pa.Schema] = {
+    "company": pa.schema(_EXTRACT_FIELDS + [
+        pa.field("registry", pa.string()),
+        pa.field("extract_state_date", pa.string()),
+        pa.field("full_name", pa.string()),
+        pa.field("legal_form", pa.string()),
+        pa.field("nip_number", pa.string()),
+        pa.field("regon_number", pa.string()),
+        pa.field("email", pa.string()),
+        pa.field("webpage", pa.string()),
+    ]),
+    "addresses": pa.schema(_EXTRACT_FIELDS + [
+        pa.field("country", pa.string()),
+        pa.field("voivodeship", pa.string()),
+        pa.field("county", pa.string()),
+        pa.field("municipality", pa.string()),
+        pa.field("city", pa.string()),
+        pa.field("street", pa.string()),
+        pa.field("house_number", pa.string()),
+        pa.field("flat_number", pa.string()),
+        pa.field("postal_number", pa.string()),
+        pa.field("post_office", pa.string()),
+    ]),
+    "board_members": pa.schema(_EXTRACT_FIELDS + [
+        pa.field("position", pa.int32(), nullable=False),
+        pa.field("body_name", pa.string()),
+        pa.field("last_name", pa.string()),
+        pa.field("first_name", pa.string()),
+        pa.field("second_name", pa.string()),
+        pa.field("function", pa.string()),
+    ]),
+    "shareholders": pa.schema(_EXTRACT_FIELDS + [
+        pa.field("position", pa.int32(), nullable=False),
+        pa.field("name", pa.string()),
+        pa.field("last_name", pa.string()),
+        pa.field("first_name", pa.string()),
+        pa.field("regon_number", pa.string()),
+        pa.field("shares_description", pa.string()),
+        pa.field("holds_all_shares", pa.bool_()),
+    ]),
+    "capital": pa.schema(_EXTRACT_FIELDS + [
+        pa.field("share_capital", pa.float64()),
+        pa.field("share_capital_currency", pa.string()),
+        pa.field("paid_in_capital", pa.float64()),
+        pa.field("paid_in_capital_currency", pa.string()),
+        pa.field("shares_count", pa.int64()),
+        pa.field("share_value", pa.float64()),
+    ]),
+}
+
+
+## Flattening of single extract
+def flatten_extract_columns(
+        extract_id:int,
+        krs:str,
+        created_at:Optional[datetime],
+        raw_data:dict) -> dict[str, list[dict]]:
+    """
+    Flattens KRS API extract into rows of export datasets (EXPORT_MAPPINGS),
+    with columns of EXPORT_SCHEMAS
+    """
+    return map_export_datasets(
+        raw_data,
+        {"krs_number": krs, "extract_id": extract_id, "extract_created_at": created_at})
+
+def extracts_to_record_batches(extracts:list[tuple[int, str, Optional[datetime], dict]]) -> dict[str, pa.RecordBatch]:
+    """
+    Flattens chunk of (extract id, krs, created at, raw data)
+    into record batch of every export dataset
+    """
+    rows = {dataset: [] for dataset in EXPORT_MAPPINGS}
+    for extract_id, krs, created_at, raw_data in extracts:
+        for dataset, dataset_rows in flatten_extract_columns(extract_id, krs, created_at, raw_data).items():
+            rows[dataset].extend(dataset_rows)
+    return {
+        dataset: pa.RecordBatch.from_pylist(dataset_rows, schema=EXPORT_SCHEMAS[dataset])
+        for dataset, dataset_rows in rows.items()
+    }
+
+
+## Writing partitions
+class ParquetPartitionWriter:
+    """
+    Writes record batches of single dataset into parquet files of the
+    partition directory. Batches are split, so that every file holds
+    exactly rows_per_file rows (except the last one)
+    and no single file grows without limit
+    """
+    def __init__(self, directory:str, schema:pa.Schema, rows_per_file:int):
+        self.directory = directory
+        self.schema = schema
+        self.rows_per_file = rows_per_file
+        self.rows_written = 0
+        self._files_written = 0
+        self._rows_in_file = 0
+        self._writer:Optional[pq.ParquetWriter] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, batch:pa.RecordBatch):
+        offset = 0
+        while offset < batch.num_rows:
+            if self._writer is None or self._rows_in_file >= self.rows_per_file:
+                self._open_next_file()
+            part = batch.slice(offset, self.rows_per_file - self._rows_in_file)
+            self._writer.write_batch(part)
+            self._rows_in_file += part.num_rows
+            self.rows_written += part.num_rows
+            offset += part.num_rows
+
+    def _open_next_file(self):
+        self.close()
+        path = os.path.join(self.directory, f"part-{self._files_written:05}.parquet")
+        self._writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        self._files_written += 1
+        self._rows_in_file = 0
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def load_export_state(output_dir:str) -> dict:
+    path = os.path.join(output_dir, EXPORT_STATE_FILE)
+    if not os.path.exists(path):
+        return {"last_id": 0, "partitions": []}
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+def save_export_state(output_dir:str, state:dict):
+    """
+    State is replaced atomically, so it never points
+    to partition that was not completely written
+    """
+    path = os.path.join(output_dir, EXPORT_STATE_FILE)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+        json.dump(state, file, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+def get_partition_name(kind:ExportKind, exported_at:datetime) -> str:
+    """
+    Returns hive style name of the partition directory, i.e. snapshot=20250101T120000
+    """
+    return f"{kind}={exported_at.strftime(PARTITION_TIME_FORMAT)}"
+
+def export_extracts(
+        sessionmaker,
+        output_dir:str,
+        kind:ExportKind,
+        chunk_size:int,
+        rows_per_file:int,
+        safety_lag_seconds:int) -> dict:
+    """
+    Exports current extracts into new partition of output_dir:
+    snapshot - all current extracts, delta - current extracts stored
+    after the last export. Extracts are read in chunks of chunk_size rows
+    through server side cursor and every chunk is written as parquet row
+    group, so memory use does not depend on size of the registry.
+    Partition is written into temporary directory and renamed when complete.
+    Returns export statistics
+    """
+    state = load_export_state(output_dir)
+    if kind == "delta" and not state["partitions"]:
+        raise ValueError("Delta can be exported only after the first snapshot")
+    after_id = state["last_id"] if kind == "delta" else 0
+    exported_at = datetime.now(timezone.utc)
+    partition_name = get_partition_name(kind, exported_at)
+    temporary_dir = os.path.join(output_dir, f"_{partition_name}")
+    writers = {
+        dataset: ParquetPartitionWriter(os.path.join(temporary_dir, dataset), schema, rows_per_file)
+        for dataset, schema in EXPORT_SCHEMAS.items()
+    }
+    last_id = after_id
+    extracts_exported = 0
+    start = time.perf_counter()
+    try:
+        with sessionmaker() as session:
+            result = session.execute(
+                select(
+                    RawKSRAPIFullExtract.id,
+                    RawKSRAPIFullExtract.krs_number,
+                    RawKSRAPIFullExtract.record_created_at,
+                    RawKSRAPIFullExtract.raw_data)
+                .where(
+                    RawKSRAPIFullExtract.is_current,
+                    RawKSRAPIFullExtract.id > after_id,
+                    # Extracts committed out of order of their ids are exported
+                    # in the next delta, instead of being skipped
+                    RawKSRAPIFullExtract.record_created_at
+                    < func.now() - timedelta(seconds=safety_lag_seconds))
+                .order_by(RawKSRAPIFullExtract.id)
+                .execution_options(yield_per=chunk_size))
+            for chunk in result.partitions():
+                for dataset, batch in extracts_to_record_batches(chunk).items():
+                    writers[dataset].write(batch)
+                extracts_exported += len(chunk)
+                last_id = chunk[-1].id
+                log.debug(f"Exported {extracts_exported} extracts into {partition_name}")
+    except Exception:
+        for writer in writers.values():
+            writer.close()
+        shutil.rmtree(temporary_dir, ignore_errors=True)
+        raise
+    for writer in writers.values():
+        writer.close()
+    os.replace(temporary_dir, os.path.join(output_dir, partition_name))
+    state["last_id"] = last_id
+    state["partitions"].append(partition_name)
+    save_export_state(output_dir, state)
+    elapsed = time.perf_counter() - start
+    stats = {
+        "partition": partition_name,
+        "extracts_exported": extracts_exported,
+        "rows_written": {dataset: writer.rows_written for dataset, writer in writers.items()},
+        "elapsed_seconds": elapsed,
+        "extracts_per_second": extracts_exported / elapsed if elapsed else 0.0,
+    }
+    log.info(
+        f"\nExported {extracts_exported} extracts into {partition_name} in {elapsed:.2f}s"
+        f"\n({stats['extracts_per_second']:.1f} extracts/sec)")
+    return stats
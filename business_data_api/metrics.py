@@ -0,0 +1,153 @@
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from urllib.parse import urlsplit
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    start_http_server,
+    values)
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+
+# Prometheus metrics of API, workers and automation. Metrics are updated
+# in memory of the process (no redis or DB round trips) and read when
+# Prometheus scrapes /metrics endpoint of the API or metrics port of the process.
+# Label values are limited to route templates, queue lanes, task names,
+# upstream hosts and table names, so number of time series stays constant
+METRICS_PREFIX = "business_data_api"
+
+# Upstream requests take from tens of milliseconds up to minutes (throttling),
+# jobs from seconds (single extract) up to hours (companies with many documents)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+JOB_DURATION_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600, 7200)
+ITEMS_PER_JOB_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    f"{METRICS_PREFIX}_http_request_duration_seconds",
+    "Duration of API requests by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS)
+ENQUEUED_JOBS = Counter(
+    f"{METRICS_PREFIX}_enqueued_jobs",
+    "Jobs enqueued into queue lanes (coalesced requests are not counted)",
+    ["queue"])
+JOB_SECONDS = Histogram(
+    f"{METRICS_PREFIX}_job_duration_seconds",
+    "Duration of worker jobs by task and final status",
+    ["task", "outcome"],
+    buckets=JOB_DURATION_BUCKETS)
+UPSTREAM_REQUEST_SECONDS = Histogram(
+    f"{METRICS_PREFIX}_upstream_request_duration_seconds",
+    "Time until response headers of requests sent to scraped services",
+    ["host", "status"],
+    buckets=LATENCY_BUCKETS)
+SCRAPED_ITEMS_PER_JOB = Histogram(
+    f"{METRICS_PREFIX}_scraped_items_per_job",
+    "Pages and documents scraped by single job",
+    ["task", "kind"],
+    buckets=ITEMS_PER_JOB_BUCKETS)
+DB_WRITE_SECONDS = Histogram(
+    f"{METRICS_PREFIX}_db_write_duration_seconds",
+    "Duration of DB write transactions by table",
+    ["table"],
+    buckets=LATENCY_BUCKETS)
+
+
+## Recording
+def observe_upstream_response(response, *args, **kwargs):
+    """
+    Response hook of requests (hooks={"response": observe_upstream_response}).
+    Latency is time between sending the request and parsing response headers
+    """
+    UPSTREAM_REQUEST_SECONDS.labels(
+        urlsplit(response.url).hostname or "unknown",
+        str(response.status_code)
+    ).observe(response.elapsed.total_seconds())
+
+@contextmanager
+def observe_db_write(table:str) -> Iterator[None]:
+    """
+    Measures duration of DB write (including commit) done within the block
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        DB_WRITE_SECONDS.labels(table).observe(time.perf_counter() - start)
+
+def get_task_name(func_name:Optional[str]) -> str:
+    """
+    Returns name of the task function without module path
+    """
+    return (func_name or "unknown").rpartition(".")[2]
+
+
+## Queue depth
+class QueueDepthCollector:
+    """
+    Reads number of jobs waiting in every queue lane when metrics are
+    scraped, with single pipelined redis round trip. Enqueuing jobs
+    does not update any shared state
+    """
+    def __init__(self, connection, queues:dict):
+        self.connection = connection
+        self.queues = queues
+
+    def describe(self):
+        return [GaugeMetricFamily(f"{METRICS_PREFIX}_queue_depth", "", labels=["queue"])]
+
+    def collect(self):
+        metric = GaugeMetricFamily(
+            f"{METRICS_PREFIX}_queue_depth",
+            "Jobs waiting in queue lane",
+            labels=["queue"])
+        with self.connection.pipeline(transaction=False) as pipe:
+            for queue in self.queues.values():
+                pipe.llen(queue.key)
+            depths = pipe.execute()
+        for lane_name, depth in zip(self.queues.keys(), depths):
+            metric.add_metric([lane_name], depth)
+        yield metric
+
+def render_metrics(*registries:CollectorRegistry) -> bytes:
+    """
+    Returns metrics of the process (default registry)
+    and of provided registries in Prometheus text format
+    """
+    return b"".join(generate_latest(registry) for registry in (REGISTRY, *registries))
+
+
+## Metrics of worker processes
+def enable_multiprocess_metrics(directory:str):
+    """
+    Worker runs every job in forked work horse, so metrics of the job
+    would be lost with the horse. Values are kept in mmaped files of the
+    directory instead - one file for the worker and one shared by its
+    work horses (worker runs single horse at a time), so number of files
+    does not grow with number of jobs.
+    Has to be called before any metric with labels is used
+    """
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory
+    worker_pid = os.getpid()
+    values.ValueClass = values.MultiProcessValue(
+        lambda: "worker" if os.getpid() == worker_pid else "horse")
+
+def start_metrics_server(port:int, multiprocess_directory:Optional[str]=None):
+    """
+    Serves metrics of the process on HTTP port (in background thread),
+    with metrics of its work horses if multiprocess_directory is provided
+    """
+    if multiprocess_directory is None:
+        start_http_server(port)
+        return
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry, path=multiprocess_directory)
+    start_http_server(port, registry=registry)
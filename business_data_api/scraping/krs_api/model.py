@@ -5,6 +5,7 @@ from typing import Literal
 from business_data_api.scraping.exceptions import (
     EntityNotFoundException, 
     InvalidParameterException)
+from business_data_api.metrics import observe_upstream_response
 
 class KRSApi():
     """
@@ -77,7 +78,7 @@ class KRSApi():
         """
         Function that sends request to the KRS API endpoint
         """
-        response = requests.get(url)
+        response = requests.get(url, hooks={"response": observe_upstream_response})
         if response.status_code == 404:
             raise EntityNotFoundException(f"\nKRS API source error:\n"
                                           f"Entity not found for URL: {url}")
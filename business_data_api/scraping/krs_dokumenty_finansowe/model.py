@@ -3,7 +3,8 @@ import re
 import warnings
 import unicodedata
 import hashlib
-from typing import Literal, Optional, List, Union, Tuple
+import datetime
+from typing import Callable, Literal, Optional, List, Union, Tuple
 from lxml import etree
 from lxml.etree import XMLSyntaxError
 from bs4 import BeautifulSoup
@@ -14,22 +15,42 @@ from business_data_api.scraping.exceptions import (
                                             ScrapingFunctionFailed,
                                             WebpageThrottlingException,
                                             WebpageInMaintenanceMode)
+from business_data_api.metrics import observe_upstream_response
 
 # Filter XMLParsedAsHTMLWarning, since current logic parses 
 # fragmets of XML that are embedded into HTML
 warnings.filterwarnings("ignore", category=XMLParsedAsHTMLWarning)
 
 
+def parse_document_date(string:Optional[str]) -> Optional[datetime.date]:
+    """
+    Parses date shown in documents table (reporting period of the document).
+    Returns None if text is not a date in one of known formats
+    """
+    if not string:
+        return None
+    for date_format in ("%d.%m.%Y", "%Y-%m-%d", "%d-%m-%Y"):
+        try:
+            return datetime.datetime.strptime(string.strip(), date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
 class KRSDokumentyFinansowe():
     """
     Class to handle the retrieval of financial documents from the KRS (Krajowy Rejestr Sądowy).
     """
     KRS_DF_URL = "https://ekrs.ms.gov.pl/rdf/pd/search_df"
 
-    def __init__(self, krs_number):
+    def __init__(self, krs_number, response_hooks:Optional[List[Callable]]=None):
         # Initialising requests session for handling future requests
         # That invovle remembering cookies and other session parameters
         self._session = requests.Session()
+        self._session.hooks["response"].append(observe_upstream_response)
+        # Additional hooks called after every response (i.e. job heartbeat),
+        # page walk and document download can take longer than job lease
+        self._session.hooks["response"].extend(response_hooks or [])
         # Setting up default ajaxx headers used in requests
         self._ajax_headers = {
             "Faces-Request": "partial/ajax",
@@ -254,6 +275,8 @@ class KRSDokumentyFinansowe():
                     row_dict['document_to']
                 )
             )
+            row_dict['document_from_date'] = self._helper_parse_date(row_dict['document_from'])
+            row_dict['document_to_date'] = self._helper_parse_date(row_dict['document_to'])
             table_rows.append(row_dict)
         return table_rows
 
@@ -274,6 +297,13 @@ class KRSDokumentyFinansowe():
         """
         return unicodedata.normalize("NFKD", string).strip().lower().replace('\xa0', ' ')
 
+    def _helper_parse_date(self, string:Optional[str]) -> Optional[datetime.date]:
+        """
+        Helper function that parses date shown in documents table.
+        Returns None if text is not a date in one of known formats
+        """
+        return parse_document_date(string)
+
     def _helper_hash_string(self, string:str) ->str:
         """
         Helper function that is used for hashing strings, so that
@@ -436,6 +466,13 @@ class KRSDokumentyFinansowe():
                 else:
                     self._download_documents_load_next_page()
 
+    @property
+    def download_documents_pages_loaded(self) -> int:
+        """
+        Number of pages with documents loaded since download_documents was called
+        """
+        return self._download_documents_state.get("current_page_num", 0)
+
     def download_documents_skip_id(self):
         """
         Function that skips the id in order not to scrape it
@@ -474,6 +511,8 @@ class KRSDokumentyFinansowe():
             'document_name':row['document_name'],
             'document_date_from':row['document_from'],
             'document_date_to':row['document_to'],
+            'document_period_start':row['document_from_date'],
+            'document_period_end':row['document_to_date'],
             'document_status':row['document_status'],
             'document_content_save_name':document_save_name,
             'document_content':document_data,
@@ -0,0 +1,132 @@
+from typing import Optional, Tuple
+from redis import Redis
+from rq import Queue
+from rq.job import Job
+from rq.results import Result
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import sessionmaker as Sessionmaker
+
+from config import (
+    LOG_TO_POSTGRE_SQL,
+    SOURCE_LOG_SYNC_PSQL_URL,
+    JOB_ARCHIVE_BATCH_SIZE)
+from logging_utils import setup_logger
+from business_data_api.db.models import JobHistory
+from business_data_api.workers.queues import QUEUE_NAMES, get_queue_lane_names
+from business_data_api.workers.reaper import is_awaiting_requeue
+from business_data_api.workers.retries import THROTTLE_RETRIES_META_KEY
+
+log = setup_logger(
+    logger_name="worker_job_history_archiver",
+    log_to_db=LOG_TO_POSTGRE_SQL,
+    log_to_db_url=SOURCE_LOG_SYNC_PSQL_URL)
+
+# Error messages are stored without traceback and trimmed to this length
+MAX_ERROR_MESSAGE_LENGTH = 1000
+
+
+def split_exc_string(exc_string:Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Extracts exception type and message from the formatted
+    traceback, that rq stores for failed jobs
+    """
+    if not exc_string:
+        return None, None
+    lines = [line for line in exc_string.strip().splitlines() if line.strip()]
+    if not lines:
+        return None, None
+    error_type, _, error_message = lines[-1].partition(":")
+    return error_type.strip(), error_message.strip()[:MAX_ERROR_MESSAGE_LENGTH]
+
+def _job_history_row(job:Job) -> dict:
+    """
+    Builds compact job history record from job stored in redis
+    """
+    result = job.latest_result()
+    error_type, error_message = (None, None)
+    rows_written = None
+    if result is not None and result.type == Result.Type.FAILED:
+        error_type, error_message = split_exc_string(result.exc_string)
+    elif result is not None and result.type == Result.Type.SUCCESSFUL:
+        rows_written = result.return_value if isinstance(result.return_value, int) else None
+    status = job.get_status(refresh=False)
+    duration_seconds = (
+        (job.ended_at - job.started_at).total_seconds()
+        if job.started_at and job.ended_at else None)
+    return {
+        "job_id": job.id,
+        "queue_name": job.origin,
+        "task_name": job.func_name,
+        "krs_number": job.args[1] if len(job.args) > 1 else None,
+        "job_status": status.value if status else None,
+        "enqueued_at": job.enqueued_at,
+        "started_at": job.started_at,
+        "ended_at": job.ended_at,
+        "duration_seconds": duration_seconds,
+        "error_type": error_type,
+        "error_message": error_message,
+        "rows_written": rows_written,
+        "throttle_retries": job.meta.get(THROTTLE_RETRIES_META_KEY, 0),
+    }
+
+def _save_job_history(sessionmaker:Sessionmaker, rows:list[dict]):
+    """
+    Upserts job history records in one statement
+    """
+    stmt = insert(JobHistory).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[JobHistory.job_id],
+        set_={
+            column: stmt.excluded[column]
+            for column in rows[0].keys()
+            if column != "job_id"
+        })
+    with sessionmaker() as session:
+        session.execute(stmt)
+        session.commit()
+
+def archive_jobs(
+        connection:Redis,
+        sessionmaker:Sessionmaker,
+        batch_size:int=JOB_ARCHIVE_BATCH_SIZE) -> int:
+    """
+    Moves metadata of finished and failed jobs from redis registries into
+    job_history table, in batches. Archived jobs are removed from registries,
+    their hashes expire in redis after their (short) result ttl.
+    Failed jobs that the reaper is about to requeue are left in place.
+    Returns number of archived jobs
+    """
+    archived = 0
+    for queue_name in QUEUE_NAMES:
+        for lane_name in get_queue_lane_names(queue_name):
+            queue = Queue(lane_name, connection=connection)
+            for registry in (queue.finished_job_registry, queue.failed_job_registry):
+                offset = 0
+                while True:
+                    job_ids = registry.get_job_ids(offset, offset + batch_size - 1)
+                    if not job_ids:
+                        break
+                    jobs = Job.fetch_many(job_ids, connection=connection)
+                    jobs_to_archive = [
+                        job for job in jobs
+                        if job is not None and not is_awaiting_requeue(job)]
+                    if jobs_to_archive:
+                        _save_job_history(
+                            sessionmaker,
+                            [_job_history_row(job) for job in jobs_to_archive])
+                    # Jobs that no longer exist are removed as well,
+                    # jobs that are awaiting requeue stay in the registry
+                    skipped = len(job_ids) - len(jobs_to_archive) - jobs.count(None)
+                    archived_job_ids = {job.id for job in jobs_to_archive}
+                    with connection.pipeline() as pipe:
+                        for job_id, job in zip(job_ids, jobs):
+                            if job is None or job_id in archived_job_ids:
+                                registry.remove(job_id, pipeline=pipe)
+                        pipe.execute()
+                    archived += len(jobs_to_archive)
+                    offset += skipped
+                    if len(job_ids) < batch_size:
+                        break
+    if archived:
+        log.info(f"Archived {archived} jobs to job history table")
+    return archived
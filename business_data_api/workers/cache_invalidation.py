@@ -0,0 +1,54 @@
+import uuid
+from redis import Redis
+from redis.exceptions import RedisError
+
+from config import (
+    LOG_TO_POSTGRE_SQL,
+    SOURCE_LOG_SYNC_PSQL_URL,
+    API_RESPONSE_CACHE_TTL_SECONDS)
+from logging_utils import setup_logger
+
+log = setup_logger(
+    logger_name="worker_cache_invalidation",
+    log_to_db=LOG_TO_POSTGRE_SQL,
+    log_to_db_url=SOURCE_LOG_SYNC_PSQL_URL)
+
+# Cached API responses, each resource is cached separately for every KRS number
+AVAILABLE_DOCUMENTS_CACHE = "krs_df_available_documents"
+COMPANY_PROFILE_CACHE = "krs_api_company_profile"
+
+
+def get_response_cache_key(resource:str, krs:str) -> str:
+    """
+    Returns redis hash that stores cached API responses of the resource
+    for provided KRS number. Hash field is the query variant (filters, page)
+    """
+    return f"business_data_api:cache:{resource}:{krs}"
+
+def get_response_cache_version_key(resource:str, krs:str) -> str:
+    """
+    Returns redis key with version of the cached resource. Version is
+    replaced on every invalidation, so API does not store response
+    read from DB before the invalidation
+    """
+    return f"business_data_api:cache_version:{resource}:{krs}"
+
+def invalidate_response_cache(connection:Redis, resource:str, krs:str):
+    """
+    Drops all cached responses of the resource for provided KRS number.
+    Has to be called after data is committed to DB.
+    Cache is only an optimization - failure is logged and never fails the job
+    """
+    try:
+        with connection.pipeline() as pipe:
+            # Version expires together with responses that could be cached,
+            # so version keys do not pile up for every KRS ever scraped.
+            # Random version can not repeat after the key has expired
+            pipe.set(
+                get_response_cache_version_key(resource, krs),
+                uuid.uuid4().hex,
+                ex=API_RESPONSE_CACHE_TTL_SECONDS)
+            pipe.delete(get_response_cache_key(resource, krs))
+            pipe.execute()
+    except RedisError as e:
+        log.warning(f"Could not invalidate {resource} cache for krs {krs}: {e}")
@@ -0,0 +1,72 @@
+import json
+from datetime import datetime, timezone
+from typing import Optional
+from redis import Redis
+from redis.exceptions import RedisError
+from rq.job import Job, JobStatus as RQJobStatus
+
+from config import LOG_TO_POSTGRE_SQL, SOURCE_LOG_SYNC_PSQL_URL
+from logging_utils import setup_logger
+from business_data_api.workers.queues import QUEUE_PRIORITIES
+
+log = setup_logger(
+    logger_name="worker_job_events",
+    log_to_db=LOG_TO_POSTGRE_SQL,
+    log_to_db_url=SOURCE_LOG_SYNC_PSQL_URL)
+
+# Redis pub/sub channel with job status transitions published by workers
+JOB_EVENTS_CHANNEL = "business_data_api:job_events"
+# After reaching one of those statuses job will not change its status again
+FINAL_JOB_STATUSES = (
+    RQJobStatus.FINISHED,
+    RQJobStatus.FAILED,
+    RQJobStatus.STOPPED,
+    RQJobStatus.CANCELED,
+)
+
+
+def get_job_queue_name(job:Job) -> Optional[str]:
+    """
+    Returns job type (KRSAPI, KRSDF) based on priority lane job was enqueued in
+    """
+    if not job.origin:
+        return None
+    for priority in QUEUE_PRIORITIES:
+        suffix = f"_{priority.upper()}"
+        if job.origin.endswith(suffix):
+            return job.origin[:-len(suffix)]
+    return job.origin
+
+def get_job_krs(job:Job) -> Optional[str]:
+    """
+    Returns KRS number job was enqueued for.
+    Tasks are enqueued as func(job_id, krs)
+    """
+    try:
+        args = job.args
+    except Exception:
+        return None
+    return args[1] if len(args) >= 2 else None
+
+def build_job_event(job:Job, job_status:str) -> dict:
+    """
+    Builds job status transition event
+    """
+    return {
+        "job_id": job.id,
+        "krs": get_job_krs(job),
+        "queue_name": get_job_queue_name(job),
+        "job_status": getattr(job_status, "value", job_status),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+
+def publish_job_event(connection:Redis, job:Job, job_status:str):
+    """
+    Publishes job status transition to job events channel.
+    Events are only notifications - failure to publish is logged
+    and never fails the job itself
+    """
+    try:
+        connection.publish(JOB_EVENTS_CHANNEL, json.dumps(build_job_event(job, job_status)))
+    except RedisError as e:
+        log.warning(f"Could not publish {job_status} event for job {job.id}: {e}")
@@ -0,0 +1,54 @@
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Iterator
+from redis import Redis
+
+from config import STALE_JOB_TRESHOLD_SECONDS
+
+
+def get_job_lease_key(job_id:str) -> str:
+    """
+    Returns redis key that holds lease of the running job
+    """
+    return f"business_data_api:lease:{job_id}"
+
+def renew_job_lease(
+        connection:Redis,
+        job_id:str,
+        lease_seconds:int=STALE_JOB_TRESHOLD_SECONDS):
+    """
+    Heartbeat of the running job. Lease has to be renewed by the task
+    more often than every lease_seconds, otherwise the job is treated
+    as abandoned by the stale job reaper.
+    """
+    connection.set(
+        get_job_lease_key(job_id),
+        datetime.now(timezone.utc).isoformat(),
+        ex=lease_seconds)
+
+def release_job_lease(connection:Redis, job_id:str):
+    """
+    Removes lease of the job that is no longer running
+    """
+    connection.delete(get_job_lease_key(job_id))
+
+def has_job_lease(connection:Redis, job_id:str) -> bool:
+    """
+    Checks if job has lease that has not expired yet
+    """
+    return bool(connection.exists(get_job_lease_key(job_id)))
+
+@contextmanager
+def job_lease(
+        connection:Redis,
+        job_id:str,
+        lease_seconds:int=STALE_JOB_TRESHOLD_SECONDS) -> Iterator[Callable[[], None]]:
+    """
+    Takes lease for the job for the time of the block and releases it afterwards.
+    Yields heartbeat function, that should be called from long running loops.
+    """
+    renew_job_lease(connection, job_id, lease_seconds)
+    try:
+        yield lambda: renew_job_lease(connection, job_id, lease_seconds)
+    finally:
+        release_job_lease(connection, job_id)
@@ -0,0 +1,317 @@
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Literal, Optional, Tuple, Union
+from redis import Redis
+from redis.exceptions import WatchError
+from rq import Queue
+from rq.job import Job, JobStatus as RQJobStatus
+from rq.exceptions import NoSuchJobError
+from rq.registry import ScheduledJobRegistry
+
+from config import (
+    JOB_COALESCE_FRESHNESS_SECONDS,
+    JOB_RESULT_TTL_SECONDS,
+    JOB_FAILURE_TTL_SECONDS)
+from business_data_api.metrics import ENQUEUED_JOBS
+
+# Each job type has its own set of priority lanes.
+# High priority lane is used by jobs initiated through the API,
+# bulk lane is used by automation scripts and backfills
+QUEUE_NAMES = ("KRSAPI", "KRSDF")
+QUEUE_PRIORITIES = ("high", "bulk")
+
+QueueName = Literal["KRSAPI", "KRSDF"]
+QueuePriority = Literal["high", "bulk"]
+
+# Task executed by jobs of each job type. Import paths allow enqueuing jobs
+# from processes that do not import task modules (i.e. automation)
+QUEUE_TASK_PATHS = {
+    "KRSAPI": "business_data_api.workers.tasks.scraping_krs_api.scrape_extract.task_scrape_krs_api_extract",
+    "KRSDF": "business_data_api.workers.tasks.scraping_krs_df.scrape_documents.task_scrape_documents",
+}
+
+# Jobs in those states are still going to do the work,
+# so there is no need to enqueue another one for the same KRS
+ACTIVE_JOB_STATUSES = (
+    RQJobStatus.QUEUED,
+    RQJobStatus.STARTED,
+    RQJobStatus.SCHEDULED,
+    RQJobStatus.DEFERRED,
+)
+# How long information about the last job enqueued for KRS is kept
+COALESCE_KEY_TTL_SECONDS = 24 * 60 * 60
+
+
+def get_queue_lane_name(queue_name:QueueName, priority:QueuePriority) -> str:
+    """
+    Returns name of the redis queue that represents
+    priority lane of provided job type
+    """
+    if queue_name not in QUEUE_NAMES:
+        raise ValueError(f"Unknown queue name: {queue_name}")
+    if priority not in QUEUE_PRIORITIES:
+        raise ValueError(f"Unknown queue priority: {priority}")
+    return f"{queue_name}_{priority.upper()}"
+
+def get_queue_lane_names(queue_name:QueueName) -> list[str]:
+    """
+    Returns names of all priority lanes of provided job type,
+    ordered from the most important one
+    """
+    return [get_queue_lane_name(queue_name, priority) for priority in QUEUE_PRIORITIES]
+
+def get_lane_queue_names() -> dict[str, str]:
+    """
+    Returns {redis queue name: job type} for priority lanes
+    and legacy queues of all job types
+    """
+    lane_queue_names = {}
+    for queue_name in QUEUE_NAMES:
+        lane_queue_names[queue_name] = queue_name
+        for queue_lane_name in get_queue_lane_names(queue_name):
+            lane_queue_names[queue_lane_name] = queue_name
+    return lane_queue_names
+
+def is_high_priority_lane(queue_lane_name:str) -> bool:
+    """
+    Checks if provided redis queue name belongs to high priority lane
+    """
+    return queue_lane_name.endswith(f"_{QUEUE_PRIORITIES[0].upper()}")
+
+def migrate_legacy_queue(connection:Redis, queue_name:QueueName) -> int:
+    """
+    Moves jobs left in the queue used before priority lanes were added
+    (named after job type, i.e. KRSAPI) into bulk lane of the job type,
+    so that jobs enqueued before deployment are not orphaned.
+    Scheduled jobs (i.e. rescheduled throttled jobs) keep their scheduled time.
+    Called on worker start, returns number of moved jobs
+    """
+    legacy_queue = Queue(queue_name, connection=connection)
+    lane_queue = Queue(get_queue_lane_name(queue_name, QUEUE_PRIORITIES[-1]), connection=connection)
+    moved_jobs = 0
+    for job_id in legacy_queue.get_job_ids():
+        # LREM result tells if this worker has taken the job out of
+        # the legacy queue, so that only one of starting workers moves it
+        if not legacy_queue.remove(job_id):
+            continue
+        try:
+            job = Job.fetch(job_id, connection=connection)
+        except NoSuchJobError:
+            continue
+        lane_queue.enqueue_job(job)
+        moved_jobs += 1
+    legacy_registry = ScheduledJobRegistry(queue=legacy_queue)
+    for job_id in legacy_registry.get_job_ids():
+        try:
+            job = Job.fetch(job_id, connection=connection)
+            scheduled_at = legacy_registry.get_scheduled_time(job_id)
+        except NoSuchJobError:
+            legacy_registry.remove(job_id)
+            continue
+        if not legacy_registry.remove(job_id):
+            continue
+        # Scheduler enqueues due job into queue of its origin
+        job.origin = lane_queue.name
+        lane_queue.schedule_job(job, scheduled_at)
+        moved_jobs += 1
+    return moved_jobs
+
+def get_coalesce_key(queue_name:QueueName, krs:str) -> str:
+    """
+    Returns redis key that stores id of the last job
+    enqueued for provided job type and KRS number
+    """
+    return f"business_data_api:coalesce:{queue_name}:{krs}"
+
+def find_reusable_job(
+        connection:Redis,
+        job_id:str,
+        freshness_seconds:int=JOB_COALESCE_FRESHNESS_SECONDS) -> Optional[Job]:
+    """
+    Returns job if it is still going to be executed, or if it
+    has finished within the freshness window. Otherwise returns None
+    """
+    try:
+        job = Job.fetch(job_id, connection=connection)
+    except NoSuchJobError:
+        return None
+    return job if is_reusable_job(job, freshness_seconds) else None
+
+def is_reusable_job(
+        job:Job,
+        freshness_seconds:int=JOB_COALESCE_FRESHNESS_SECONDS) -> bool:
+    """
+    Checks if already fetched job is still going to be executed,
+    or if it has finished within the freshness window
+    """
+    status = job.get_status(refresh=False)
+    if status in ACTIVE_JOB_STATUSES:
+        return True
+    if status == RQJobStatus.FINISHED and job.ended_at:
+        finished_seconds_ago = (datetime.now(timezone.utc) - job.ended_at).total_seconds()
+        if finished_seconds_ago <= freshness_seconds:
+            return True
+    return False
+
+def find_reusable_jobs(
+        connection:Redis,
+        job_ids:dict[str, str],
+        freshness_seconds:int=JOB_COALESCE_FRESHNESS_SECONDS) -> dict[str, Job]:
+    """
+    Batch version of find_reusable_job. Takes mapping of KRS number
+    to job id, fetches all jobs at once and returns mapping of
+    KRS number to job that can be reused
+    """
+    if not job_ids:
+        return {}
+    jobs = Job.fetch_many(list(job_ids.values()), connection=connection)
+    return {
+        krs: job
+        for krs, job in zip(job_ids.keys(), jobs)
+        if job is not None and is_reusable_job(job, freshness_seconds)
+    }
+
+def _set_default_job_ttls(job_kwargs:dict):
+    """
+    Finished job has to stay in redis at least for the freshness window,
+    so that it can be reused
+    """
+    job_kwargs.setdefault(
+        "result_ttl",
+        max(JOB_RESULT_TTL_SECONDS, JOB_COALESCE_FRESHNESS_SECONDS))
+    job_kwargs.setdefault("failure_ttl", JOB_FAILURE_TTL_SECONDS)
+
+def _promote_job(queues:dict[str, Queue], job:Job, target_lane_name:str):
+    """
+    Moves job that is still waiting in the queue to the target lane.
+    Used when job enqueued in bulk lane is requested with high priority.
+    """
+    if job.origin == target_lane_name or job.origin not in queues:
+        return
+    if job.get_status(refresh=False) != RQJobStatus.QUEUED:
+        return
+    # LREM result tells if this process has taken the job out of
+    # the lane, so that only one request moves it
+    if queues[job.origin].remove(job.id):
+        queues[target_lane_name].enqueue_job(job)
+
+def enqueue_coalesced_job(
+        queues:dict[str, Queue],
+        queue_name:QueueName,
+        priority:QueuePriority,
+        krs:str,
+        func:Callable[[str, str], object],
+        **job_kwargs) -> Tuple[Job, bool]:
+    """
+    Enqueues func(job_id, krs) into the priority lane of provided job type,
+    unless job for the same job type and KRS is already queued, running,
+    or has finished within the freshness window - in that case
+    existing job is returned instead.
+    Returns tuple of (job, was_enqueued)
+    """
+    lane_name = get_queue_lane_name(queue_name, priority)
+    queue = queues[lane_name]
+    connection = queue.connection
+    coalesce_key = get_coalesce_key(queue_name, krs)
+    _set_default_job_ttls(job_kwargs)
+    with connection.pipeline() as pipe:
+        while True:
+            try:
+                pipe.watch(coalesce_key)
+                existing_job_id = pipe.get(coalesce_key)
+                existing_job = (
+                    find_reusable_job(connection, existing_job_id.decode())
+                    if existing_job_id else None)
+                if existing_job is not None:
+                    pipe.unwatch()
+                    if is_high_priority_lane(lane_name):
+                        _promote_job(queues, existing_job, lane_name)
+                    return existing_job, False
+                job_id = str(uuid.uuid4())
+                pipe.multi()
+                job = queue.enqueue(
+                    func,
+                    job_id,
+                    krs,
+                    job_id=job_id,
+                    pipeline=pipe,
+                    **job_kwargs)
+                pipe.set(coalesce_key, job_id, ex=COALESCE_KEY_TTL_SECONDS)
+                pipe.execute()
+                ENQUEUED_JOBS.labels(lane_name).inc()
+                return job, True
+            except WatchError:
+                # Another process enqueued job for this KRS in the meantime,
+                # check again whether it can be reused
+                continue
+
+def enqueue_coalesced_jobs(
+        queues:dict[str, Queue],
+        queue_name:QueueName,
+        priority:QueuePriority,
+        krs_numbers:list[str],
+        func:Union[Callable[[str, str], object], str],
+        **job_kwargs) -> list[Tuple[str, Job, bool]]:
+    """
+    Batch version of enqueue_coalesced_job. All coalesce keys are read
+    with single MGET, existing jobs are fetched at once and all new jobs
+    are enqueued in single redis transaction.
+    Returns list of (krs, job, was_enqueued) in order of krs_numbers
+    """
+    lane_name = get_queue_lane_name(queue_name, priority)
+    queue = queues[lane_name]
+    connection = queue.connection
+    krs_numbers = list(dict.fromkeys(krs_numbers))
+    if not krs_numbers:
+        return []
+    coalesce_keys = [get_coalesce_key(queue_name, krs) for krs in krs_numbers]
+    _set_default_job_ttls(job_kwargs)
+    with connection.pipeline() as pipe:
+        while True:
+            try:
+                pipe.watch(*coalesce_keys)
+                existing_job_ids = pipe.mget(coalesce_keys)
+                reusable_jobs = find_reusable_jobs(
+                    connection,
+                    {
+                        krs: job_id.decode()
+                        for krs, job_id in zip(krs_numbers, existing_job_ids)
+                        if job_id
+                    })
+                new_job_ids = {
+                    krs: str(uuid.uuid4())
+                    for krs in krs_numbers
+                    if krs not in reusable_jobs
+                }
+                if not new_job_ids:
+                    pipe.unwatch()
+                    new_jobs = {}
+                    break
+                pipe.multi()
+                enqueued_jobs = queue.enqueue_many(
+                    [
+                        Queue.prepare_data(
+                            func,
+                            args=(job_id, krs),
+                            job_id=job_id,
+                            **job_kwargs)
+                        for krs, job_id in new_job_ids.items()
+                    ],
+                    pipeline=pipe)
+                for krs, job_id in new_job_ids.items():
+                    pipe.set(get_coalesce_key(queue_name, krs), job_id, ex=COALESCE_KEY_TTL_SECONDS)
+                pipe.execute()
+                new_jobs = dict(zip(new_job_ids.keys(), enqueued_jobs))
+                ENQUEUED_JOBS.labels(lane_name).inc(len(new_jobs))
+                break
+            except WatchError:
+                # Some of the KRS numbers were enqueued by another process
+                # in the meantime, check again which jobs can be reused
+                continue
+    if is_high_priority_lane(lane_name):
+        for job in reusable_jobs.values():
+            _promote_job(queues, job, lane_name)
+    return [
+        (krs, new_jobs[krs], True) if krs in new_jobs else (krs, reusable_jobs[krs], False)
+        for krs in krs_numbers
+    ]
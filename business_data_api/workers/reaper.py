@@ -0,0 +1,188 @@
+from datetime import datetime, timezone
+from typing import Optional
+from redis import Redis
+from rq import Queue
+from rq.job import Job, JobStatus as RQJobStatus
+from rq.exceptions import NoSuchJobError, InvalidJobOperation
+from rq.results import Result
+from rq.utils import as_text
+
+from config import (
+    LOG_TO_POSTGRE_SQL,
+    SOURCE_LOG_SYNC_PSQL_URL,
+    STALE_JOB_TRESHOLD_SECONDS,
+    STALE_JOB_MAX_REQUEUES)
+from logging_utils import setup_logger
+from business_data_api.workers.queues import QUEUE_NAMES, get_queue_lane_names
+from business_data_api.workers.leases import has_job_lease
+
+log = setup_logger(
+    logger_name="worker_stale_job_reaper",
+    log_to_db=LOG_TO_POSTGRE_SQL,
+    log_to_db_url=SOURCE_LOG_SYNC_PSQL_URL)
+
+# Job meta key that counts how many times job was requeued by reaper
+STALE_REQUEUES_META_KEY = "stale_requeues"
+
+
+def get_failed_watermark_key(lane_name:str) -> str:
+    """
+    Returns redis key that holds score of the newest failed registry entry
+    of the lane checked by the reaper, with ids of jobs checked at that score
+    """
+    return f"business_data_api:reaper:failed_watermark:{lane_name}"
+
+
+def _is_lease_expired(connection:Redis, job:Job, lease_seconds:int) -> bool:
+    """
+    Job has expired lease if it did not renew it for longer than
+    lease_seconds. Jobs that have started less than lease_seconds ago
+    are given a chance to take their first lease.
+    """
+    if has_job_lease(connection, job.id):
+        return False
+    if job.started_at is None:
+        return True
+    started_seconds_ago = (datetime.now(timezone.utc) - job.started_at).total_seconds()
+    return started_seconds_ago > lease_seconds
+
+def _is_abandoned_failure(job:Job) -> bool:
+    """
+    Checks if job was moved to failed registry by rq itself,
+    because worker executing it has disappeared
+    """
+    result = job.latest_result()
+    return (
+        result is not None
+        and result.type == Result.Type.FAILED
+        and "AbandonedJobError" in (result.exc_string or ""))
+
+def is_awaiting_requeue(job:Job, max_requeues:int=STALE_JOB_MAX_REQUEUES) -> bool:
+    """
+    Checks if failed job is going to be requeued by the reaper
+    """
+    return (
+        job.meta.get(STALE_REQUEUES_META_KEY, 0) < max_requeues
+        and _is_abandoned_failure(job))
+
+def _requeue_stale_started_job(
+        queue:Queue,
+        job:Job,
+        max_requeues:int):
+    """
+    Removes job from started registry and puts it back at the front
+    of its queue, or marks it as failed if retry budget is exhausted
+    """
+    requeues = job.meta.get(STALE_REQUEUES_META_KEY, 0)
+    with queue.connection.pipeline() as pipe:
+        queue.started_job_registry.remove_executions(job, pipeline=pipe)
+        if requeues < max_requeues:
+            log.warning(
+                f"\nJob {job.id} lease has expired"
+                f"\nRequeuing job [{requeues+1}/{max_requeues}]")
+            job.meta[STALE_REQUEUES_META_KEY] = requeues + 1
+            job.started_at = None
+            queue.enqueue_job(job, pipeline=pipe, at_front=True)
+        else:
+            log.error(
+                f"\nJob {job.id} lease has expired"
+                f"\nRetry budget of {max_requeues} requeues is exhausted - marking job as failed")
+            job.set_status(RQJobStatus.FAILED, pipeline=pipe)
+            queue.failed_job_registry.add(
+                job,
+                ttl=job.failure_ttl,
+                exc_string=(
+                    f"Job lease has expired {max_requeues+1} times, "
+                    f"worker executing it has most probably died"),
+                pipeline=pipe)
+        pipe.execute()
+
+def _requeue_abandoned_failed_job(
+        queue:Queue,
+        job:Job,
+        max_requeues:int) -> bool:
+    """
+    Requeues job that was moved to failed registry because
+    worker executing it has disappeared, if retry budget allows it
+    """
+    requeues = job.meta.get(STALE_REQUEUES_META_KEY, 0)
+    if requeues >= max_requeues:
+        return False
+    log.warning(
+        f"\nJob {job.id} was abandoned by its worker"
+        f"\nRequeuing job [{requeues+1}/{max_requeues}]")
+    job.meta[STALE_REQUEUES_META_KEY] = requeues + 1
+    job.save_meta()
+    try:
+        queue.failed_job_registry.requeue(job, at_front=True)
+    except InvalidJobOperation:
+        # Job was already requeued by another process
+        return False
+    return True
+
+def _get_unchecked_failed_job_ids(connection:Redis, queue:Queue) -> tuple[list[str], Optional[dict]]:
+    """
+    Returns ids of jobs that were added to failed registry since the previous run,
+    with watermark to save when they are checked.
+    Registry is sorted by expiry time (time of failure + failure ttl), so only
+    entries from the newest score seen by the previous run are read and every
+    failure is checked once, instead of the whole registry on every run.
+    Scores have one second resolution, so jobs already checked
+    at the watermark score are remembered and skipped
+    """
+    watermark = connection.hgetall(get_failed_watermark_key(queue.name))
+    watermark_score = float(watermark[b"score"]) if watermark else None
+    checked_job_ids = set(as_text(watermark[b"job_ids"]).split(",")) if watermark else set()
+    entries = [
+        (queue.failed_job_registry.parse_job_id(entry), score)
+        for entry, score in connection.zrangebyscore(
+            queue.failed_job_registry.key,
+            "-inf" if watermark_score is None else watermark_score,
+            "+inf",
+            withscores=True)
+    ]
+    new_job_ids = [job_id for job_id, _ in entries if job_id not in checked_job_ids]
+    if not new_job_ids:
+        return [], None
+    newest_score = entries[-1][1]
+    job_ids_at_score = {job_id for job_id, score in entries if score == newest_score}
+    if newest_score == watermark_score:
+        job_ids_at_score |= checked_job_ids
+    return new_job_ids, {"score": newest_score, "job_ids": ",".join(sorted(job_ids_at_score))}
+
+def reap_stale_jobs(
+        connection:Redis,
+        lease_seconds:int=STALE_JOB_TRESHOLD_SECONDS,
+        max_requeues:int=STALE_JOB_MAX_REQUEUES) -> int:
+    """
+    Finds jobs whose workers have stopped renewing their leases
+    (i.e. container was killed mid job) and puts them back into their queues.
+    Tasks skip work that was already saved, so requeued jobs resume
+    where the previous attempt stopped.
+    Failed jobs are checked only once, after they were added to failed registry.
+    Returns number of reaped jobs
+    """
+    reaped = 0
+    for queue_name in QUEUE_NAMES:
+        for lane_name in get_queue_lane_names(queue_name):
+            queue = Queue(lane_name, connection=connection)
+            for job_id in queue.started_job_registry.get_job_ids(cleanup=False):
+                try:
+                    job = Job.fetch(job_id, connection=connection)
+                except NoSuchJobError:
+                    continue
+                if not _is_lease_expired(connection, job, lease_seconds):
+                    continue
+                _requeue_stale_started_job(queue, job, max_requeues)
+                reaped += 1
+            failed_job_ids, watermark = _get_unchecked_failed_job_ids(connection, queue)
+            for job in Job.fetch_many(failed_job_ids, connection=connection):
+                if job is None or not is_awaiting_requeue(job, max_requeues):
+                    continue
+                if _requeue_abandoned_failed_job(queue, job, max_requeues):
+                    reaped += 1
+            if watermark is not None:
+                connection.hset(get_failed_watermark_key(lane_name), mapping=watermark)
+    if reaped:
+        log.info(f"Reaped {reaped} stale jobs")
+    return reaped
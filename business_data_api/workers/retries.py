@@ -0,0 +1,76 @@
+import random
+from datetime import datetime, timedelta, timezone
+from types import TracebackType
+from typing import Type
+from rq.job import Job
+
+from config import (
+    LOG_TO_POSTGRE_SQL,
+    SOURCE_LOG_SYNC_PSQL_URL,
+    THROTTLE_RETRY_MAX,
+    THROTTLE_BACKOFF_BASE_SECONDS,
+    THROTTLE_BACKOFF_MAX_SECONDS)
+from logging_utils import setup_logger
+from business_data_api.scraping.exceptions import (
+    WebpageThrottlingException,
+    WebpageInMaintenanceMode)
+
+log = setup_logger(
+    logger_name="worker_throttled_job_retries",
+    log_to_db=LOG_TO_POSTGRE_SQL,
+    log_to_db_url=SOURCE_LOG_SYNC_PSQL_URL)
+
+# Exceptions after which the job should be simply tried again later
+THROTTLE_EXCEPTIONS = (WebpageThrottlingException, WebpageInMaintenanceMode)
+# Job meta keys describing backoff state, returned by job status endpoints
+THROTTLE_RETRIES_META_KEY = "throttle_retries"
+THROTTLE_NEXT_RETRY_AT_META_KEY = "throttle_next_retry_at"
+THROTTLE_REASON_META_KEY = "throttle_reason"
+
+
+def compute_backoff_seconds(
+        attempt:int,
+        base_seconds:int=THROTTLE_BACKOFF_BASE_SECONDS,
+        max_seconds:int=THROTTLE_BACKOFF_MAX_SECONDS,
+        rng:random.Random=random) -> int:
+    """
+    Exponential backoff with jitter. Delay doubles with every attempt
+    (capped at max_seconds) and is randomised within its upper half,
+    so that jobs throttled at the same time do not come back together.
+    """
+    delay = min(max_seconds, base_seconds * 2 ** attempt)
+    return max(1, int(delay / 2 + rng.uniform(0, delay / 2)))
+
+def reschedule_throttled_job(
+        job:Job,
+        exc_type:Type[BaseException],
+        exc_value:BaseException,
+        traceback:TracebackType) -> bool:
+    """
+    Worker exception handler, that instead of failing jobs that were
+    throttled by the scraped webpage (or hit its maintenance window),
+    schedules them again with exponential backoff, up to THROTTLE_RETRY_MAX times.
+    Worker calls exception handlers before it handles job failure, so setting
+    a single retry with computed interval makes rq put the job into
+    the ScheduledJobRegistry instead of the FailedJobRegistry.
+    """
+    if not issubclass(exc_type, THROTTLE_EXCEPTIONS):
+        return True
+    retries = job.meta.get(THROTTLE_RETRIES_META_KEY, 0)
+    if retries >= THROTTLE_RETRY_MAX:
+        log.error(
+            f"\nJob {job.id} was throttled {retries} times"
+            f"\nRetry limit was reached - job will be marked as failed")
+        return True
+    delay = compute_backoff_seconds(retries)
+    next_retry_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+    log.warning(
+        f"\nJob {job.id} has raised {exc_type.__name__}"
+        f"\nRescheduling job in {delay} seconds [{retries+1}/{THROTTLE_RETRY_MAX}]")
+    job.meta[THROTTLE_RETRIES_META_KEY] = retries + 1
+    job.meta[THROTTLE_NEXT_RETRY_AT_META_KEY] = next_retry_at.isoformat()
+    job.meta[THROTTLE_REASON_META_KEY] = exc_type.__name__
+    job.save_meta()
+    job.retries_left = 1
+    job.retry_intervals = [delay]
+    return True
@@ -1,4 +1,5 @@
 import os
+from typing import Callable
 from dotenv import load_dotenv
 from redis import Redis
 from sqlalchemy.exc import IntegrityError
@@ -14,7 +15,13 @@ from logging_utils import setup_logger
 from business_data_api.db import create_sync_sessionmaker
 from business_data_api.scraping.krs_dokumenty_finansowe.model import KRSDokumentyFinansowe
 from business_data_api.db.models import KRSDFDocuments
+from business_data_api.etl.financial_statements import parse_and_store_document
 from business_data_api.scraping.exceptions import ScrapingFunctionFailed
+from business_data_api.workers.leases import job_lease
+from business_data_api.metrics import SCRAPED_ITEMS_PER_JOB, observe_db_write
+from business_data_api.workers.cache_invalidation import (
+    AVAILABLE_DOCUMENTS_CACHE,
+    invalidate_response_cache)
 
 
 load_dotenv()
@@ -27,9 +34,10 @@ sessionmaker = create_sync_sessionmaker(psql_sync_url)
 redis_conn = Redis.from_url(redis_url)
 
 
-def task_scrape_documents(job_id:str, krs:str):
+def task_scrape_documents(job_id:str, krs:str) -> int:
     """
-    Scrape documents that are not available in local DB
+    Scrape documents that are not available in local DB.
+    Returns number of documents written
     """
     log = setup_logger(
         logger_name=f"worker_scrape_krs_df_documents",
@@ -38,6 +46,15 @@ def task_scrape_documents(job_id:str, krs:str):
         log_to_db_url=psql_log_url
         )
     log.info(f"Starting process of scraping documents for krs {krs}")
+    with job_lease(redis_conn, job_id, stale_job_treshold_seconds) as heartbeat:
+        return _scrape_documents(log, krs, heartbeat)
+
+def _scrape_documents(log, krs:str, heartbeat:Callable[[], None]) -> int:
+    """
+    Scraping loop of the task. Documents that are already stored are skipped,
+    so if job is requeued after its worker has died, it resumes from the
+    first document that was not saved yet.
+    """
     log.debug(f"Starting DB session")
     log.debug(f"Fetching information about locally avaiable documents")
     with sessionmaker() as session:
@@ -50,7 +67,11 @@ def task_scrape_documents(job_id:str, krs:str):
     log.debug(f"There are {len(available_hash_ids)} documents available locally")
     log.debug(f"Initialising scraper object")
     try:
-        krsdf = KRSDokumentyFinansowe(krs)
+        # Lease is renewed after every response, since loading the first page
+        # and walking pages with already stored documents send many requests
+        krsdf = KRSDokumentyFinansowe(
+            krs,
+            response_hooks=[lambda response, *args, **kwargs: heartbeat()])
         krsdf.download_documents(
             document_hash_id_s_to_omit = available_hash_ids
         )
@@ -61,11 +82,13 @@ def task_scrape_documents(job_id:str, krs:str):
             f"\nException: {str(e)}")
         raise e
     log.debug("Starting scraping process")
+    documents_written = 0
     while hash_id := krsdf.download_documents_next_id_value():
+        heartbeat()
         log.debug(f"Scraping hash id {hash_id}")
         try:
             document = krsdf.download_documents_scrape_id()
-        except ScrapingFunctionFailed:
+        except ScrapingFunctionFailed as e:
             log.warning(
                 f"\nScraping exception has occured during process"
                 f"\nprocess for hash_id: {hash_id}"
@@ -79,10 +102,12 @@ def task_scrape_documents(job_id:str, krs:str):
             raise e
         data_row = KRSDFDocuments(**document)
         log.debug(f"Inserting hash id into database")
-        with sessionmaker() as session:
+        with sessionmaker() as session, observe_db_write(KRSDFDocuments.__tablename__):
             try:
                 session.add(data_row)
                 session.commit()
+                documents_written += 1
+                invalidate_response_cache(redis_conn, AVAILABLE_DOCUMENTS_CACHE, krs)
             except IntegrityError as e:
                 session.rollback()
                 log.warning(
@@ -99,4 +124,33 @@ def task_scrape_documents(job_id:str, krs:str):
                     f"\nDocument to the DB"
                     f"\nException: {str(e)}"
                 )
-                raise e
\ No newline at end of file
+                raise e
+        _parse_financial_facts(log, document)
+    log.info(f"Scraping process has finished - {documents_written} documents written")
+    SCRAPED_ITEMS_PER_JOB.labels("task_scrape_documents", "pages").observe(krsdf.download_documents_pages_loaded)
+    SCRAPED_ITEMS_PER_JOB.labels("task_scrape_documents", "documents").observe(documents_written)
+    return documents_written
+
+def _parse_financial_facts(log, document:dict):
+    """
+    Parses facts of XML financial statement that was just scraped,
+    while its content is still in memory. Parsing failure does not fail
+    the job - document without parse result is parsed by backfill
+    """
+    try:
+        result = parse_and_store_document(
+            sessionmaker,
+            (
+                document["hash_id"],
+                document["krs_number"],
+                document["document_content_file_extension"],
+                document["document_content"]))
+    except Exception as e:
+        log.warning(
+            f"\nException has occured while parsing financial facts"
+            f"\nof hash id: {document['hash_id']}"
+            f"\nException: {str(e)}")
+        return
+    log.debug(
+        f"Parsed hash id {document['hash_id']} - {result['parse_status']},"
+        f" {len(result['facts'])} facts in {result['parse_seconds']:.3f}s")
@@ -1,15 +1,101 @@
+import time
 import redis
 from rq import Worker, Queue
+from rq.exceptions import InvalidJobOperation
 from typing import Literal
 
-from config import REDIS_URL
+from config import (
+    REDIS_URL,
+    WORKER_MAX_CONSECUTIVE_HIGH_PRIORITY_JOBS,
+    LOG_TO_POSTGRE_SQL,
+    SOURCE_LOG_SYNC_PSQL_URL)
+from logging_utils import setup_logger
+from business_data_api.workers.queues import (
+    get_queue_lane_names,
+    is_high_priority_lane,
+    migrate_legacy_queue)
+from business_data_api.workers.retries import reschedule_throttled_job
+from business_data_api.workers.events import publish_job_event
+from business_data_api.metrics import JOB_SECONDS, get_task_name
+
+log = setup_logger(
+    logger_name="worker",
+    log_to_db=LOG_TO_POSTGRE_SQL,
+    log_to_db_url=SOURCE_LOG_SYNC_PSQL_URL)
 
 redis_url = REDIS_URL
 conn = redis.from_url(redis_url)
 
 
-def run_worker(queue_name:Literal["KRSAPI", "KRSDF"]):
-    queue = Queue(queue_name, connection=conn)
-    worker = Worker(queue, connection=conn)
-    worker.work()
+class PriorityWorker(Worker):
+    """
+    Worker that always drains high priority lanes first.
+    To prevent starvation of bulk lanes, after taking
+    max_consecutive_high_jobs jobs in a row from high priority lanes
+    worker checks bulk lanes first for the next dequeue.
+    """
+    def __init__(self, *args, max_consecutive_high_jobs:int=10, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_consecutive_high_jobs = max_consecutive_high_jobs
+        self._consecutive_high_jobs = 0
+        self._priority_ordered_queues = self._ordered_queues[:]
+
+    def reorder_queues(self, reference_queue:Queue):
+        if is_high_priority_lane(reference_queue.name):
+            self._consecutive_high_jobs += 1
+        else:
+            self._consecutive_high_jobs = 0
+        if self._consecutive_high_jobs >= self.max_consecutive_high_jobs:
+            self._ordered_queues = (
+                [q for q in self._priority_ordered_queues if not is_high_priority_lane(q.name)]
+                +
+                [q for q in self._priority_ordered_queues if is_high_priority_lane(q.name)]
+            )
+        else:
+            self._ordered_queues = self._priority_ordered_queues[:]
+
+    # Job is run in forked work horse, duration is measured by the worker
+    # until the horse has finished, so it includes failed and killed horses
+    def execute_job(self, job, queue):
+        start = time.perf_counter()
+        try:
+            return super().execute_job(job, queue)
+        finally:
+            try:
+                outcome = job.get_status(refresh=True)
+            except InvalidJobOperation:
+                # Job has already expired from redis
+                outcome = None
+            JOB_SECONDS.labels(
+                get_task_name(job.func_name),
+                getattr(outcome, "value", outcome) or "unknown"
+            ).observe(time.perf_counter() - start)
+
+    # Job status transitions are published to redis pub/sub,
+    # so that API can push them to clients instead of clients polling
+    def prepare_job_execution(self, job, *args, **kwargs):
+        super().prepare_job_execution(job, *args, **kwargs)
+        publish_job_event(self.connection, job, job.get_status(refresh=False))
 
+    def handle_job_success(self, job, *args, **kwargs):
+        super().handle_job_success(job, *args, **kwargs)
+        publish_job_event(self.connection, job, job.get_status(refresh=False))
+
+    def handle_job_failure(self, job, *args, **kwargs):
+        super().handle_job_failure(job, *args, **kwargs)
+        # Throttled jobs are rescheduled, so status can also be scheduled
+        publish_job_event(self.connection, job, job.get_status(refresh=False))
+
+
+def run_worker(queue_name:Literal["KRSAPI", "KRSDF"]):
+    moved_jobs = migrate_legacy_queue(conn, queue_name)
+    if moved_jobs:
+        log.info(f"Moved {moved_jobs} jobs from legacy {queue_name} queue into priority lanes")
+    queues = [Queue(lane_name, connection=conn) for lane_name in get_queue_lane_names(queue_name)]
+    worker = PriorityWorker(
+        queues,
+        connection=conn,
+        exception_handlers=[reschedule_throttled_job],
+        max_consecutive_high_jobs=WORKER_MAX_CONSECUTIVE_HIGH_PRIORITY_JOBS)
+    # Scheduler moves rescheduled jobs back to their queues when they are due
+    worker.work(with_scheduler=True)
@@ -11,7 +11,32 @@ REDIS_HOST = os.getenv("REDIS_HOST", "redis://redis")
 REDIS_PORT = os.getenv("REDIS_PORT", "6379/0")
 REDIS_URL = f"{REDIS_HOST}:{REDIS_PORT}"
 SCRAPE_BATCH_SIZE = os.getenv("SCRAPE_BATCH_SIZE", 40)
-STALE_JOB_TRESHOLD_SECONDS = os.getenv("STALE_JOB_TRESHOLD_SECONDS", 600)
+STALE_JOB_TRESHOLD_SECONDS = int(os.getenv("STALE_JOB_TRESHOLD_SECONDS", 600))
+STALE_JOB_MAX_REQUEUES = int(os.getenv("STALE_JOB_MAX_REQUEUES", 3))
+STALE_JOB_REAPER_INTERVAL_SECONDS = int(os.getenv("STALE_JOB_REAPER_INTERVAL_SECONDS", 60))
+THROTTLE_RETRY_MAX = int(os.getenv("THROTTLE_RETRY_MAX", 5))
+THROTTLE_BACKOFF_BASE_SECONDS = int(os.getenv("THROTTLE_BACKOFF_BASE_SECONDS", 60))
+THROTTLE_BACKOFF_MAX_SECONDS = int(os.getenv("THROTTLE_BACKOFF_MAX_SECONDS", 3600))
+JOB_RESULT_TTL_SECONDS = int(os.getenv("JOB_RESULT_TTL_SECONDS", 3600))
+JOB_FAILURE_TTL_SECONDS = int(os.getenv("JOB_FAILURE_TTL_SECONDS", 3600))
+JOB_ARCHIVE_BATCH_SIZE = int(os.getenv("JOB_ARCHIVE_BATCH_SIZE", 500))
+JOB_ARCHIVE_INTERVAL_SECONDS = int(os.getenv("JOB_ARCHIVE_INTERVAL_SECONDS", 60))
+API_REDIS_THREADPOOL_SIZE = int(os.getenv("API_REDIS_THREADPOOL_SIZE", 20))
+API_BATCH_MAX_SIZE = int(os.getenv("API_BATCH_MAX_SIZE", 5000))
+API_JOB_EVENTS_KEEPALIVE_SECONDS = int(os.getenv("API_JOB_EVENTS_KEEPALIVE_SECONDS", 15))
+API_RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("API_RESPONSE_CACHE_TTL_SECONDS", 86400))
+WORKER_MAX_CONSECUTIVE_HIGH_PRIORITY_JOBS = int(os.getenv("WORKER_MAX_CONSECUTIVE_HIGH_PRIORITY_JOBS", 10))
+JOB_COALESCE_FRESHNESS_SECONDS = int(os.getenv("JOB_COALESCE_FRESHNESS_SECONDS", 900))
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", 9100))
+WORKER_METRICS_DIR = os.getenv("WORKER_METRICS_DIR", "/tmp/business_data_api_metrics")
+ETL_BATCH_SIZE = int(os.getenv("ETL_BATCH_SIZE", 1000))
+ETL_POLL_SECONDS = float(os.getenv("ETL_POLL_SECONDS", 10))
+ETL_SAFETY_LAG_SECONDS = int(os.getenv("ETL_SAFETY_LAG_SECONDS", 5))
+EXPORT_OUTPUT_DIR = os.getenv("EXPORT_OUTPUT_DIR", "./exports/krs_api")
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 1000))
+EXPORT_ROWS_PER_FILE = int(os.getenv("EXPORT_ROWS_PER_FILE", 1000000))
+FINANCIAL_FACTS_BATCH_SIZE = int(os.getenv("FINANCIAL_FACTS_BATCH_SIZE", 200))
+FINANCIAL_FACTS_PROCESSES = int(os.getenv("FINANCIAL_FACTS_PROCESSES", 0))
 
 SOURCE_PSQL_HOST = os.getenv("POSTGRES_HOST", "localhost")
 SOURCE_PSQL_PORT = os.getenv("POSTGRES_PORT", "5432")
@@ -47,6 +72,18 @@ SPARK_SINK_PSQL_USER = os.getenv("PSQLD_SPARK_WRITE_TO_DB_USER")
 SPARK_SINK_PSQL_PASSWORD = os.getenv("PSQLD_SPARK_WRITE_TO_DB_PASSWORD")
 SPARK_SINK_PSQL_DATABASE = os.getenv("PSQLD_SPARK_WRITE_TO_DB_DATABASE")
 SPARK_SINK_PSQL_SCHEME = os.getenv("PSQLD_SPARK_WRITE_TO_DD_SCHEME")
+SPARK_SINK_JDBC_URL = "jdbc:postgresql://{HOST}:{PORT}/{DB}".format(
+    HOST=SPARK_SINK_PSQL_HOST,
+    PORT=SPARK_SINK_PSQL_PORT,
+    DB=SPARK_SINK_PSQL_DATABASE
+)
+SPARK_SINK_SYNC_PSQL_URL = "postgresql+psycopg://{USER}:{PASSWORD}@{HOST}:{PORT}/{DB}".format(
+    USER=SPARK_SINK_PSQL_USER,
+    PASSWORD=SPARK_SINK_PSQL_PASSWORD,
+    HOST=SPARK_SINK_PSQL_HOST,
+    PORT=SPARK_SINK_PSQL_PORT,
+    DB=SPARK_SINK_PSQL_DATABASE
+)
 
 SPARK_SOURCE_KAFKA_HOST = os.getenv("PSQLD_KAFKA_STREAM_HOST", "localhost")
 SPARK_SOURCE_KAFKA_PORT = os.getenv("PSQLD_KAFKA_STREAM_PORT", "9092")
@@ -66,7 +103,23 @@ SPARK_ENGINE_KRSAPI_CHECKPOINTS = os.getenv(
 
 SPARK_EXECUTOR_MEMORY = os.getenv("SPARK_EXECUTOR_MEMORY", "4g")
 SPARK_EXECUTOR_CORES = os.getenv("SPARK_EXECUTOR_CORES", "2")
+SPARK_JARS_PACKAGES = os.getenv(
+    "SPARK_JARS_PACKAGES",
+    "org.apache.spark:spark-sql-kafka-0-10_2.13:4.0.0,org.postgresql:postgresql:42.7.4")
+SPARK_SOURCE = os.getenv("SPARK_SOURCE", "kafka")
+SPARK_FILE_SOURCE_PATH = os.getenv("SPARK_FILE_SOURCE_PATH", "./spark_etl/input")
+SPARK_TRIGGER_INTERVAL = os.getenv("SPARK_TRIGGER_INTERVAL", "10 seconds")
+SPARK_MAX_OFFSETS_PER_TRIGGER = int(os.getenv("SPARK_MAX_OFFSETS_PER_TRIGGER", 10000))
+SPARK_PARTITIONS = int(os.getenv("SPARK_PARTITIONS", 8))
+SPARK_JDBC_BATCH_SIZE = int(os.getenv("SPARK_JDBC_BATCH_SIZE", 5000))
 
 KRS_API_URL = os.getenv("KRS_API_URL")
 AUTOMATION_REFRESH_INTERVAL_HOURS = int(os.getenv("REFRESH_INTERVAL_HOURS", 24))
-AUTOMATION_NUM_OF_DAYS_TO_CHECK = int(os.getenv("NUM_OF_DAYS_TO_CHECK",1))
\ No newline at end of file
+AUTOMATION_NUM_OF_DAYS_TO_CHECK = int(os.getenv("NUM_OF_DAYS_TO_CHECK",1))
+AUTOMATION_ENQUEUE_MODE = os.getenv("AUTOMATION_ENQUEUE_MODE", "redis")
+AUTOMATION_ENQUEUE_BATCH_SIZE = int(os.getenv("AUTOMATION_ENQUEUE_BATCH_SIZE", 1000))
+AUTOMATION_BIULETYN_WINDOW_HOURS = int(os.getenv("AUTOMATION_BIULETYN_WINDOW_HOURS", 6))
+AUTOMATION_BIULETYN_MAX_WORKERS = int(os.getenv("AUTOMATION_BIULETYN_MAX_WORKERS", 4))
+AUTOMATION_REFRESH_FRESHNESS_HOURS = int(os.getenv("AUTOMATION_REFRESH_FRESHNESS_HOURS", 24))
+AUTOMATION_LEASE_SECONDS = int(os.getenv("AUTOMATION_LEASE_SECONDS", 60))
+AUTOMATION_METRICS_PORT = int(os.getenv("AUTOMATION_METRICS_PORT", 9101))
\ No newline at end of file
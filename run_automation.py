@@ -5,13 +5,15 @@ from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.events import EVENT_JOB_SUBMITTED, EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
 
 from logging_utils import setup_logger
-from automation_scripts.check_for_krs_updates import check_for_updates
+from automation_scripts.check_for_krs_updates import check_for_updates_as_leader
+from business_data_api.metrics import start_metrics_server
 from config import (
     AUTOMATION_REFRESH_INTERVAL_HOURS, 
     AUTOMATION_NUM_OF_DAYS_TO_CHECK,
     KRS_API_URL,
     LOG_TO_POSTGRE_SQL,
-    SOURCE_LOG_SYNC_PSQL_URL
+    SOURCE_LOG_SYNC_PSQL_URL,
+    AUTOMATION_METRICS_PORT
     )
 
 
@@ -24,6 +26,9 @@ if __name__ == "__main__":
     )
     log.propagate = False
     log.info(f"Initialising scheduler pid={os.getpid()}")
+    if AUTOMATION_METRICS_PORT:
+        log.info(f"Serving metrics on port {AUTOMATION_METRICS_PORT}")
+        start_metrics_server(AUTOMATION_METRICS_PORT)
     schd = BlockingScheduler(timezone="Europe/Warsaw")
     def schd_event(event):
         if hasattr(event, "scheduled_run_times"):
@@ -61,8 +66,10 @@ if __name__ == "__main__":
                 id=event.job_id,
                 run_eta=next_run))
     schd.add_listener(schd_event, EVENT_JOB_ERROR | EVENT_JOB_EXECUTED | EVENT_JOB_SUBMITTED)
+    # Every replica schedules the job, but only the one holding
+    # the leader lease in redis runs it
     job = schd.add_job(
-        check_for_updates,
+        check_for_updates_as_leader,
         IntervalTrigger(hours=AUTOMATION_REFRESH_INTERVAL_HOURS, jitter=15),
         next_run_time=datetime.datetime.now(tz=ZoneInfo("Europe/Warsaw")),
         args=[KRS_API_URL, AUTOMATION_NUM_OF_DAYS_TO_CHECK],
@@ -0,0 +1,53 @@
+import argparse
+
+from logging_utils import setup_logger
+from business_data_api.db import create_sync_sessionmaker, create_tables
+from business_data_api.db.backfills import backfill_document_periods
+from business_data_api.etl.financial_statements import backfill_financial_facts
+from config import (
+    SOURCE_SYNC_PSQL_URL,
+    LOG_TO_POSTGRE_SQL,
+    SOURCE_LOG_SYNC_PSQL_URL
+    )
+
+# Backfills that can be run by name
+BACKFILLS = {
+    "document-periods": backfill_document_periods,
+    "financial-facts": backfill_financial_facts,
+}
+# Backfills that process rows with pool of processes
+PARALLEL_BACKFILLS = ("financial-facts",)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Script populating columns added to existing tables")
+    parser.add_argument("backfill",
+                        choices=list(BACKFILLS),
+                        help="Name of the backfill to run")
+    parser.add_argument("--batch-size",
+                        type=int,
+                        required=False,
+                        help="How many rows are updated in single transaction (default: 1000, financial-facts: FINANCIAL_FACTS_BATCH_SIZE)")
+    parser.add_argument("--processes",
+                        type=int,
+                        required=False,
+                        help="How many processes parse rows of financial-facts backfill (default: FINANCIAL_FACTS_PROCESSES)")
+    args = parser.parse_args()
+    if args.processes is not None and args.backfill not in PARALLEL_BACKFILLS:
+        parser.error(f"--processes can only be used with {', '.join(PARALLEL_BACKFILLS)}")
+    options = {
+        option: value
+        for option, value in (("batch_size", args.batch_size), ("processes", args.processes))
+        if value is not None
+    }
+    log = setup_logger(
+        logger_name="backfill_log",
+        log_to_db=LOG_TO_POSTGRE_SQL,
+        log_to_db_url=SOURCE_LOG_SYNC_PSQL_URL
+    )
+    log.propagate = False
+    log.info(f"Running backfill {args.backfill}")
+    create_tables(SOURCE_SYNC_PSQL_URL)
+    sessionmaker = create_sync_sessionmaker(SOURCE_SYNC_PSQL_URL)
+    rows_processed = BACKFILLS[args.backfill](sessionmaker, **options)
+    log.info(f"Backfill {args.backfill} has finished - {rows_processed} rows processed")
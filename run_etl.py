@@ -0,0 +1,57 @@
+import argparse, os, signal
+
+from logging_utils import setup_logger
+from business_data_api.db import create_sync_sessionmaker, create_tables
+from business_data_api.etl.krs_api_extracts import run_incremental_etl
+from config import (
+    SOURCE_SYNC_PSQL_URL,
+    ETL_BATCH_SIZE,
+    ETL_POLL_SECONDS,
+    ETL_SAFETY_LAG_SECONDS,
+    LOG_TO_POSTGRE_SQL,
+    SOURCE_LOG_SYNC_PSQL_URL
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Incremental ETL flattening raw KRS API extracts into company tables")
+    parser.add_argument("--batch-size",
+                        type=int,
+                        default=ETL_BATCH_SIZE,
+                        required=False,
+                        help=f"How many extracts are loaded in single transaction (default: {ETL_BATCH_SIZE})")
+    parser.add_argument("--poll-seconds",
+                        type=float,
+                        default=ETL_POLL_SECONDS,
+                        required=False,
+                        help=f"How long to wait for new extracts when all were loaded (default: {ETL_POLL_SECONDS})")
+    parser.add_argument("--once",
+                        action="store_true",
+                        help="Load all new extracts and exit, instead of waiting for new ones")
+    args = parser.parse_args()
+    log = setup_logger(
+        logger_name="etl_log",
+        log_to_db=LOG_TO_POSTGRE_SQL,
+        log_to_db_url=SOURCE_LOG_SYNC_PSQL_URL
+    )
+    log.propagate = False
+    log.info(f"Initialising incremental ETL of KRS API extracts pid={os.getpid()}")
+    create_tables(SOURCE_SYNC_PSQL_URL)
+    sessionmaker = create_sync_sessionmaker(SOURCE_SYNC_PSQL_URL)
+    # Batch that is being loaded is finished (and checkpointed) before exit
+    stopping = []
+    def _graceful(*_):
+        stopping.append(True)
+    signal.signal(signal.SIGTERM, _graceful)
+    signal.signal(signal.SIGINT, _graceful)
+    stats = run_incremental_etl(
+        sessionmaker,
+        batch_size=args.batch_size,
+        safety_lag_seconds=ETL_SAFETY_LAG_SECONDS,
+        poll_seconds=args.poll_seconds,
+        once=args.once,
+        should_stop=lambda: bool(stopping))
+    print(
+        f"Loaded {stats['extracts_loaded']} extracts in {stats['elapsed_seconds']:.2f}s "
+        f"({stats['extracts_per_second']:.1f} extracts/sec)")
@@ -0,0 +1,51 @@
+import argparse
+
+from logging_utils import setup_logger
+from business_data_api.db import create_sync_sessionmaker
+from business_data_api.etl.parquet_export import export_extracts
+from config import (
+    SOURCE_SYNC_PSQL_URL,
+    EXPORT_OUTPUT_DIR,
+    EXPORT_CHUNK_SIZE,
+    EXPORT_ROWS_PER_FILE,
+    ETL_SAFETY_LAG_SECONDS,
+    LOG_TO_POSTGRE_SQL,
+    SOURCE_LOG_SYNC_PSQL_URL
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export of current KRS API extracts into parquet files")
+    parser.add_argument("kind",
+                        choices=["snapshot", "delta"],
+                        help="snapshot - all current extracts, delta - extracts stored after the last export")
+    parser.add_argument("--output-dir",
+                        default=EXPORT_OUTPUT_DIR,
+                        required=False,
+                        help=f"Directory with exported partitions (default: {EXPORT_OUTPUT_DIR})")
+    parser.add_argument("--chunk-size",
+                        type=int,
+                        default=EXPORT_CHUNK_SIZE,
+                        required=False,
+                        help=f"How many extracts are read from DB and written at once (default: {EXPORT_CHUNK_SIZE})")
+    args = parser.parse_args()
+    log = setup_logger(
+        logger_name="export_log",
+        log_to_db=LOG_TO_POSTGRE_SQL,
+        log_to_db_url=SOURCE_LOG_SYNC_PSQL_URL
+    )
+    log.propagate = False
+    log.info(f"Running {args.kind} export into {args.output_dir}")
+    sessionmaker = create_sync_sessionmaker(SOURCE_SYNC_PSQL_URL)
+    stats = export_extracts(
+        sessionmaker,
+        output_dir=args.output_dir,
+        kind=args.kind,
+        chunk_size=args.chunk_size,
+        rows_per_file=EXPORT_ROWS_PER_FILE,
+        safety_lag_seconds=ETL_SAFETY_LAG_SECONDS)
+    print(
+        f"Exported {stats['extracts_exported']} extracts into {stats['partition']} "
+        f"in {stats['elapsed_seconds']:.2f}s ({stats['extracts_per_second']:.1f} extracts/sec)")
+    for dataset, rows_written in stats["rows_written"].items():
+        print(f"  {dataset}: {rows_written} rows")
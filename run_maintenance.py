@@ -0,0 +1,53 @@
+import sys, signal, os
+import redis
+from apscheduler.schedulers.blocking import BlockingScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+
+from logging_utils import setup_logger
+from business_data_api.db import create_sync_sessionmaker, create_tables
+from business_data_api.workers.reaper import reap_stale_jobs
+from business_data_api.workers.archiver import archive_jobs
+from config import (
+    REDIS_URL,
+    SOURCE_SYNC_PSQL_URL,
+    STALE_JOB_REAPER_INTERVAL_SECONDS,
+    JOB_ARCHIVE_INTERVAL_SECONDS,
+    LOG_TO_POSTGRE_SQL,
+    SOURCE_LOG_SYNC_PSQL_URL
+    )
+
+
+if __name__ == "__main__":
+    log = setup_logger(
+        logger_name="maintenance_scheduler_log",
+        log_to_db=LOG_TO_POSTGRE_SQL,
+        log_to_db_url=SOURCE_LOG_SYNC_PSQL_URL
+    )
+    log.propagate = False
+    log.info(f"Initialising maintenance scheduler pid={os.getpid()}")
+    conn = redis.from_url(REDIS_URL)
+    create_tables(SOURCE_SYNC_PSQL_URL)
+    sessionmaker = create_sync_sessionmaker(SOURCE_SYNC_PSQL_URL)
+    schd = BlockingScheduler(timezone="Europe/Warsaw")
+    schd.add_job(
+        reap_stale_jobs,
+        IntervalTrigger(seconds=STALE_JOB_REAPER_INTERVAL_SECONDS),
+        args=[conn],
+        max_instances=1,
+        coalesce=True,
+        id="stale_job_reaper"
+    )
+    schd.add_job(
+        archive_jobs,
+        IntervalTrigger(seconds=JOB_ARCHIVE_INTERVAL_SECONDS),
+        args=[conn, sessionmaker],
+        max_instances=1,
+        coalesce=True,
+        id="job_history_archiver"
+    )
+    def _graceful(*_):
+        schd.shutdown(wait=False)
+        sys.exit(0)
+    signal.signal(signal.SIGTERM, _graceful)
+    signal.signal(signal.SIGINT, _graceful)
+    schd.start()
@@ -1,4 +1,42 @@
+import argparse
+
 from spark_etl.spark_stream_krs_api import run_krs_api_stream
+from config import (
+    SPARK_ENGINE_KRSAPI_URL,
+    SPARK_SOURCE,
+    SPARK_TRIGGER_INTERVAL,
+    SPARK_MAX_OFFSETS_PER_TRIGGER,
+    SPARK_PARTITIONS
+    )
 
 if __name__ == "__main__":
-    run_krs_api_stream()
+    parser = argparse.ArgumentParser(description="Spark stream exploding KRS API extracts into company tables")
+    parser.add_argument("--master",
+                        default=SPARK_ENGINE_KRSAPI_URL,
+                        help="Spark master url, or local[*] to run without cluster (default: SPARK_ENGINE_KRSAPI_URL)")
+    parser.add_argument("--source",
+                        choices=["kafka", "file"],
+                        default=SPARK_SOURCE,
+                        help=f"Source of Debezium events (default: {SPARK_SOURCE})")
+    parser.add_argument("--trigger-interval",
+                        default=SPARK_TRIGGER_INTERVAL,
+                        help=f"Micro-batch trigger interval (default: {SPARK_TRIGGER_INTERVAL})")
+    parser.add_argument("--max-offsets-per-trigger",
+                        type=int,
+                        default=SPARK_MAX_OFFSETS_PER_TRIGGER,
+                        help=f"Max events (files for file source) per micro-batch (default: {SPARK_MAX_OFFSETS_PER_TRIGGER})")
+    parser.add_argument("--partitions",
+                        type=int,
+                        default=SPARK_PARTITIONS,
+                        help=f"Partitions of micro-batch (default: {SPARK_PARTITIONS})")
+    parser.add_argument("--available-now",
+                        action="store_true",
+                        help="Process all available events and stop")
+    args = parser.parse_args()
+    run_krs_api_stream(
+        master=args.master,
+        source=args.source,
+        trigger_interval=args.trigger_interval,
+        max_offsets_per_trigger=args.max_offsets_per_trigger,
+        partitions=args.partitions,
+        available_now=args.available_now)
@@ -1,7 +1,12 @@
 import sys
+from config import WORKER_METRICS_PORT, WORKER_METRICS_DIR
+from business_data_api.metrics import enable_multiprocess_metrics, start_metrics_server
 from business_data_api.workers.worker import run_worker
 
 queue_name = sys.argv[1] if len(sys.argv) > 1 else 'KRSAPI'
 
 if __name__ == "__main__":
+    if WORKER_METRICS_PORT:
+        enable_multiprocess_metrics(WORKER_METRICS_DIR)
+        start_metrics_server(WORKER_METRICS_PORT, WORKER_METRICS_DIR)
     run_worker(queue_name)
@@ -0,0 +1,365 @@
+import json
+import time
+from typing import Literal, Optional
+from pyspark.sql import DataFrame, SparkSession, Window
+from pyspark.sql import functions as F
+from pyspark.sql.types import (
+    ArrayType,
+    BooleanType,
+    IntegerType,
+    LongType,
+    StringType,
+    StructField,
+    StructType)
+from sqlalchemy import Boolean, Integer, create_engine, text
+
+from config import (
+    LOG_TO_POSTGRE_SQL,
+    SOURCE_LOG_SYNC_PSQL_URL,
+    SPARK_ENGINE_KRSAPI_URL,
+    SPARK_ENGINE_KRSAPI_CHECKPOINTS,
+    SPARK_EXECUTOR_MEMORY,
+    SPARK_EXECUTOR_CORES,
+    SPARK_JARS_PACKAGES,
+    SPARK_SOURCE,
+    SPARK_FILE_SOURCE_PATH,
+    SPARK_SOURCE_KAFKA_URL,
+    SPARK_SOURCE_KAFKA_SUB_PATH,
+    SPARK_TRIGGER_INTERVAL,
+    SPARK_MAX_OFFSETS_PER_TRIGGER,
+    SPARK_PARTITIONS,
+    SPARK_JDBC_BATCH_SIZE,
+    SPARK_SINK_JDBC_URL,
+    SPARK_SINK_SYNC_PSQL_URL,
+    SPARK_SINK_PSQL_USER,
+    SPARK_SINK_PSQL_PASSWORD,
+    SPARK_SINK_PSQL_SCHEME)
+from logging_utils import setup_logger
+from business_data_api.db.models import CompanyInfo
+from business_data_api.etl.krs_api_extracts import CHILD_TABLES, flatten_extract
+
+log = setup_logger(
+    logger_name="spark_stream_krs_api",
+    log_to_db=LOG_TO_POSTGRE_SQL,
+    log_to_db_url=SOURCE_LOG_SYNC_PSQL_URL)
+
+SourceType = Literal["kafka", "file"]
+SinkType = Literal["jdbc", "noop"]
+
+# Tables the extract is exploded into - the same ones that are populated
+# by local incremental ETL (run_etl.py), with the same flattening rules
+SINK_TABLES = {"company_info": CompanyInfo, **CHILD_TABLES}
+# Columns filled by database
+_DATABASE_COLUMNS = ("record_updated_at",)
+# Debezium row of raw_krs_api_full_extract. JSONB column is sent as string
+_EXTRACT_ROW_SCHEMA = StructType([
+    StructField("id", LongType()),
+    StructField("krs_number", StringType()),
+    StructField("is_current", BooleanType()),
+    StructField("record_created_at", StringType()),
+    StructField("raw_data", StringType()),
+])
+_CHANGE_SCHEMA = StructType([
+    StructField("before", _EXTRACT_ROW_SCHEMA),
+    StructField("after", _EXTRACT_ROW_SCHEMA),
+    StructField("op", StringType()),
+    StructField("ts_ms", LongType()),
+])
+# Change is sent as the whole message when converter schemas are disabled,
+# or wrapped in "payload" when they are enabled
+DEBEZIUM_EVENT_SCHEMA = StructType(_CHANGE_SCHEMA.fields + [
+    StructField("payload", _CHANGE_SCHEMA),
+])
+# Inserted extracts and snapshot reads. Updates are dropped,
+# since they only flip is_current of older extracts to false
+DEBEZIUM_EXTRACT_OPERATIONS = ("c", "r")
+
+
+def get_sink_columns(table:str) -> list:
+    return [
+        column for column in SINK_TABLES[table].__table__.columns
+        if column.name not in _DATABASE_COLUMNS
+    ]
+
+def _spark_type(column):
+    if isinstance(column.type, Boolean):
+        return BooleanType()
+    if isinstance(column.type, Integer):
+        return IntegerType()
+    return StringType()
+
+def get_sink_row_schema(table:str) -> StructType:
+    """
+    Returns spark schema of rows of sink table, derived from its model
+    """
+    return StructType([
+        StructField(column.name, _spark_type(column), nullable=column.nullable)
+        for column in get_sink_columns(table)
+    ])
+
+FLATTENED_EXTRACT_SCHEMA = StructType([
+    StructField(table, ArrayType(get_sink_row_schema(table)))
+    for table in SINK_TABLES
+])
+
+def to_struct_values(rows:dict[str, list[dict]]) -> tuple:
+    """
+    Converts flattened extract into values of FLATTENED_EXTRACT_SCHEMA struct
+    """
+    return tuple(
+        [
+            tuple(row.get(column.name) for column in get_sink_columns(table))
+            for row in rows[table]
+        ]
+        for table in SINK_TABLES
+    )
+
+def _flatten_extract_udf(extract_id:int, krs:str, raw_data:str) -> tuple:
+    return to_struct_values(flatten_extract(extract_id, krs, json.loads(raw_data)))
+
+flatten_extract_udf = F.udf(_flatten_extract_udf, FLATTENED_EXTRACT_SCHEMA)
+
+def build_debezium_event(extract_id:int, krs:str, raw_data:dict, op:str="c") -> str:
+    """
+    Returns Debezium change event of stored extract, as sent to kafka
+    by connector from addons folder. Used by file source stand-in
+    """
+    return json.dumps({
+        "before": None,
+        "after": {
+            "id": extract_id,
+            "krs_number": krs,
+            "is_current": True,
+            "record_created_at": None,
+            "raw_data": json.dumps(raw_data),
+        },
+        "op": op,
+        "ts_ms": int(time.time() * 1000),
+    })
+
+
+## Spark session and source
+def create_spark_session(
+        master:str=SPARK_ENGINE_KRSAPI_URL,
+        app_name:str="krs_api_stream",
+        partitions:int=SPARK_PARTITIONS) -> SparkSession:
+    """
+    Creates spark session. Master can be url of spark cluster
+    or local[*] to run the job inside this process
+    """
+    return (
+        SparkSession.builder
+        .master(master)
+        .appName(app_name)
+        .config("spark.jars.packages", SPARK_JARS_PACKAGES)
+        .config("spark.executor.memory", SPARK_EXECUTOR_MEMORY)
+        .config("spark.executor.cores", SPARK_EXECUTOR_CORES)
+        .config("spark.sql.shuffle.partitions", partitions)
+        .getOrCreate())
+
+def read_change_events(
+        spark:SparkSession,
+        source:SourceType=SPARK_SOURCE,
+        max_offsets_per_trigger:int=SPARK_MAX_OFFSETS_PER_TRIGGER,
+        file_source_path:str=SPARK_FILE_SOURCE_PATH) -> DataFrame:
+    """
+    Returns stream of Debezium change events as single "value" string column.
+    kafka - topic of Debezium connector, at most max_offsets_per_trigger
+    events per micro-batch. file - stand-in source for local runs and tests,
+    reads text files with one event per line from file_source_path
+    (max_offsets_per_trigger is then number of files per micro-batch)
+    """
+    if source == "kafka":
+        return (
+            spark.readStream
+            .format("kafka")
+            .option("kafka.bootstrap.servers", SPARK_SOURCE_KAFKA_URL)
+            .option("subscribe", SPARK_SOURCE_KAFKA_SUB_PATH)
+            .option("startingOffsets", "earliest")
+            .option("maxOffsetsPerTrigger", max_offsets_per_trigger)
+            .load()
+            .select(F.col("value").cast("string").alias("value")))
+    if source == "file":
+        return (
+            spark.readStream
+            .format("text")
+            .option("maxFilesPerTrigger", max_offsets_per_trigger)
+            .load(file_source_path))
+    raise ValueError(f"Unknown source: {source}")
+
+def parse_debezium_events(events:DataFrame) -> DataFrame:
+    """
+    Parses Debezium change events into rows of stored current extracts
+    (id, krs_number, raw_data). Deletes and updates (which only mark older extracts
+    as not current) are dropped
+    """
+    parsed = events.select(F.from_json("value", DEBEZIUM_EVENT_SCHEMA).alias("event"))
+    return (
+        parsed
+        .select(
+            F.coalesce("event.payload.op", "event.op").alias("op"),
+            F.coalesce("event.payload.after", "event.after").alias("after"))
+        .where(
+            F.col("op").isin(*DEBEZIUM_EXTRACT_OPERATIONS)
+            & F.col("after").isNotNull()
+            & F.col("after.is_current"))
+        .select("after.id", "after.krs_number", "after.raw_data"))
+
+
+## Micro-batch sink
+def flatten_extracts(extracts:DataFrame, partitions:int=SPARK_PARTITIONS) -> DataFrame:
+    """
+    Flattens extracts of the micro-batch into single struct column
+    with rows of every sink table. Only the newest extract
+    of every company in the batch is used
+    """
+    newest = Window.partitionBy("krs_number").orderBy(F.col("id").desc())
+    return (
+        extracts
+        .withColumn("rank", F.row_number().over(newest))
+        .where(F.col("rank") == 1)
+        .repartition(partitions, "krs_number")
+        .select(flatten_extract_udf("id", "krs_number", "raw_data").alias("flattened")))
+
+def explode_tables(flattened:DataFrame) -> dict[str, DataFrame]:
+    """
+    Explodes flattened extracts into rows of every sink table
+    """
+    return {
+        table: flattened.select(F.explode(f"flattened.{table}").alias("row")).select("row.*")
+        for table in SINK_TABLES
+    }
+
+def get_staging_table_name(table:str) -> str:
+    return f"{SPARK_SINK_PSQL_SCHEME or 'public'}.spark_staging_{table}"
+
+def build_merge_statements(table:str) -> list[str]:
+    """
+    Returns SQL that moves rows of micro-batch from staging table into sink table.
+    company_info is upserted (never with older extract), rows of list-like
+    tables are replaced for companies of the micro-batch whose company_info
+    upsert won, so rows of an older extract never replace newer ones
+    """
+    staging_table = get_staging_table_name(table)
+    columns = ", ".join(column.name for column in get_sink_columns(table))
+    if table == "company_info":
+        updates = ", ".join(
+            f"{column.name} = EXCLUDED.{column.name}"
+            for column in get_sink_columns(table)
+            if column.name != "krs_number")
+        return [
+            f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging_table} "
+            f"ON CONFLICT (krs_number) DO UPDATE SET {updates}, record_updated_at = now() "
+            f"WHERE {table}.extract_id <= EXCLUDED.extract_id"]
+    # company_info is merged first, so it holds extract id of the upsert winner
+    return [
+        f"DELETE FROM {table} USING ("
+        f"SELECT staging.krs_number FROM {get_staging_table_name('company_info')} staging "
+        f"JOIN company_info ON company_info.krs_number = staging.krs_number "
+        f"AND company_info.extract_id = staging.extract_id) batch "
+        f"WHERE {table}.krs_number = batch.krs_number",
+        f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging_table} staging "
+        f"WHERE EXISTS (SELECT 1 FROM company_info WHERE company_info.krs_number = staging.krs_number "
+        f"AND company_info.extract_id = staging.extract_id)",
+    ]
+
+def write_jdbc_batch(tables:dict[str, DataFrame], jdbc_batch_size:int, partitions:int, sink_engine):
+    """
+    Writes every table of micro-batch into its staging table with batched
+    JDBC inserts, then merges all staging tables in single transaction.
+    Replayed micro-batch gives the same result
+    """
+    for table, rows in tables.items():
+        (
+            rows.write
+            .format("jdbc")
+            .option("url", SPARK_SINK_JDBC_URL)
+            .option("dbtable", get_staging_table_name(table))
+            .option("user", SPARK_SINK_PSQL_USER)
+            .option("password", SPARK_SINK_PSQL_PASSWORD)
+            .option("driver", "org.postgresql.Driver")
+            .option("batchsize", jdbc_batch_size)
+            .option("numPartitions", partitions)
+            # Keeps staging table definition between micro-batches
+            .option("truncate", "true")
+            .mode("overwrite")
+            .save())
+    with sink_engine.begin() as connection:
+        for table in SINK_TABLES:
+            for statement in build_merge_statements(table):
+                connection.execute(text(statement))
+
+def create_batch_writer(
+        sink:SinkType,
+        partitions:int=SPARK_PARTITIONS,
+        jdbc_batch_size:int=SPARK_JDBC_BATCH_SIZE):
+    """
+    Returns foreachBatch function. noop sink only counts rows of every
+    table, to measure transformation throughput without database
+    """
+    sink_engine = create_engine(SPARK_SINK_SYNC_PSQL_URL) if sink == "jdbc" else None
+    if sink_engine is not None:
+        CompanyInfo.metadata.create_all(
+            sink_engine,
+            tables=[model.__table__ for model in SINK_TABLES.values()])
+
+    def write_batch(batch:DataFrame, batch_id:int):
+        start = time.perf_counter()
+        # Extracts are flattened once and reused by every table
+        flattened = flatten_extracts(parse_debezium_events(batch), partitions).persist()
+        tables = explode_tables(flattened)
+        try:
+            if sink == "jdbc":
+                write_jdbc_batch(tables, jdbc_batch_size, partitions, sink_engine)
+                rows_written = None
+            else:
+                rows_written = {table: rows.count() for table, rows in tables.items()}
+        finally:
+            flattened.unpersist()
+        log.info(
+            f"\nMicro-batch {batch_id} written in {time.perf_counter() - start:.2f}s"
+            + (f"\nRows: {rows_written}" if rows_written else ""))
+    return write_batch
+
+
+def run_krs_api_stream(
+        master:str=SPARK_ENGINE_KRSAPI_URL,
+        source:SourceType=SPARK_SOURCE,
+        sink:SinkType="jdbc",
+        trigger_interval:Optional[str]=SPARK_TRIGGER_INTERVAL,
+        max_offsets_per_trigger:int=SPARK_MAX_OFFSETS_PER_TRIGGER,
+        partitions:int=SPARK_PARTITIONS,
+        jdbc_batch_size:int=SPARK_JDBC_BATCH_SIZE,
+        checkpoint_path:str=SPARK_ENGINE_KRSAPI_CHECKPOINTS,
+        file_source_path:str=SPARK_FILE_SOURCE_PATH,
+        available_now:bool=False,
+        await_termination:bool=True):
+    """
+    Streams Debezium change events of raw_krs_api_full_extract and explodes
+    stored extracts into company tables, micro-batch by micro-batch.
+    trigger_interval - i.e. "10 seconds", available_now - process
+    everything that is available in the source and stop.
+    Returns the streaming query
+    """
+    spark = create_spark_session(master=master, partitions=partitions)
+    events = read_change_events(
+        spark,
+        source=source,
+        max_offsets_per_trigger=max_offsets_per_trigger,
+        file_source_path=file_source_path)
+    writer = (
+        events.writeStream
+        .foreachBatch(create_batch_writer(sink, partitions, jdbc_batch_size))
+        .option("checkpointLocation", checkpoint_path))
+    if available_now:
+        writer = writer.trigger(availableNow=True)
+    elif trigger_interval:
+        writer = writer.trigger(processingTime=trigger_interval)
+    log.info(
+        f"\nStarting KRS API stream: master={master}, source={source}, sink={sink},"
+        f"\ntrigger={'available now' if available_now else trigger_interval},"
+        f" max offsets per trigger={max_offsets_per_trigger}, partitions={partitions}")
+    query = writer.start()
+    if await_termination:
+        query.awaitTermination()
+    return query
@@ -0,0 +1,86 @@
+import os
+from datetime import datetime, timezone
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from redis.asyncio import Redis as AsyncRedis
+from sqlalchemy import select
+from business_data_api.api.models import CompanyInfoResponse
+from business_data_api.api.routes.krs_api_services.krs_api import router as krs_api_router
+from business_data_api.db import create_async_sessionmaker
+from business_data_api.db.company_profile import company_profile_columns
+from business_data_api.db.models import RawKSRAPIFullExtract
+
+
+def _company(**fields):
+    return CompanyInfoResponse(
+        record_created_at=datetime(2025, 1, 1, tzinfo=timezone.utc),
+        full_name="SPÓŁKA Z OGRANICZONĄ ODPOWIEDZIALNOŚCIĄ",
+        legal_form="SPÓŁKA Z OGRANICZONĄ ODPOWIEDZIALNOŚCIĄ",
+        krs_number="0000057814",
+        **fields)
+
+def test_webpage_without_scheme_is_accepted():
+    company = _company(webpage="www.example.pl")
+    assert str(company.webpage) == "http://www.example.pl/"
+
+def test_empty_contact_fields_are_none():
+    company = _company(webpage=" ", email="")
+    assert company.webpage is None
+    assert company.email is None
+
+def test_missing_identifiers_are_accepted():
+    company = _company()
+    assert company.nip_number is None
+    assert company.regon_number is None
+
+def test_profile_is_read_from_current_entries_of_full_extract(psql_sessionmaker):
+    extract = {"odpis": {"dane": {"dzial1": {
+        "danePodmiotu": {
+            "nazwa": [
+                {"nazwa": "STARA NAZWA SP. Z O.O.", "nrWpisuWprow": "1", "nrWpisuWykr": "3"},
+                {"nazwa": "NOWA NAZWA SP. Z O.O.", "nrWpisuWprow": "3"}],
+            "formaPrawna": [{"formaPrawna": "SPÓŁKA Z OGRANICZONĄ ODPOWIEDZIALNOŚCIĄ", "nrWpisuWprow": "1"}],
+            "identyfikatory": [{"identyfikatory": {"nip": "1234567890", "regon": "123456789"}, "nrWpisuWprow": "1"}],
+        },
+        "siedzibaIAdres": {
+            "siedziba": [{"kraj": "POLSKA", "wojewodztwo": "MAZOWIECKIE", "nrWpisuWprow": "1"}],
+            "adres": [
+                {"miejscowosc": "KRAKÓW", "kodPocztowy": "30-001", "nrWpisuWprow": "1", "nrWpisuWykr": "2"},
+                {"miejscowosc": "WARSZAWA", "kodPocztowy": "00-001", "ulica": "UL. PROSTA", "nrWpisuWprow": "2"}],
+        },
+    }}}}
+    with psql_sessionmaker() as session:
+        session.add(RawKSRAPIFullExtract(krs_number="0000000001", is_current=True, raw_data=extract))
+        session.commit()
+        profile = session.execute(
+            select(
+                RawKSRAPIFullExtract.record_created_at,
+                RawKSRAPIFullExtract.krs_number,
+                *company_profile_columns(RawKSRAPIFullExtract.raw_data))
+        ).one()._asdict()
+    company = CompanyInfoResponse.model_validate(profile)
+    assert company.full_name == "NOWA NAZWA SP. Z O.O."
+    assert company.legal_form == "SPÓŁKA Z OGRANICZONĄ ODPOWIEDZIALNOŚCIĄ"
+    assert company.nip_number == "1234567890"
+    assert company.regon_number == "123456789"
+    assert company.voivodeship == "MAZOWIECKIE"
+    assert (company.city, company.postal_number, company.street) == ("WARSZAWA", "00-001", "UL. PROSTA")
+    assert company.email is None
+
+def test_profile_is_read_from_db_when_redis_is_unavailable(psql_sessionmaker):
+    extract = {"odpis": {"dane": {"dzial1": {"danePodmiotu": {
+        "nazwa": [{"nazwa": "SPÓŁKA SP. Z O.O.", "nrWpisuWprow": "1"}],
+        "formaPrawna": [{"formaPrawna": "SPÓŁKA Z OGRANICZONĄ ODPOWIEDZIALNOŚCIĄ", "nrWpisuWprow": "1"}],
+    }}}}}
+    with psql_sessionmaker() as session:
+        session.add(RawKSRAPIFullExtract(krs_number="0000000001", is_current=True, raw_data=extract))
+        session.commit()
+    app = FastAPI()
+    app.include_router(krs_api_router, prefix="/krs-api")
+    # Nothing listens on this port, so every redis call fails
+    app.state.async_redis = AsyncRedis(host="localhost", port=1)
+    app.state.psql_async_sessionmaker = create_async_sessionmaker(os.environ["TEST_PSQL_SYNC_URL"])
+    with TestClient(app) as client:
+        response = client.get("/krs-api/company-profile/0000000001")
+    assert response.status_code == 200
+    assert response.json()["full_name"] == "SPÓŁKA SP. Z O.O."
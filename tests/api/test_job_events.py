@@ -0,0 +1,38 @@
+import json
+from datetime import datetime, timezone
+from business_data_api.api.job_events import (
+    format_archived_job_events,
+    format_sse_event,
+    is_tracked_event,
+    is_final_status)
+from business_data_api.api.models import CompactJobStatus
+
+
+def test_format_sse_event():
+    event = {"job_id": "job-1", "job_status": "finished"}
+    message = format_sse_event(event)
+    assert message.startswith("event: job_status\ndata: ")
+    assert message.endswith("\n\n")
+    assert json.loads(message.split("data: ", 1)[1]) == event
+
+def test_is_tracked_event():
+    event = {"job_id": "job-1", "krs": "0000012345", "job_status": "started"}
+    assert is_tracked_event(event, {"job-1"}, set())
+    assert is_tracked_event(event, set(), {"0000012345"})
+    assert not is_tracked_event(event, {"job-2"}, {"0000054321"})
+
+def test_is_final_status():
+    assert is_final_status("finished")
+    assert is_final_status("failed")
+    assert not is_final_status("started")
+    assert not is_final_status("scheduled")
+    assert not is_final_status(None)
+
+def test_jobs_missing_in_redis_get_archived_status_or_not_found_event():
+    ended_at = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    archived = CompactJobStatus(
+        job_id="job-1", job_status="finished", job_changed_at=ended_at, job_ended_at=ended_at)
+    archived_event, not_found_event = format_archived_job_events(["job-1", "job-2"], [archived])
+    assert archived_event.startswith("event: job_status\n")
+    assert json.loads(archived_event.split("data: ", 1)[1])["job_status"] == "finished"
+    assert not_found_event == format_sse_event({"job_id": "job-2"}, event_type="job_not_found")
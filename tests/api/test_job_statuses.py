@@ -0,0 +1,30 @@
+from datetime import datetime, timezone
+from business_data_api.api.jobs import get_job_changed_at, filter_changed_since
+from business_data_api.api.models import CompactJobStatus
+
+
+def _job_status(job_id, changed_at):
+    return CompactJobStatus(
+        job_id=job_id,
+        job_status="finished",
+        job_changed_at=changed_at)
+
+def test_get_job_changed_at_returns_latest_timestamp():
+    enqueued_at = datetime(2025, 1, 1, 10, 0, tzinfo=timezone.utc)
+    started_at = datetime(2025, 1, 1, 10, 5, tzinfo=timezone.utc)
+    assert get_job_changed_at(enqueued_at, started_at, None) == started_at
+    assert get_job_changed_at(None, None, None) is None
+
+def test_get_job_changed_at_treats_naive_datetimes_as_utc():
+    changed_at = get_job_changed_at(datetime(2025, 1, 1, 10, 0))
+    assert changed_at == datetime(2025, 1, 1, 10, 0, tzinfo=timezone.utc)
+
+def test_filter_changed_since():
+    job_statuses = [
+        _job_status("old", datetime(2025, 1, 1, 9, 0, tzinfo=timezone.utc)),
+        _job_status("new", datetime(2025, 1, 1, 11, 0, tzinfo=timezone.utc)),
+        _job_status("unknown", None),
+    ]
+    assert filter_changed_since(job_statuses, None) == job_statuses
+    filtered = filter_changed_since(job_statuses, datetime(2025, 1, 1, 10, 0))
+    assert [job_status.job_id for job_status in filtered] == ["new"]
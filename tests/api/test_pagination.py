@@ -0,0 +1,22 @@
+from datetime import datetime
+import pytest
+from business_data_api.api.pagination import encode_cursor, decode_cursor, parse_fields
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2025, 1, 1, 10, 30, 15, 123456)
+    cursor = encode_cursor([created_at, "hash-id"])
+    assert "=" not in cursor
+    assert decode_cursor(cursor, 2) == [created_at.isoformat(), "hash-id"]
+
+@pytest.mark.parametrize("cursor", ["not a cursor", encode_cursor(["only one value"])])
+def test_decode_cursor_rejects_malformed_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 2)
+
+def test_parse_fields():
+    allowed_fields = ["document_name", "document_hash_id"]
+    assert parse_fields(None, allowed_fields) == allowed_fields
+    assert parse_fields(" document_hash_id,document_hash_id ", allowed_fields) == ["document_hash_id"]
+    with pytest.raises(ValueError):
+        parse_fields("document_content", allowed_fields)
@@ -0,0 +1,40 @@
+import os
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from redis.asyncio import Redis as AsyncRedis
+from business_data_api.api.response_cache import make_etag, is_etag_matching
+from business_data_api.api.routes.krs_dokumenty_finansowe_services.krs_dokumenty_finansowe import (
+    router as krs_df_router)
+from business_data_api.db import create_async_sessionmaker
+from business_data_api.db.models import KRSDFDocuments
+
+
+def test_make_etag_depends_on_body():
+    assert make_etag(b'{"document_list": []}') == make_etag(b'{"document_list": []}')
+    assert make_etag(b'{"document_list": []}') != make_etag(b'{"document_list": [1]}')
+    assert make_etag(b"body").startswith('"') and make_etag(b"body").endswith('"')
+
+def test_is_etag_matching():
+    etag = make_etag(b"body")
+    assert is_etag_matching(etag, etag)
+    assert is_etag_matching(f'"other", {etag}', etag)
+    assert is_etag_matching(f"W/{etag}", etag)
+    assert is_etag_matching("*", etag)
+    assert not is_etag_matching(None, etag)
+    assert not is_etag_matching('"other"', etag)
+
+def test_documents_are_listed_from_db_when_redis_is_unavailable(psql_sessionmaker):
+    with psql_sessionmaker() as session:
+        session.add(KRSDFDocuments(
+            hash_id="hash_1", krs_number="0000000001", document_type="Bilans",
+            document_date_from="01.01.2024", document_date_to="31.12.2024"))
+        session.commit()
+    app = FastAPI()
+    app.include_router(krs_df_router, prefix="/krs-df")
+    # Nothing listens on this port, so every redis call fails
+    app.state.async_redis = AsyncRedis(host="localhost", port=1)
+    app.state.psql_async_sessionmaker = create_async_sessionmaker(os.environ["TEST_PSQL_SYNC_URL"])
+    with TestClient(app) as client:
+        response = client.get("/krs-df/available-documents/0000000001")
+    assert response.status_code == 200
+    assert [document["document_hash_id"] for document in response.json()["document_list"]] == ["hash_1"]
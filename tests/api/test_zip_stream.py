@@ -0,0 +1,34 @@
+import asyncio
+import io
+import zipfile
+from business_data_api.api.zip_stream import stream_zip
+
+
+async def _files(files):
+    for file_name, file_content in files:
+        yield file_name, file_content
+
+async def _collect(files):
+    return [chunk async for chunk in stream_zip(_files(files))]
+
+def test_stream_zip_creates_valid_archive():
+    files = [
+        ("0000057814_document_1.xml", b"<xml>" + b"a" * 10000 + b"</xml>"),
+        ("0000057814_document_2.pdf", bytes(range(256)) * 100),
+    ]
+    chunks = asyncio.run(_collect(files))
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zip_file:
+        assert zip_file.namelist() == [file_name for file_name, _ in files]
+        for file_name, file_content in files:
+            assert zip_file.read(file_name) == file_content
+
+def test_stream_zip_yields_chunk_per_file():
+    files = [(f"document_{i}.xml", b"content" * 1000) for i in range(5)]
+    chunks = asyncio.run(_collect(files))
+    # one chunk for every file and one for central directory
+    assert len(chunks) == len(files) + 1
+
+def test_stream_zip_empty_archive():
+    chunks = asyncio.run(_collect([]))
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zip_file:
+        assert zip_file.namelist() == []
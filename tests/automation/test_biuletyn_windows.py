@@ -0,0 +1,31 @@
+import datetime
+from automation_scripts.check_for_krs_updates import plan_biuletyn_windows
+
+NOW = datetime.datetime(2025, 3, 10, 14, 30)
+
+def test_first_run_plans_days_to_check_up_to_last_full_hour():
+    windows = plan_biuletyn_windows(None, NOW, days_to_check=2, window_hours=24)
+    assert windows == [
+        (datetime.date(2025, 3, 9), 0, 23),
+        (datetime.date(2025, 3, 10), 0, 13),
+    ]
+
+def test_windows_are_limited_to_window_hours():
+    windows = plan_biuletyn_windows(None, NOW, days_to_check=1, window_hours=6)
+    assert windows == [
+        (datetime.date(2025, 3, 10), 0, 5),
+        (datetime.date(2025, 3, 10), 6, 11),
+        (datetime.date(2025, 3, 10), 12, 13),
+    ]
+
+def test_only_hours_after_watermark_are_planned():
+    watermark = datetime.datetime(2025, 3, 9, 21)
+    windows = plan_biuletyn_windows(watermark, NOW, days_to_check=5, window_hours=24)
+    assert windows == [
+        (datetime.date(2025, 3, 9), 22, 23),
+        (datetime.date(2025, 3, 10), 0, 13),
+    ]
+
+def test_nothing_is_planned_when_watermark_is_up_to_date():
+    watermark = datetime.datetime(2025, 3, 10, 13)
+    assert plan_biuletyn_windows(watermark, NOW, days_to_check=1, window_hours=6) == []
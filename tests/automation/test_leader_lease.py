@@ -0,0 +1,21 @@
+import time
+from redis.exceptions import ConnectionError
+from automation_scripts.leader_lease import LeaderLease
+
+
+def test_lease_is_renewed_while_held(redis_connection):
+    with LeaderLease(redis_connection, "test", lease_seconds=1) as lease:
+        time.sleep(1.5)
+        assert lease.is_held
+        assert redis_connection.pttl(lease.lease_key) > 0
+
+def test_lease_is_lost_when_it_could_not_be_renewed_for_its_ttl(redis_connection, monkeypatch):
+    lease = LeaderLease(redis_connection, "test", lease_seconds=1)
+    assert lease.acquire()
+    def failing_renew():
+        raise ConnectionError("redis is unavailable")
+    monkeypatch.setattr(lease, "renew", failing_renew)
+    time.sleep(1.5)
+    assert not lease.is_held
+    assert lease._lost.is_set()
+    lease.release()
@@ -0,0 +1,51 @@
+import datetime
+from automation_scripts.refresh_planner import plan_refreshes, fetch_last_refresh_times
+from business_data_api.db.models import JobHistory
+from business_data_api.workers.queues import get_queue_lane_name
+
+NOW = datetime.datetime(2025, 3, 10, 12, tzinfo=datetime.timezone.utc)
+
+def test_recently_refreshed_companies_are_skipped_per_source():
+    krs_numbers = ["0000000001", "0000000002", "0000000003"]
+    last_refresh_times = {
+        ("KRSAPI", "0000000001"): NOW - datetime.timedelta(hours=1),
+        ("KRSDF", "0000000001"): NOW - datetime.timedelta(hours=48),
+        ("KRSAPI", "0000000002"): NOW - datetime.timedelta(hours=30),
+        ("KRSDF", "0000000002"): NOW - datetime.timedelta(hours=2),
+    }
+    planned, skipped = plan_refreshes(krs_numbers, last_refresh_times, NOW, freshness_hours=24)
+    assert planned == {
+        "KRSAPI": ["0000000002", "0000000003"],
+        "KRSDF": ["0000000001", "0000000003"],
+    }
+    assert skipped == {"KRSAPI": 1, "KRSDF": 1}
+
+def test_zero_freshness_window_plans_everything():
+    krs_numbers = ["0000000001"]
+    last_refresh_times = {("KRSAPI", "0000000001"): NOW - datetime.timedelta(minutes=1)}
+    planned, skipped = plan_refreshes(krs_numbers, last_refresh_times, NOW, freshness_hours=0)
+    assert planned == {"KRSAPI": ["0000000001"], "KRSDF": ["0000000001"]}
+    assert skipped == {"KRSAPI": 0, "KRSDF": 0}
+
+def test_finished_jobs_of_priority_lanes_count_as_refreshes(psql_sessionmaker):
+    with psql_sessionmaker() as session:
+        session.add_all([
+            JobHistory(
+                job_id="job_1", queue_name=get_queue_lane_name("KRSAPI", "bulk"), krs_number="0000000001",
+                job_status="finished", ended_at=NOW - datetime.timedelta(hours=2)),
+            JobHistory(
+                job_id="job_2", queue_name=get_queue_lane_name("KRSDF", "high"), krs_number="0000000001",
+                job_status="finished", ended_at=NOW - datetime.timedelta(hours=1)),
+            JobHistory(
+                job_id="job_3", queue_name=get_queue_lane_name("KRSDF", "bulk"), krs_number="0000000001",
+                job_status="finished", ended_at=NOW - datetime.timedelta(hours=3)),
+            JobHistory(
+                job_id="job_4", queue_name=get_queue_lane_name("KRSAPI", "high"), krs_number="0000000002",
+                job_status="failed", ended_at=NOW - datetime.timedelta(hours=1)),
+        ])
+        session.commit()
+    last_refresh_times = fetch_last_refresh_times(psql_sessionmaker, ["0000000001", "0000000002"])
+    assert last_refresh_times == {
+        ("KRSAPI", "0000000001"): NOW - datetime.timedelta(hours=2),
+        ("KRSDF", "0000000001"): NOW - datetime.timedelta(hours=1),
+    }
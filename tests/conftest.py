@@ -1,5 +1,43 @@
+import os
 import warnings
+import pytest
 from bs4 import XMLParsedAsHTMLWarning
 
 def pytest_configure(config):
-    warnings.filterwarnings("ignore", category=XMLParsedAsHTMLWarning)
\ No newline at end of file
+    warnings.filterwarnings("ignore", category=XMLParsedAsHTMLWarning)
+
+@pytest.fixture()
+def redis_connection():
+    """
+    Empty redis database of TEST_REDIS_URL, tests are skipped if it is not set
+    """
+    from redis import Redis
+    redis_url = os.getenv("TEST_REDIS_URL")
+    if not redis_url:
+        pytest.skip("TEST_REDIS_URL is not set")
+    connection = Redis.from_url(redis_url)
+    connection.flushdb()
+    yield connection
+    connection.flushdb()
+    connection.close()
+
+@pytest.fixture()
+def psql_sessionmaker():
+    """
+    Sessionmaker of TEST_PSQL_SYNC_URL database with created tables,
+    that are emptied after the test. Tests are skipped if it is not set
+    """
+    from sqlalchemy import text
+    from business_data_api.db import Base, create_tables, create_sync_sessionmaker
+    import business_data_api.db.models
+    psql_url = os.getenv("TEST_PSQL_SYNC_URL")
+    if not psql_url:
+        pytest.skip("TEST_PSQL_SYNC_URL is not set")
+    create_tables(psql_url)
+    sessionmaker = create_sync_sessionmaker(psql_url)
+    yield sessionmaker
+    table_names = ", ".join(f'"{table.name}"' for table in Base.metadata.sorted_tables)
+    with sessionmaker() as session:
+        session.execute(text(f"TRUNCATE {table_names} RESTART IDENTITY CASCADE"))
+        session.commit()
+    sessionmaker.kw["bind"].dispose()
@@ -0,0 +1,16 @@
+import datetime
+from business_data_api.db.backfills import parse_document_periods
+
+
+def test_document_periods_are_parsed_like_scraped_documents():
+    rows = [("hash_1", "01.01.2023", "2023-12-31"), ("hash_2", " 01-01-2024 ", None)]
+    assert parse_document_periods(rows) == [
+        {"b_hash_id": "hash_1", "b_period_start": datetime.date(2023, 1, 1), "b_period_end": datetime.date(2023, 12, 31)},
+        {"b_hash_id": "hash_2", "b_period_start": datetime.date(2024, 1, 1), "b_period_end": None}]
+
+def test_invalid_dates_do_not_fail_the_batch():
+    rows = [("hash_1", "31.02.2023", "brak"), ("hash_2", "01.01.2023", "31.12.2023")]
+    periods = parse_document_periods(rows)
+    assert periods[0]["b_period_start"] is None
+    assert periods[0]["b_period_end"] is None
+    assert periods[1]["b_period_end"] == datetime.date(2023, 12, 31)
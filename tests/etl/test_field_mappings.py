@@ -0,0 +1,97 @@
+import pytest
+from sqlalchemy import bindparam, select
+from sqlalchemy.dialects.postgresql import JSONB
+from business_data_api.etl.field_mappings import (
+    compile_mapping,
+    compile_mappings,
+    compile_path,
+    compile_sql_columns,
+    concat,
+    explode,
+    field,
+    from_root,
+    get_path)
+
+EXTRACT = {
+    "naglowek": {"rejestr": "RejP"},
+    "podmiot": {
+        "nazwa": [
+            {"nazwa": "STARA", "nrWpisuWprow": "1", "nrWpisuWykr": "2"},
+            {"nazwa": "NOWA", "nrWpisuWprow": "2"}],
+        "kapital": [{"kapital": {"wartosc": "1 000,50"}, "nrWpisuWprow": "1"}],
+    },
+    "zarzad": [
+        {"nazwisko": "KOWALSKI", "imie": "JAN", "nrWpisuWprow": "1"},
+        {"nazwisko": "NOWAK", "imie": "ADAM", "nrWpisuWprow": "1", "nrWpisuWykr": "3"},
+        {"nazwisko": "WIŚNIEWSKA", "nrWpisuWprow": "2"}],
+}
+
+def test_compiled_path_reads_the_same_value_as_get_path():
+    for path in [("podmiot", "nazwa"), ("podmiot", "kapital", "wartosc"), ("naglowek", "brak"), ("zarzad",)]:
+        assert compile_path(path)(EXTRACT) == get_path(EXTRACT, path)
+
+def test_field_uses_first_present_source_and_coerces_it():
+    map_extract = compile_mapping({"fields": {
+        "name": field(("podmiot", "nazwa_zagraniczna"), ("podmiot", "nazwa")),
+        "capital": field(("podmiot", "kapital", "wartosc"), type="amount"),
+        "missing": field(("podmiot", "brak")),
+    }})
+    assert map_extract(EXTRACT, {"krs_number": "0000000001"}) == [
+        {"krs_number": "0000000001", "name": "NOWA", "capital": 1000.5, "missing": None}]
+
+def test_exploded_mapping_creates_row_for_every_current_item():
+    map_extract = compile_mapping({
+        "explode": [explode(("zarzad",), is_board=True)],
+        "fields": {
+            "person": field(concat(("imie",), ("nazwisko",))),
+            "registry": field(from_root("naglowek", "rejestr")),
+        },
+    })
+    assert map_extract(EXTRACT, {}) == [
+        {"position": 0, "is_board": True, "person": "JAN KOWALSKI", "registry": "RejP"},
+        {"position": 1, "is_board": True, "person": "WIŚNIEWSKA", "registry": "RejP"}]
+
+def test_mappings_of_many_tables_are_applied_at_once():
+    map_extract = compile_mappings({
+        "company": {"fields": {"name": field(("podmiot", "nazwa"))}},
+        "board": {"explode": [explode(("brak",), ("zarzad",))], "fields": {"last_name": field(("nazwisko",))}},
+    })
+    rows = map_extract(EXTRACT, {"extract_id": 1})
+    assert rows["company"] == [{"extract_id": 1, "name": "NOWA"}]
+    assert [row["last_name"] for row in rows["board"]] == ["KOWALSKI", "WIŚNIEWSKA"]
+
+def test_sql_columns_read_the_same_values_as_compiled_mapping(psql_sessionmaker):
+    mapping = {"fields": {
+        "name": field(("podmiot", "nazwa")),
+        "capital": field(("podmiot", "kapital", "wartosc")),
+        "board": field(("zarzad",)),
+        "first_present": field(("podmiot", "brak"), ("podmiot", "pusta"), ("podmiot", "nazwa")),
+        "removed": field(("podmiot", "usunieta")),
+        "not_history": field(("lista",)),
+        "scalar": field(("podmiot", "nazwa", "nazwa")),
+        "flag": field(("podmiot", "flaga")),
+        "number": field(("podmiot", "liczba")),
+    }}
+    extracts = [
+        EXTRACT,
+        {},
+        {"podmiot": {
+            "nazwa": {"nazwa": "WPIS", "nrWpisuWprow": "1"},
+            "pusta": [],
+            "usunieta": [{"usunieta": "X", "nrWpisuWprow": "1", "nrWpisuWykr": "2"}],
+            "flaga": True,
+            "liczba": 5}},
+        {"lista": ["A", "B"], "podmiot": {"nazwa": [{"nrWpisuWprow": "1", "inna": "X"}], "pusta": ""}},
+    ]
+    map_extract = compile_mapping(mapping)
+    columns = compile_sql_columns(mapping, bindparam("extract", type_=JSONB))
+    with psql_sessionmaker() as session:
+        for extract in extracts:
+            row = session.execute(select(*columns), {"extract": extract}).one()
+            assert row._asdict() == map_extract(extract, {})[0]
+
+def test_mappings_without_sql_equivalent_are_rejected():
+    with pytest.raises(ValueError):
+        compile_sql_columns({"fields": {"capital": field(("kapital",), type="amount")}}, None)
+    with pytest.raises(ValueError):
+        compile_sql_columns({"fields": {"person": field(concat(("imie",), ("nazwisko",)))}}, None)
@@ -0,0 +1,87 @@
+import io
+import zipfile
+from decimal import Decimal
+from business_data_api.etl.financial_statements import (
+    iter_statement_facts,
+    parse_document,
+    parse_statement_amount)
+
+STATEMENT = b"""<?xml version="1.0" encoding="UTF-8"?>
+<JednostkaInna xmlns="http://www.mf.gov.pl/schematy/SF/DefinicjeTypySprawozdaniaFinansowe/2018/07/09/JednostkaInnaWZlotych"
+               xmlns:dtsf="http://www.mf.gov.pl/schematy/SF/DefinicjeTypySprawozdaniaFinansowe/2018/07/09/DefinicjeTypySprawozdaniaFinansowe">
+  <Naglowek><dtsf:OkresOd>2024-01-01</dtsf:OkresOd><dtsf:OkresDo>2024-12-31</dtsf:OkresDo></Naglowek>
+  <Bilans>
+    <Aktywa>
+      <KwotaA>1500.50</KwotaA><KwotaB>1200.00</KwotaB>
+      <Aktywa_A><KwotaA>500.50</KwotaA><KwotaB>200.00</KwotaB></Aktywa_A>
+      <Aktywa_B><KwotaA>1000.00</KwotaA><KwotaB>1000.00</KwotaB></Aktywa_B>
+    </Aktywa>
+  </Bilans>
+  <RZiS>
+    <RZiSPor>
+      <A><KwotaA>3000</KwotaA><KwotaB>2500</KwotaB><A_I><KwotaA>3000</KwotaA><KwotaB>-</KwotaB></A_I></A>
+      <L><KwotaA>-120.10</KwotaA><KwotaB>80</KwotaB></L>
+    </RZiSPor>
+  </RZiS>
+  <DodatkoweInformacjeIObjasnienia><Pozycja><KwotaA>999</KwotaA></Pozycja></DodatkoweInformacjeIObjasnienia>
+</JednostkaInna>"""
+
+def test_parse_statement_amount():
+    assert parse_statement_amount(" 1234.56 ") == Decimal("1234.56")
+    assert parse_statement_amount("-") is None
+    assert parse_statement_amount(None) is None
+    assert parse_statement_amount("10.005") == Decimal("10.01")
+
+def test_amounts_that_do_not_fit_stored_values_are_skipped():
+    assert parse_statement_amount("999999999999999999.99") == Decimal("999999999999999999.99")
+    assert parse_statement_amount("1000000000000000000") is None
+    assert parse_statement_amount("999999999999999999.999") is None
+    assert parse_statement_amount("1E+40") is None
+
+def test_line_items_of_statements_are_parsed():
+    facts = list(iter_statement_facts(io.BytesIO(STATEMENT)))
+    assert ("Bilans", "Aktywa", "current", Decimal("1500.50")) in facts
+    assert ("Bilans", "Aktywa_A", "previous", Decimal("200.00")) in facts
+    assert ("RZiSPor", "A_I", "current", Decimal("3000")) in facts
+    assert ("RZiSPor", "L", "current", Decimal("-120.10")) in facts
+    # Not a number and amounts outside of statements are skipped
+    assert ("RZiSPor", "A_I", "previous") not in [fact[:3] for fact in facts]
+    assert "Pozycja" not in [fact[1] for fact in facts]
+    assert len(facts) == 11
+
+def test_document_facts_have_key_figures():
+    result = parse_document(("hash", "0000000001", "xml", STATEMENT))
+    assert result["parse_status"] == "parsed"
+    assert result["content_bytes"] == len(STATEMENT)
+    figures = {(fact["figure"], fact["period"]): fact["value"] for fact in result["facts"] if fact["figure"]}
+    assert figures[("total_assets", "current")] == Decimal("1500.50")
+    assert figures[("revenue", "previous")] == Decimal("2500")
+    assert figures[("net_profit", "current")] == Decimal("-120.10")
+
+def test_statement_is_parsed_from_zip_archive():
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zip_file:
+        zip_file.writestr("sprawozdanie.xml", STATEMENT)
+        zip_file.writestr("opinia.pdf", b"%PDF-1.4")
+    result = parse_document(("hash", "0000000001", "zip", archive.getvalue()))
+    assert result["parse_status"] == "parsed"
+    assert len(result["facts"]) == 11
+
+def test_documents_without_facts_get_status():
+    assert parse_document(("hash", "0000000001", "pdf", b"%PDF-1.4"))["parse_status"] == "not_xml"
+    assert parse_document(("hash", "0000000001", "xml", b"<Dokument/>"))["parse_status"] == "no_facts"
+    result = parse_document(("hash", "0000000001", "xml", b"<Bilans><Aktywa>"))
+    assert result["parse_status"] == "invalid"
+    assert result["facts"] == [] and result["error_message"]
+
+def test_unexpected_errors_mark_document_invalid():
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.writestr("sprawozdanie.xml", STATEMENT)
+    content = bytearray(archive.getvalue())
+    # Corrupts compressed data of the member (zlib.error), its header stays valid
+    data_start = 30 + len("sprawozdanie.xml")
+    content[data_start:data_start + 10] = b"\xff" * 10
+    result = parse_document(("hash", "0000000001", "zip", bytes(content)))
+    assert result["parse_status"] == "invalid"
+    assert result["facts"] == [] and result["error_message"]
@@ -0,0 +1,108 @@
+from sqlalchemy import select
+from business_data_api.db.models import CompanyInfo, CompanyExtractField
+from business_data_api.etl.krs_api_extracts import (
+    _replace_child_rows,
+    _upsert_company_info,
+    flatten_extract,
+    flatten_extracts,
+    get_path,
+    iter_leaf_values)
+
+
+def _extract(name="SPÓŁKA TESTOWA SP. Z O.O."):
+    return {
+        "odpis": {
+            "naglowekP": {"rejestr": "RejP", "stanZDnia": "01.01.2025"},
+            "dane": {
+                "dzial1": {
+                    "danePodmiotu": {
+                        "formaPrawna": [{"formaPrawna": "SPÓŁKA Z OGRANICZONĄ ODPOWIEDZIALNOŚCIĄ", "nrWpisuWprow": "1"}],
+                        "identyfikatory": [{"identyfikatory": {"nip": "1234567890", "regon": "123456789"}, "nrWpisuWprow": "1"}],
+                        "nazwa": [
+                            {"nazwa": "STARA NAZWA", "nrWpisuWprow": "1", "nrWpisuWykr": "2"},
+                            {"nazwa": name, "nrWpisuWprow": "2"}],
+                    },
+                    "siedzibaIAdres": {
+                        "adres": [{"kraj": "POLSKA", "miejscowosc": "WARSZAWA", "nrWpisuWprow": "1"}],
+                    },
+                },
+                "dzial2": {
+                    "reprezentacja": {
+                        "nazwaOrganu": [{"nazwaOrganu": "ZARZĄD", "nrWpisuWprow": "1"}],
+                        "sklad": [
+                            {
+                                "nazwisko": [{"nazwiskoICzlon": "KOWALSKI", "nrWpisuWprow": "1"}],
+                                "imiona": [{"imiona": {"imie": "JAN"}, "nrWpisuWprow": "1"}],
+                                "funkcjaWOrganie": [{"funkcjaWOrganie": "PREZES ZARZĄDU", "nrWpisuWprow": "1"}],
+                                "nrWpisuWprow": "1",
+                            },
+                            {
+                                "nazwisko": [{"nazwiskoICzlon": "NOWAK", "nrWpisuWprow": "1"}],
+                                "nrWpisuWprow": "1",
+                                "nrWpisuWykr": "2",
+                            },
+                        ],
+                    },
+                },
+                "dzial3": {
+                    "przedmiotDzialalnosci": {
+                        "przedmiotPrzewazajacejDzialalnosci": [
+                            {"opis": "DZIAŁALNOŚĆ ZWIĄZANA Z OPROGRAMOWANIEM", "kodDzial": "62", "kodKlasa": "01", "kodPodklasa": "Z", "nrWpisuWprow": "1"}],
+                        "przedmiotPozostalejDzialalnosci": [
+                            {"opis": "DORADZTWO", "kodDzial": "62", "kodKlasa": "02", "kodPodklasa": "Z", "nrWpisuWprow": "1"},
+                            {"opis": "USUNIĘTA", "kodDzial": "47", "kodKlasa": "91", "kodPodklasa": "Z", "nrWpisuWprow": "1", "nrWpisuWykr": "2"}],
+                    },
+                },
+            },
+        }
+    }
+
+def test_get_path_reads_current_value_of_history():
+    data = _extract()["odpis"]["dane"]["dzial1"]
+    assert get_path(data, ("danePodmiotu", "nazwa")) == "SPÓŁKA TESTOWA SP. Z O.O."
+    assert get_path(data, ("danePodmiotu", "identyfikatory", "nip")) == "1234567890"
+    assert get_path(data, ("danePodmiotu", "missing", "nip")) is None
+
+def test_company_info_is_flattened_from_profile_paths():
+    rows = flatten_extract(7, "0000000001", _extract())
+    company_info = rows["company_info"][0]
+    assert company_info["extract_id"] == 7
+    assert company_info["registry"] == "RejP"
+    assert company_info["full_name"] == "SPÓŁKA TESTOWA SP. Z O.O."
+    assert company_info["regon_number"] == "123456789"
+    assert company_info["city"] == "WARSZAWA"
+    assert company_info["email"] is None
+
+def test_removed_list_items_are_skipped():
+    rows = flatten_extract(7, "0000000001", _extract())
+    assert [(r["last_name"], r["first_name"], r["function"], r["body_name"]) for r in rows["company_representatives"]] == [
+        ("KOWALSKI", "JAN", "PREZES ZARZĄDU", "ZARZĄD")]
+    assert [(r["position"], r["is_main"], r["pkd_code"]) for r in rows["company_activities"]] == [
+        (0, True, "62.01.Z"), (1, False, "62.02.Z")]
+
+def test_leaf_values_have_dotted_paths_without_entry_numbers():
+    values = dict(iter_leaf_values(_extract()["odpis"]["dane"]["dzial1"], "dzial1"))
+    assert values["dzial1.danePodmiotu.nazwa"] == "SPÓŁKA TESTOWA SP. Z O.O."
+    assert values["dzial1.siedzibaIAdres.adres.miejscowosc"] == "WARSZAWA"
+    assert not any("nrWpisu" in path for path in values)
+
+def test_only_newest_extract_of_company_in_batch_is_flattened():
+    rows = flatten_extracts([
+        (1, "0000000001", _extract("PIERWSZA")),
+        (2, "0000000002", _extract("DRUGA")),
+        (3, "0000000001", _extract("TRZECIA"))])
+    assert {(r["krs_number"], r["extract_id"], r["full_name"]) for r in rows["company_info"]} == {
+        ("0000000001", 3, "TRZECIA"), ("0000000002", 2, "DRUGA")}
+    assert {r["extract_id"] for r in rows["company_extract_fields"]} == {2, 3}
+
+def test_rows_of_older_extract_do_not_replace_newer_ones(psql_sessionmaker):
+    for extract_id, name in ((2, "NOWSZA"), (1, "STARSZA")):
+        rows = flatten_extracts([(extract_id, "0000000001", _extract(name))])
+        with psql_sessionmaker() as session:
+            krs_numbers = _upsert_company_info(session, rows["company_info"])
+            _replace_child_rows(session, krs_numbers, rows)
+            session.commit()
+    with psql_sessionmaker() as session:
+        assert session.execute(
+            select(CompanyInfo.extract_id, CompanyInfo.full_name, CompanyInfo.registry_type)).all() == [(2, "NOWSZA", "RejP")]
+        assert set(session.execute(select(CompanyExtractField.extract_id)).scalars()) == {2}
@@ -0,0 +1,68 @@
+from datetime import datetime, timezone
+import pyarrow.parquet as pq
+from business_data_api.etl.field_mappings import parse_amount
+from business_data_api.etl.parquet_export import (
+    EXPORT_SCHEMAS,
+    ParquetPartitionWriter,
+    extracts_to_record_batches,
+    flatten_extract_columns)
+
+CREATED_AT = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _extract():
+    return {
+        "odpis": {
+            "naglowekP": {"rejestr": "RejP", "stanZDnia": "01.01.2025"},
+            "dane": {
+                "dzial1": {
+                    "danePodmiotu": {"nazwa": [{"nazwa": "SPÓŁKA SP. Z O.O.", "nrWpisuWprow": "1"}]},
+                    "siedzibaIAdres": {
+                        "adres": [{"adres": {"miejscowosc": "WARSZAWA", "kodPocztowy": "00-001"}, "nrWpisuWprow": "1"}]},
+                    "wspolnicySpzoo": [
+                        {"nazwa": [{"nazwa": "HOLDING S.A.", "nrWpisuWprow": "1"}], "posiadaneUdzialy": "100 UDZIAŁÓW", "czyPosiadaCaloscUdzialow": True, "nrWpisuWprow": "1"},
+                        {"nazwisko": {"nazwiskoICzlon": "KOWALSKI"}, "imiona": {"imie": "JAN"}, "nrWpisuWprow": "1"},
+                        {"nazwa": "BYŁY WSPÓLNIK", "nrWpisuWprow": "1", "nrWpisuWykr": "2"}],
+                    "kapital": {
+                        "wysokoscKapitaluZakladowego": [{"wysokoscKapitaluZakladowego": {"wartosc": "5 000,00", "waluta": "PLN"}, "nrWpisuWprow": "1"}],
+                        "lacznaLiczbaAkcjiUdzialow": "100"},
+                },
+            },
+        }
+    }
+
+def test_parse_amount_accepts_polish_format():
+    assert parse_amount("5 000,50") == 5000.5
+    assert parse_amount("brak") is None
+    assert parse_amount(None) is None
+
+def test_extract_is_flattened_into_datasets():
+    rows = flatten_extract_columns(3, "0000000001", CREATED_AT, _extract())
+    assert rows["company"][0]["full_name"] == "SPÓŁKA SP. Z O.O."
+    assert rows["addresses"][0]["postal_number"] == "00-001"
+    assert [(r["position"], r["name"], r["holds_all_shares"]) for r in rows["shareholders"]] == [
+        (0, "HOLDING S.A.", True), (1, "JAN KOWALSKI", None)]
+    assert rows["capital"][0]["share_capital"] == 5000.0
+    assert rows["capital"][0]["share_capital_currency"] == "PLN"
+    assert rows["capital"][0]["shares_count"] == 100
+    assert rows["board_members"] == []
+
+def test_record_batches_have_fixed_schema():
+    batches = extracts_to_record_batches([
+        (1, "0000000001", CREATED_AT, _extract()),
+        (2, "0000000002", CREATED_AT, {})])
+    for dataset, batch in batches.items():
+        assert batch.schema == EXPORT_SCHEMAS[dataset]
+    assert batches["company"].num_rows == 2
+    assert batches["board_members"].num_rows == 0
+
+def test_partition_writer_starts_new_file_after_row_limit(tmp_path):
+    batch = extracts_to_record_batches([(1, "0000000001", CREATED_AT, _extract())])["shareholders"]
+    writer = ParquetPartitionWriter(str(tmp_path / "shareholders"), EXPORT_SCHEMAS["shareholders"], rows_per_file=4)
+    for _ in range(3):
+        writer.write(batch)
+    writer.close()
+    paths = sorted((tmp_path / "shareholders").iterdir())
+    assert [path.name for path in paths] == ["part-00000.parquet", "part-00001.parquet"]
+    assert [pq.read_metadata(path).num_rows for path in paths] == [4, 2]
+    assert writer.rows_written == 6
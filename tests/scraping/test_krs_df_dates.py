@@ -0,0 +1,18 @@
+import datetime
+import pytest
+from business_data_api.scraping.krs_dokumenty_finansowe.model import KRSDokumentyFinansowe
+VALID_KRS = "0000057814"
+
+@pytest.mark.parametrize("text, expected", [
+    ("01.01.2023", datetime.date(2023, 1, 1)),
+    (" 31.12.2023 ", datetime.date(2023, 12, 31)),
+    ("2023-12-31", datetime.date(2023, 12, 31)),
+    ("31-12-2023", datetime.date(2023, 12, 31)),
+    ("", None),
+    (None, None),
+    ("brak", None),
+    ("31.02.2023", None),
+])
+def test_parse_document_table_date(text, expected):
+    krsdf = KRSDokumentyFinansowe(VALID_KRS)
+    assert krsdf._helper_parse_date(text) == expected
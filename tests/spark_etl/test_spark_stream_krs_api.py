@@ -0,0 +1,117 @@
+import json
+import os
+import shutil
+import sys
+import pytest
+from sqlalchemy import text
+from business_data_api.db.models import CompanyInfo, CompanyExtractField
+from spark_etl.spark_stream_krs_api import (
+    FLATTENED_EXTRACT_SCHEMA,
+    SINK_TABLES,
+    build_debezium_event,
+    build_merge_statements,
+    explode_tables,
+    flatten_extracts,
+    get_sink_columns,
+    get_staging_table_name,
+    parse_debezium_events,
+    read_change_events,
+    to_struct_values)
+
+
+def test_flattened_schema_has_array_of_rows_for_every_sink_table():
+    assert FLATTENED_EXTRACT_SCHEMA.fieldNames() == list(SINK_TABLES)
+    company_info_row = FLATTENED_EXTRACT_SCHEMA["company_info"].dataType.elementType
+    assert "record_updated_at" not in company_info_row.fieldNames()
+    assert company_info_row.fieldNames()[0] == "krs_number"
+
+def test_rows_are_converted_in_order_of_sink_columns():
+    rows = {table: [] for table in SINK_TABLES}
+    rows["company_activities"] = [{
+        "krs_number": "0000000001", "position": 0, "extract_id": 1,
+        "is_main": True, "pkd_code": "62.01.Z", "description": "OPROGRAMOWANIE"}]
+    values = dict(zip(SINK_TABLES, to_struct_values(rows)))
+    columns = [column.name for column in get_sink_columns("company_activities")]
+    assert values["company_activities"] == [tuple(rows["company_activities"][0][c] for c in columns)]
+    assert values["company_info"] == []
+
+def test_debezium_event_carries_extract_as_json_string():
+    event = json.loads(build_debezium_event(5, "0000000001", {"odpis": {}}))
+    assert event["op"] == "c"
+    assert event["after"]["id"] == 5
+    assert json.loads(event["after"]["raw_data"]) == {"odpis": {}}
+
+def test_company_info_is_never_overwritten_with_older_extract():
+    [statement] = build_merge_statements("company_info")
+    assert "ON CONFLICT (krs_number) DO UPDATE" in statement
+    assert "company_info.extract_id <= EXCLUDED.extract_id" in statement
+    delete, insert = build_merge_statements("company_representatives")
+    assert delete.startswith("DELETE FROM company_representatives")
+    assert insert.startswith("INSERT INTO company_representatives")
+
+def test_child_rows_of_older_extract_are_not_merged(psql_sessionmaker):
+    def merge_batch(session, extract_id, full_name):
+        for table in SINK_TABLES:
+            staging_table = get_staging_table_name(table)
+            session.execute(text(f"DROP TABLE IF EXISTS {staging_table}"))
+            session.execute(text(f"CREATE TABLE {staging_table} (LIKE {table})"))
+        session.execute(text(
+            f"INSERT INTO {get_staging_table_name('company_info')} (krs_number, extract_id, full_name) "
+            f"VALUES ('0000000001', {extract_id}, '{full_name}')"))
+        session.execute(text(
+            f"INSERT INTO {get_staging_table_name('company_extract_fields')} (krs_number, path, extract_id, section, value) "
+            f"VALUES ('0000000001', 'dzial1.danePodmiotu.nazwa', {extract_id}, 'dzial1', '{full_name}')"))
+        for table in SINK_TABLES:
+            for statement in build_merge_statements(table):
+                session.execute(text(statement))
+    with psql_sessionmaker() as session:
+        merge_batch(session, 2, "NOWSZA")
+        merge_batch(session, 1, "STARSZA")
+        assert session.query(CompanyInfo.extract_id, CompanyInfo.full_name).all() == [(2, "NOWSZA")]
+        assert session.query(CompanyExtractField.extract_id, CompanyExtractField.value).all() == [(2, "NOWSZA")]
+        for table in SINK_TABLES:
+            session.execute(text(f"DROP TABLE {get_staging_table_name(table)}"))
+        session.commit()
+
+def _java_is_available():
+    return bool(shutil.which("java") or os.getenv("JAVA_HOME"))
+
+@pytest.mark.skipif(not _java_is_available(), reason="Java is required by local spark")
+def test_file_source_stream_flattens_inserted_extracts(tmp_path, monkeypatch):
+    from pyspark.sql import SparkSession
+    # Python workers of local spark import flattening from this repository
+    monkeypatch.setenv("PYTHONPATH", os.pathsep.join(sys.path))
+    source_path = tmp_path / "events"
+    source_path.mkdir()
+    extract = {"odpis": {"naglowekP": {"rejestr": "RejP"}}}
+    older_extract_update = json.loads(build_debezium_event(1, "0000000001", extract, op="u"))
+    older_extract_update["after"]["is_current"] = False
+    (source_path / "events.json").write_text("\n".join([
+        build_debezium_event(1, "0000000001", extract),
+        build_debezium_event(2, "0000000001", extract),
+        json.dumps(older_extract_update),
+        build_debezium_event(3, "0000000002", extract, op="r"),
+        build_debezium_event(4, "0000000003", extract, op="d"),
+    ]))
+    spark = (
+        SparkSession.builder
+        .master("local[*]")
+        .config("spark.sql.shuffle.partitions", 2)
+        .getOrCreate())
+    company_info = []
+    def collect_batch(batch, batch_id):
+        tables = explode_tables(flatten_extracts(parse_debezium_events(batch), partitions=2))
+        company_info.extend(tables["company_info"].select("krs_number", "extract_id", "registry").collect())
+    try:
+        query = (
+            read_change_events(spark, source="file", file_source_path=str(source_path))
+            .writeStream
+            .foreachBatch(collect_batch)
+            .option("checkpointLocation", str(tmp_path / "checkpoints"))
+            .trigger(availableNow=True)
+            .start())
+        query.awaitTermination()
+    finally:
+        spark.stop()
+    assert sorted(tuple(row) for row in company_info) == [
+        ("0000000001", 2, "RejP"), ("0000000002", 3, "RejP")]
@@ -0,0 +1,23 @@
+from business_data_api.workers.archiver import split_exc_string, MAX_ERROR_MESSAGE_LENGTH
+
+
+def test_split_exc_string_traceback():
+    exc_string = (
+        "Traceback (most recent call last):\n"
+        "  File \"worker.py\", line 1, in perform\n"
+        "    raise WebpageThrottlingException('Too many requests')\n"
+        "business_data_api.scraping.exceptions.WebpageThrottlingException: Too many requests: wait\n")
+    error_type, error_message = split_exc_string(exc_string)
+    assert error_type == "business_data_api.scraping.exceptions.WebpageThrottlingException"
+    assert error_message == "Too many requests: wait"
+
+def test_split_exc_string_without_message():
+    assert split_exc_string("Traceback:\nEntityNotFoundException\n") == ("EntityNotFoundException", "")
+
+def test_split_exc_string_empty():
+    assert split_exc_string(None) == (None, None)
+    assert split_exc_string("") == (None, None)
+
+def test_split_exc_string_trims_message():
+    _, error_message = split_exc_string("ValueError: " + "x" * 5000)
+    assert len(error_message) == MAX_ERROR_MESSAGE_LENGTH
@@ -0,0 +1,22 @@
+from config import API_RESPONSE_CACHE_TTL_SECONDS
+from business_data_api.workers.cache_invalidation import (
+    AVAILABLE_DOCUMENTS_CACHE,
+    get_response_cache_key,
+    get_response_cache_version_key,
+    invalidate_response_cache)
+
+
+def test_invalidation_drops_responses_and_changes_version(redis_connection):
+    cache_key = get_response_cache_key(AVAILABLE_DOCUMENTS_CACHE, "0000000001")
+    version_key = get_response_cache_version_key(AVAILABLE_DOCUMENTS_CACHE, "0000000001")
+    redis_connection.hset(cache_key, "", b"[]")
+    invalidate_response_cache(redis_connection, AVAILABLE_DOCUMENTS_CACHE, "0000000001")
+    first_version = redis_connection.get(version_key)
+    invalidate_response_cache(redis_connection, AVAILABLE_DOCUMENTS_CACHE, "0000000001")
+    assert not redis_connection.exists(cache_key)
+    assert redis_connection.get(version_key) not in (None, first_version)
+
+def test_version_expires_with_cached_responses(redis_connection):
+    invalidate_response_cache(redis_connection, AVAILABLE_DOCUMENTS_CACHE, "0000000001")
+    ttl = redis_connection.ttl(get_response_cache_version_key(AVAILABLE_DOCUMENTS_CACHE, "0000000001"))
+    assert 0 < ttl <= API_RESPONSE_CACHE_TTL_SECONDS
@@ -0,0 +1,140 @@
+import os
+from datetime import timedelta
+from types import SimpleNamespace
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY, CollectorRegistry, values
+from prometheus_client.multiprocess import MultiProcessCollector
+from rq import Queue, Worker
+from rq.job import JobStatus
+from business_data_api.api.request_metrics import record_request_metrics
+from business_data_api.metrics import (
+    JOB_SECONDS,
+    SCRAPED_ITEMS_PER_JOB,
+    QueueDepthCollector,
+    enable_multiprocess_metrics,
+    get_task_name,
+    observe_upstream_response,
+    render_metrics)
+from business_data_api.workers.queues import QUEUE_TASK_PATHS, get_queue_lane_name, get_queue_lane_names
+from business_data_api.workers.worker import PriorityWorker
+
+
+class FakePipeline:
+    def __init__(self, depths:dict):
+        self.depths = depths
+        self.keys = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def llen(self, key):
+        self.keys.append(key)
+
+    def execute(self):
+        return [self.depths[key] for key in self.keys]
+
+
+class FakeConnection:
+    def __init__(self, depths:dict):
+        self.depths = depths
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self.depths)
+
+
+def test_get_task_name():
+    assert get_task_name("business_data_api.workers.tasks.scrape_documents.task_scrape_documents") == "task_scrape_documents"
+    assert get_task_name(None) == "unknown"
+
+def test_observe_upstream_response_labels_host_and_status():
+    labels = {"host": "api-krs.ms.gov.pl", "status": "429"}
+    before = REGISTRY.get_sample_value("business_data_api_upstream_request_duration_seconds_count", labels) or 0
+    response = SimpleNamespace(
+        url="https://api-krs.ms.gov.pl/api/krs/OdpisPelny/0000000001?rejestr=P",
+        status_code=429,
+        elapsed=timedelta(milliseconds=250))
+    observe_upstream_response(response)
+    assert REGISTRY.get_sample_value("business_data_api_upstream_request_duration_seconds_count", labels) == before + 1
+
+def test_queue_depth_collector_reads_every_lane():
+    high_lane, bulk_lane = get_queue_lane_names("KRSAPI")
+    queues = {
+        high_lane: SimpleNamespace(key=f"rq:queue:{high_lane}"),
+        bulk_lane: SimpleNamespace(key=f"rq:queue:{bulk_lane}"),
+    }
+    registry = CollectorRegistry()
+    registry.register(QueueDepthCollector(
+        FakeConnection({f"rq:queue:{high_lane}": 3, f"rq:queue:{bulk_lane}": 0}), queues))
+    assert registry.get_sample_value("business_data_api_queue_depth", {"queue": high_lane}) == 3
+    assert registry.get_sample_value("business_data_api_queue_depth", {"queue": bulk_lane}) == 0
+    assert f"business_data_api_queue_depth{{queue=\"{high_lane}\"}} 3.0".encode() in render_metrics(registry)
+
+def test_request_duration_is_labelled_with_route_template():
+    app = FastAPI()
+    app.middleware("http")(record_request_metrics)
+    @app.get("/test-items/{item_id}")
+    async def get_item(item_id:str):
+        return {"item_id": item_id}
+    labels = {"method": "GET", "route": "/test-items/{item_id}", "status": "200"}
+    before = REGISTRY.get_sample_value("business_data_api_http_request_duration_seconds_count", labels) or 0
+    with TestClient(app) as client:
+        assert client.get("/test-items/0000000001").status_code == 200
+        assert client.get("/test-items/0000000002").status_code == 200
+        assert client.get("/missing").status_code == 404
+    assert REGISTRY.get_sample_value("business_data_api_http_request_duration_seconds_count", labels) == before + 2
+    assert REGISTRY.get_sample_value(
+        "business_data_api_http_request_duration_seconds_count",
+        {"method": "GET", "route": "unmatched", "status": "404"})
+
+def _job_seconds_count(task:str, outcome:str) -> float:
+    return REGISTRY.get_sample_value(
+        "business_data_api_job_duration_seconds_count", {"task": task, "outcome": outcome}) or 0
+
+def test_worker_measures_duration_of_every_job(redis_connection, monkeypatch):
+    queue = Queue(get_queue_lane_name("KRSAPI", "high"), connection=redis_connection)
+    worker = PriorityWorker([queue], connection=redis_connection)
+    def execute_job(self, job, queue):
+        job.set_status(JobStatus.FINISHED)
+    monkeypatch.setattr(Worker, "execute_job", execute_job)
+    task = get_task_name(QUEUE_TASK_PATHS["KRSAPI"])
+    before = _job_seconds_count(task, "finished")
+    worker.execute_job(queue.enqueue(QUEUE_TASK_PATHS["KRSAPI"], "job-1", "0000000001"), queue)
+    assert _job_seconds_count(task, "finished") == before + 1
+    # Job that has expired from redis in the meantime is still measured
+    def execute_expired_job(self, job, queue):
+        job.delete()
+    monkeypatch.setattr(Worker, "execute_job", execute_expired_job)
+    before = _job_seconds_count(task, "unknown")
+    worker.execute_job(queue.enqueue(QUEUE_TASK_PATHS["KRSAPI"], "job-2", "0000000002"), queue)
+    assert _job_seconds_count(task, "unknown") == before + 1
+
+def test_metrics_of_work_horses_are_read_from_multiprocess_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(values, "ValueClass", values.ValueClass)
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+    directory = str(tmp_path / "metrics")
+    enable_multiprocess_metrics(directory)
+    JOB_SECONDS.labels("task_multiprocess_test", "finished").observe(1)
+    pid = os.fork()
+    if pid == 0:
+        try:
+            JOB_SECONDS.labels("task_multiprocess_test", "finished").observe(2)
+            SCRAPED_ITEMS_PER_JOB.labels("task_multiprocess_test", "documents").observe(5)
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    assert sorted(os.listdir(directory)) == ["histogram_horse.db", "histogram_worker.db"]
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry, path=directory)
+    assert registry.get_sample_value(
+        "business_data_api_job_duration_seconds_count",
+        {"task": "task_multiprocess_test", "outcome": "finished"}) == 2
+    assert registry.get_sample_value(
+        "business_data_api_job_duration_seconds_sum",
+        {"task": "task_multiprocess_test", "outcome": "finished"}) == 3
+    assert registry.get_sample_value(
+        "business_data_api_scraped_items_per_job_count",
+        {"task": "task_multiprocess_test", "kind": "documents"}) == 1
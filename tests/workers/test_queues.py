@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta, timezone
+from rq import Queue
+from rq.registry import ScheduledJobRegistry
+from business_data_api.workers.queues import (
+    QUEUE_NAMES,
+    QUEUE_TASK_PATHS,
+    get_lane_queue_names,
+    get_queue_lane_names,
+    migrate_legacy_queue)
+
+
+def test_jobs_of_legacy_queue_are_moved_into_bulk_lane(redis_connection):
+    legacy_queue = Queue("KRSAPI", connection=redis_connection)
+    queued_job = legacy_queue.enqueue(QUEUE_TASK_PATHS["KRSAPI"], "job-1", "0000000001")
+    scheduled_at = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(hours=1)
+    scheduled_job = legacy_queue.enqueue_at(scheduled_at, QUEUE_TASK_PATHS["KRSAPI"], "job-2", "0000000002")
+
+    assert migrate_legacy_queue(redis_connection, "KRSAPI") == 2
+
+    bulk_lane = Queue("KRSAPI_BULK", connection=redis_connection)
+    assert legacy_queue.get_job_ids() == []
+    assert bulk_lane.get_job_ids() == [queued_job.id]
+    assert ScheduledJobRegistry(queue=legacy_queue).get_job_ids() == []
+    bulk_registry = ScheduledJobRegistry(queue=bulk_lane)
+    assert bulk_registry.get_job_ids() == [scheduled_job.id]
+    assert bulk_registry.get_scheduled_time(scheduled_job.id) == scheduled_at
+    assert bulk_lane.fetch_job(scheduled_job.id).origin == "KRSAPI_BULK"
+
+def test_migration_without_legacy_jobs_does_nothing(redis_connection):
+    assert migrate_legacy_queue(redis_connection, "KRSDF") == 0
+
+def test_lanes_and_legacy_queues_map_to_job_type():
+    lane_queue_names = get_lane_queue_names()
+    for queue_name in QUEUE_NAMES:
+        assert lane_queue_names[queue_name] == queue_name
+        for queue_lane_name in get_queue_lane_names(queue_name):
+            assert lane_queue_names[queue_lane_name] == queue_name
@@ -0,0 +1,43 @@
+from rq import Queue
+from business_data_api.workers import reaper
+from business_data_api.workers.queues import QUEUE_TASK_PATHS
+from business_data_api.workers.reaper import STALE_REQUEUES_META_KEY, reap_stale_jobs
+
+
+def _failed_job(connection, ttl:int):
+    queue = Queue("KRSAPI_BULK", connection=connection)
+    job = queue.enqueue(QUEUE_TASK_PATHS["KRSAPI"], "job", "0000000001", meta={STALE_REQUEUES_META_KEY: 3})
+    queue.remove(job.id)
+    queue.failed_job_registry.add(job, ttl=ttl, exc_string="rq.exceptions.AbandonedJobError")
+    return job
+
+def _checked_job_ids(monkeypatch) -> list[str]:
+    checked = []
+    is_awaiting_requeue = reaper.is_awaiting_requeue
+    def record(job, *args, **kwargs):
+        checked.append(job.id)
+        return is_awaiting_requeue(job, *args, **kwargs)
+    monkeypatch.setattr(reaper, "is_awaiting_requeue", record)
+    return checked
+
+def test_failed_jobs_are_checked_only_once(redis_connection, monkeypatch):
+    checked = _checked_job_ids(monkeypatch)
+    first_job = _failed_job(redis_connection, ttl=3600)
+    second_job = _failed_job(redis_connection, ttl=3600)
+    assert reap_stale_jobs(redis_connection, max_requeues=3) == 0
+    assert sorted(checked) == sorted([first_job.id, second_job.id])
+
+    checked.clear()
+    assert reap_stale_jobs(redis_connection, max_requeues=3) == 0
+    assert checked == []
+
+def test_only_failures_added_after_previous_run_are_checked(redis_connection, monkeypatch):
+    checked = _checked_job_ids(monkeypatch)
+    _failed_job(redis_connection, ttl=3600)
+    reap_stale_jobs(redis_connection, max_requeues=3)
+
+    checked.clear()
+    same_second_job = _failed_job(redis_connection, ttl=3600)
+    later_job = _failed_job(redis_connection, ttl=7200)
+    reap_stale_jobs(redis_connection, max_requeues=3)
+    assert sorted(checked) == sorted([same_second_job.id, later_job.id])
@@ -0,0 +1,24 @@
+import random
+import pytest
+from business_data_api.workers.retries import compute_backoff_seconds
+
+
+def test_backoff_grows_exponentially():
+    rng = random.Random(0)
+    delays = [compute_backoff_seconds(attempt, 60, 10**6, rng) for attempt in range(5)]
+    for attempt, delay in enumerate(delays):
+        assert 60 * 2 ** attempt / 2 <= delay <= 60 * 2 ** attempt
+
+def test_backoff_is_capped():
+    rng = random.Random(0)
+    for attempt in range(20):
+        assert compute_backoff_seconds(attempt, 60, 3600, rng) <= 3600
+
+def test_backoff_is_jittered():
+    rng = random.Random(0)
+    delays = {compute_backoff_seconds(3, 60, 3600, rng) for _ in range(20)}
+    assert len(delays) > 1
+
+def test_backoff_is_at_least_one_second():
+    rng = random.Random(0)
+    assert compute_backoff_seconds(0, 0, 3600, rng) == 1